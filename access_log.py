@@ -0,0 +1,735 @@
+import calendar
+import json
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from urllib.parse import unquote_to_bytes
+
+import nginx_conf as nginx_config
+from output_store import target_file_name
+
+
+# nginx 内置的 combined 格式（access_log 未指定格式时使用）
+COMBINED_FORMAT = ('$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+                   '"$http_referer" "$http_user_agent"')
+
+VARIABLE_RE = re.compile(r"\$(?:\{(\w+)\}|(\w+))")
+
+# 需要取值的变量 -> (字段, 正则)，每个正则只有一个分组且不会跨行
+CAPTURED = {
+    "request": ("uri", rb'[^ "\n]* ?([^ "?\n]*)[^"\n]*'),
+    "request_uri": ("uri", rb'([^ "?\n]*)[^ "\n]*'),
+    "uri": ("uri", rb'([^ "?\n]*)'),
+    "status": ("status", rb'(\d{3})'),
+    "body_bytes_sent": ("bytes", rb'(\d+)'),
+    "bytes_sent": ("bytes", rb'(\d+)'),
+    "request_time": ("request_time", rb'([\d.]+|-)'),
+    # 请求经过多个上游时为 "0.010, 0.020" 或 "0.010 : 0.020"
+    "upstream_response_time": ("upstream_time", rb'(-|[\d.]+(?: *[,:] *(?:[\d.]+|-))*)'),
+    "msec": ("msec", rb'(\d+(?:\.\d+)?)'),
+    "time_local": ("time_local", rb'(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})'),
+    "time_iso8601": ("time_iso8601", rb'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:[+-]\d{2}:\d{2}|Z))'),
+}
+TIME_FIELDS = ("msec", "time_local", "time_iso8601")
+MONTHS = {name.encode(): index for index, name in enumerate(calendar.month_abbr) if name}
+
+# 延迟直方图的桶上界（秒）：1ms 到约 2 分钟，相邻桶相差 2^(1/4) 倍，
+# 分位数取所在桶的上界，相对误差不超过约 19%；最后一个桶存放更大的值
+BUCKET_BOUNDS = [round(0.001 * 2 ** (index / 4), 6) for index in range(69)]
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+WINDOW_MINUTES = 15
+UNMATCHED = "(无匹配location)"
+HEAD_BYTES = 64
+
+
+def compile_format(fmt):
+    """把 log_format 转换为匹配整行的字节正则，返回 (正则, {字段: 分组序号})
+
+    只为统计用到的变量建立分组，其他变量按其后的分隔符匹配到该分隔符为止。
+    """
+    parts = []
+    fields = {}
+    pos = 0
+    for match in VARIABLE_RE.finditer(fmt):
+        parts.append(re.escape(fmt[pos:match.start()].encode("utf-8")))
+        name = match.group(1) or match.group(2)
+        spec = CAPTURED.get(name)
+        if spec and spec[0] not in fields:
+            fields[spec[0]] = len(fields)
+            parts.append(spec[1])
+        else:
+            following = fmt[match.end():match.end() + 1]
+            if following and following != "$":
+                parts.append(b"[^" + re.escape(following).encode("utf-8") + b"\\n]*")
+            else:
+                parts.append(b"[^\\n]*?")
+        pos = match.end()
+    parts.append(re.escape(fmt[pos:].encode("utf-8")))
+    return re.compile(b"^" + b"".join(parts) + b"\\r?$", re.MULTILINE), fields
+
+
+def parse_time_local(value):
+    """17/Oct/2026:10:00:00 +0800 -> 秒级时间戳"""
+    seconds = calendar.timegm((int(value[7:11]), MONTHS[value[3:6]], int(value[0:2]),
+                               int(value[12:14]), int(value[15:17]), int(value[18:20])))
+    offset = int(value[22:24]) * 3600 + int(value[24:26]) * 60
+    return seconds - offset if value[21:22] == b"+" else seconds + offset
+
+
+def parse_time_iso8601(value):
+    return int(datetime.fromisoformat(value.decode().replace("Z", "+00:00")).timestamp())
+
+
+def parse_upstream_time(value):
+    """多个上游的耗时相加，"-"（未连接上游）不计"""
+    if value == b"-":
+        return None
+    if b"," in value or b":" in value:
+        parts = [part.strip() for part in re.split(rb"[,:]", value)]
+        return sum(float(part) for part in parts if part and part != b"-")
+    return float(value)
+
+
+class Histogram:
+    """按对数桶计数的延迟直方图"""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (len(BUCKET_BOUNDS) + 1)))
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        result = {"count": self.count, "avg": round(self.sum / self.count, 4), "max": round(self.max, 4)}
+        for q in PERCENTILES:
+            result[f"p{round(q * 100)}"] = round(self.percentile(q), 4)
+        return result
+
+    def to_dict(self):
+        return {"buckets": [[index, count] for index, count in enumerate(self.counts) if count],
+                "count": self.count, "sum": self.sum, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        for index, count in data.get("buckets", []):
+            if 0 <= index < len(histogram.counts):
+                histogram.counts[index] = count
+        histogram.count = data.get("count", 0)
+        histogram.sum = data.get("sum", 0.0)
+        histogram.max = data.get("max", 0.0)
+        return histogram
+
+
+class Bucket:
+    """一段时间内的请求数、状态码分布、响应字节数和两个延迟直方图"""
+
+    __slots__ = ("requests", "status", "bytes", "request_time", "upstream_time")
+
+    def __init__(self):
+        self.requests = 0
+        self.status = array('Q', bytes(8 * 6))   # 下标 1-5 为 1xx-5xx，0 为无法识别的状态码
+        self.bytes = 0
+        self.request_time = Histogram()
+        self.upstream_time = Histogram()
+
+    def add(self, status, nbytes, request_time, upstream_time):
+        self.requests += 1
+        self.status[status] += 1
+        self.bytes += nbytes
+        if request_time is not None:
+            self.request_time.add(request_time)
+        if upstream_time is not None:
+            self.upstream_time.add(upstream_time)
+
+    def merge(self, other):
+        self.requests += other.requests
+        for index, count in enumerate(other.status):
+            self.status[index] += count
+        self.bytes += other.bytes
+        self.request_time.merge(other.request_time)
+        self.upstream_time.merge(other.upstream_time)
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "status": {"1xx": self.status[1], "2xx": self.status[2], "3xx": self.status[3],
+                       "4xx": self.status[4], "5xx": self.status[5], "other": self.status[0]},
+            "error_rate": round(self.status[5] / self.requests, 4) if self.requests else 0,
+            "bytes": self.bytes,
+            "request_time": self.request_time.summary(),
+            "upstream_response_time": self.upstream_time.summary()
+        }
+
+    def to_dict(self):
+        return {"requests": self.requests, "status": list(self.status), "bytes": self.bytes,
+                "request_time": self.request_time.to_dict(), "upstream_time": self.upstream_time.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        bucket = cls()
+        bucket.requests = data.get("requests", 0)
+        for index, count in enumerate(data.get("status", [])[:len(bucket.status)]):
+            bucket.status[index] = count
+        bucket.bytes = data.get("bytes", 0)
+        bucket.request_time = Histogram.from_dict(data.get("request_time", {}))
+        bucket.upstream_time = Histogram.from_dict(data.get("upstream_time", {}))
+        return bucket
+
+
+class LocationStats:
+    """单个location的统计：累计值、最近 WINDOW_MINUTES 分钟每分钟一组、最近60秒每秒的请求数
+
+    时间以日志中的请求时间为准，补读积压的旧日志时不会算到当前的请求速率里。
+    """
+
+    def __init__(self):
+        self.total = Bucket()
+        self.minutes = {}                                # 分钟序号 -> Bucket
+        self.seconds = array('Q', bytes(8 * 60))
+        self.second_ids = array('q', [-1] * 60)
+
+    def add(self, second, status, nbytes, request_time, upstream_time, oldest_minute):
+        self.total.add(status, nbytes, request_time, upstream_time)
+        if second is None:
+            return
+        minute = second // 60
+        if minute >= oldest_minute:
+            bucket = self.minutes.get(minute)
+            if bucket is None:
+                bucket = self.minutes[minute] = Bucket()
+            bucket.add(status, nbytes, request_time, upstream_time)
+        slot = second % 60
+        if self.second_ids[slot] != second:
+            if self.second_ids[slot] > second:
+                return
+            self.second_ids[slot] = second
+            self.seconds[slot] = 0
+        self.seconds[slot] += 1
+
+    def prune(self, oldest_minute):
+        for minute in [minute for minute in self.minutes if minute < oldest_minute]:
+            del self.minutes[minute]
+
+    def window(self, since_minute):
+        bucket = Bucket()
+        for minute, item in self.minutes.items():
+            if minute >= since_minute:
+                bucket.merge(item)
+        return bucket
+
+    def rate(self, now):
+        """最近60秒（不含当前这一秒）的每秒请求数"""
+        current = int(now)
+        count = sum(self.seconds[slot] for slot in range(60)
+                    if current - 60 <= self.second_ids[slot] < current)
+        return round(count / 60, 2)
+
+    def to_dict(self):
+        return {"total": self.total.to_dict(),
+                "minutes": {str(minute): bucket.to_dict() for minute, bucket in self.minutes.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.total = Bucket.from_dict(data.get("total", {}))
+        stats.minutes = {int(minute): Bucket.from_dict(item) for minute, item in data.get("minutes", {}).items()}
+        return stats
+
+
+class LocationMatcher:
+    """按nginx的规则把请求URI匹配到location
+
+    精确匹配（=）优先；否则取最长的前缀匹配，带 ^~ 时直接使用；
+    否则按配置顺序取第一个匹配的正则（~ 区分大小写，~* 不区分）；都不匹配时使用最长前缀。
+    结果按URI缓存，缓存满时清空。
+    """
+
+    def __init__(self, locations, cache_size=10000):
+        self.exact = {}
+        self.prefixes = []      # (前缀, 名称, 是否 ^~)，按长度倒序
+        self.regexes = []       # (正则, 名称)
+        self.targets = {}       # 名称 -> proxy_pass
+        for modifier, path, label, target in locations:
+            self.targets.setdefault(label, target)
+            if modifier == "=":
+                self.exact.setdefault(path, label)
+            elif modifier in ("~", "~*"):
+                try:
+                    self.regexes.append((re.compile(path, re.IGNORECASE if modifier == "~*" else 0), label))
+                except re.error as e:
+                    print(f"无法解析location正则 {path}: {e}")
+            else:
+                self.prefixes.append((path, label, modifier == "^~"))
+        self.prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        self.cache = {}
+        self.cache_size = cache_size
+
+    def match(self, raw_uri):
+        label = self.cache.get(raw_uri)
+        if label is None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            label = self.cache[raw_uri] = self._resolve(raw_uri)
+        return label
+
+    def _resolve(self, raw_uri):
+        if not raw_uri:
+            return UNMATCHED
+        uri = unquote_to_bytes(raw_uri).decode("utf-8", errors="replace")
+        label = self.exact.get(uri)
+        if label is not None:
+            return label
+        prefix = None
+        for path, label, stop in self.prefixes:
+            if uri.startswith(path):
+                if stop:
+                    return label
+                prefix = label
+                break
+        for regex, label in self.regexes:
+            if regex.search(uri):
+                return label
+        return prefix or UNMATCHED
+
+
+class LogSource:
+    """一个 access_log 文件：解析格式、匹配的location和读取位置"""
+
+    def __init__(self, path, fmt, matcher):
+        self.path = path
+        self.format = fmt
+        self.regex, self.fields = compile_format(fmt)
+        self.matcher = matcher
+        self.offset = None
+        self.head = b""
+        self.size = 0
+        self.lines = 0
+        self.unparsed = 0
+        self.time_field = next((name for name in TIME_FIELDS if name in self.fields), None)
+        self.last_time = (None, None)      # 上一行的时间文本及其时间戳，同一秒内的行不再重复解析
+
+    def stats(self):
+        return {"path": self.path, "format": self.format, "offset": self.offset, "size": self.size,
+                "lag_bytes": max(0, self.size - (self.offset or 0)), "lines": self.lines,
+                "unparsed": self.unparsed, "has_latency": "request_time" in self.fields,
+                "has_upstream_time": "upstream_time" in self.fields}
+
+
+def access_log_sources(config, prefix):
+    """从nginx配置中找出 access_log 文件及其格式，返回 {路径: (格式, [server块])}
+
+    server 中的 access_log 覆盖 http 中的；都没有时为 logs/access.log（combined 格式）。
+    相对路径以nginx的工作目录为基准，off、syslog 和包含变量的路径忽略。
+    """
+    formats = {"combined": COMBINED_FORMAT}
+    for node in config.walk():
+        if node.name == "log_format" and len(node.args) >= 2:
+            args = [arg for arg in node.args[1:] if not arg.startswith("escape=")]
+            formats[node.args[0]] = "".join(args)
+
+    def entries(block):
+        result = []
+        for node in block.find("access_log"):
+            if not node.args or node.args[0] == "off":
+                result.append(None)
+                continue
+            path = node.args[0]
+            if path.startswith("syslog:") or "$" in path:
+                continue
+            name = node.args[1] if len(node.args) > 1 and "=" not in node.args[1] else "combined"
+            if not os.path.isabs(path):
+                path = os.path.join(prefix, path)
+            result.append((os.path.normpath(path), formats.get(name, COMBINED_FORMAT)))
+        return result
+
+    sources = {}
+    for server in config.servers():
+        logs = entries(server)
+        if not logs:
+            logs = entries(server.parent) or [(os.path.normpath(os.path.join(prefix, "logs", "access.log")),
+                                               COMBINED_FORMAT)]
+        for entry in logs:
+            if entry is None:
+                continue
+            path, fmt = entry
+            sources.setdefault(path, (fmt, []))[1].append(server)
+    return sources
+
+
+def server_locations(servers):
+    """server块中的location，返回 [(修饰符, 路径, 名称, proxy_pass)]，命名location（@xxx）不参与匹配"""
+    locations = []
+    for server in servers:
+        for node in server.find("location"):
+            if not node.is_block or not node.args:
+                continue
+            modifier, path = (node.args[0], node.args[1]) if len(node.args) > 1 else ("", node.args[0])
+            if path.startswith("@"):
+                continue
+            proxy_pass = node.first("proxy_pass")
+            locations.append((modifier, path, " ".join(node.args),
+                              proxy_pass.args[0] if proxy_pass is not None and proxy_pass.args else None))
+    return locations
+
+
+class TargetAnalytics:
+    """单个nginx的访问日志统计"""
+
+    def __init__(self, key, work_dir, conf_path, state_path, initial_bytes):
+        self.key = key
+        self.work_dir = work_dir
+        self.conf_path = conf_path
+        self.state_path = state_path
+        self.initial_bytes = initial_bytes
+        self.config = None
+        self.sources = {}
+        self.locations = {}        # 名称 -> LocationStats
+        self.targets = {}          # 名称 -> proxy_pass
+        self.saved_offsets = {}
+        self.error = None
+        self.dirty = False
+        self.persist = True
+        self.lines = 0
+        self.parse_seconds = 0.0
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"读取访问日志统计失败 {self.state_path}: {e}")
+            return
+        self.saved_offsets = state.get("files", {})
+        self.locations = {label: LocationStats.from_dict(item) for label, item in state.get("locations", {}).items()}
+
+    def save(self):
+        """统计和各日志文件的读取位置一起写入，重启后从保存的位置继续"""
+        with self.lock:
+            if not self.dirty or not self.persist:
+                return
+            files = dict(self.saved_offsets)
+            files.update({path: {"offset": source.offset, "head": source.head.hex()}
+                          for path, source in self.sources.items() if source.offset is not None})
+            state = {"files": files, "saved_at": time.time(),
+                     "locations": {label: stats.to_dict() for label, stats in self.locations.items()}}
+            self.dirty = False
+        temp_path = self.state_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            print(f"无法保存访问日志统计 {self.state_path}，改为只在内存中保存: {e}")
+            self.persist = False
+
+    def _refresh_config(self):
+        """nginx配置有变化时重新确定日志文件和location（配置按文件修改时间缓存）"""
+        try:
+            config = nginx_config.load(self.conf_path)
+        except Exception as e:
+            message = f"读取nginx配置文件失败: {e}"
+            if message != self.error:
+                print(f"{self.key[1]} {message}")
+            self.error = message
+            return
+        self.error = None
+        if config is self.config:
+            return
+        self.config = config
+        sources = {}
+        targets = {}
+        for path, (fmt, servers) in access_log_sources(config, self.work_dir).items():
+            locations = server_locations(servers)
+            source = self.sources.get(path)
+            if source is None or source.format != fmt:
+                source = LogSource(path, fmt, LocationMatcher(locations))
+                previous = self.sources.get(path)
+                if previous is not None:
+                    source.offset, source.head = previous.offset, previous.head
+                else:
+                    saved = self.saved_offsets.pop(path, None)
+                    if saved:
+                        source.offset, source.head = saved.get("offset"), bytes.fromhex(saved.get("head", ""))
+            else:
+                source.matcher = LocationMatcher(locations)
+            sources[path] = source
+            for label, target in source.matcher.targets.items():
+                targets.setdefault(label, target)
+        with self.lock:
+            self.sources = sources
+            self.targets = targets
+
+    def poll(self, chunk_size, deadline):
+        self._refresh_config()
+        for source in list(self.sources.values()):
+            try:
+                self._tail(source, chunk_size, deadline)
+            except OSError as e:
+                message = f"读取访问日志失败 {source.path}: {e}"
+                if message != self.error:
+                    print(message)
+                self.error = message
+
+    def _tail(self, source, chunk_size, deadline):
+        try:
+            size = os.path.getsize(source.path)
+        except FileNotFoundError:
+            source.size = 0
+            return
+        source.size = size
+        with open(source.path, 'rb') as f:
+            head = f.read(HEAD_BYTES)
+            if source.offset is None:
+                # 第一次分析该文件：只读取末尾的 initial_bytes，从其后的第一个完整行开始
+                source.offset = 0
+                if size > self.initial_bytes:
+                    f.seek(size - self.initial_bytes)
+                    f.readline()
+                    source.offset = f.tell()
+            elif size < source.offset or head[:len(source.head)] != source.head[:len(head)]:
+                # 日志被轮转或清空，从头开始
+                source.offset = 0
+            source.head = head
+            while source.offset < size and time.time() < deadline:
+                f.seek(source.offset)
+                data = f.read(chunk_size)
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    if len(data) < chunk_size:
+                        break
+                    # 单行超过一块，跳过
+                    end = len(data)
+                    source.unparsed += 1
+                self._consume(source, data[:end] if end < len(data) else data)
+                source.offset += end
+
+    def _consume(self, source, data):
+        started = time.time()
+        fields = source.fields
+        uri_index = fields.get("uri")
+        status_index = fields.get("status")
+        bytes_index = fields.get("bytes")
+        request_index = fields.get("request_time")
+        upstream_index = fields.get("upstream_time")
+        time_index = fields.get(source.time_field) if source.time_field else None
+        time_parser = {"msec": lambda value: int(float(value)), "time_local": parse_time_local,
+                       "time_iso8601": parse_time_iso8601}.get(source.time_field)
+        last_text, last_second = source.last_time
+        match_location = source.matcher.match
+        oldest_minute = int(started) // 60 - WINDOW_MINUTES + 1
+        now_second = int(started)
+        locations = self.locations
+        matched = 0
+
+        with self.lock:
+            for match in source.regex.finditer(data):
+                groups = match.groups()
+                label = match_location(groups[uri_index]) if uri_index is not None else UNMATCHED
+                stats = locations.get(label)
+                if stats is None:
+                    stats = locations[label] = LocationStats()
+
+                if status_index is not None:
+                    status = groups[status_index][0] - 48
+                    if not 1 <= status <= 5:
+                        status = 0
+                else:
+                    status = 0
+                nbytes = int(groups[bytes_index]) if bytes_index is not None else 0
+                request_time = None
+                if request_index is not None:
+                    value = groups[request_index]
+                    if value != b"-":
+                        request_time = float(value)
+                upstream_time = parse_upstream_time(groups[upstream_index]) if upstream_index is not None else None
+
+                if time_index is not None:
+                    text = groups[time_index]
+                    if text != last_text:
+                        try:
+                            last_second = time_parser(text)
+                        except (ValueError, KeyError):
+                            last_second = None
+                        last_text = text
+                    second = last_second
+                else:
+                    # 日志中没有时间时按读取时间统计
+                    second = now_second
+                stats.add(second, status, nbytes, request_time, upstream_time, oldest_minute)
+                matched += 1
+            self.dirty = True
+
+        lines = data.count(b"\n")
+        source.last_time = (last_text, last_second)
+        source.lines += matched
+        source.unparsed += max(0, lines - matched)
+        self.lines += matched
+        self.parse_seconds += time.time() - started
+
+    def prune(self, now):
+        oldest_minute = int(now) // 60 - WINDOW_MINUTES + 1
+        with self.lock:
+            for stats in self.locations.values():
+                stats.prune(oldest_minute)
+
+    def summary(self, window, now):
+        minutes = max(1, min(WINDOW_MINUTES, -(-int(window) // 60)))
+        since_minute = int(now) // 60 - minutes + 1
+        with self.lock:
+            locations = []
+            for label, stats in self.locations.items():
+                recent = stats.window(since_minute)
+                item = {"location": label, "target": self.targets.get(label),
+                        "configured": label in self.targets or label == UNMATCHED,
+                        "rate": stats.rate(now),
+                        "window": recent.summary(),
+                        "total": stats.total.summary()}
+                item["window"]["rate"] = round(recent.requests / (minutes * 60), 2)
+                locations.append(item)
+            sources = [source.stats() for source in self.sources.values()]
+        locations.sort(key=lambda item: item["window"]["requests"], reverse=True)
+        return {
+            "window": minutes * 60,
+            "locations": locations,
+            "files": sources,
+            "lines": self.lines,
+            "lines_per_second": round(self.lines / self.parse_seconds) if self.parse_seconds else None,
+            "error": self.error
+        }
+
+
+class AccessLogAnalytics:
+    """nginx访问日志分析
+
+    后台线程每隔 interval 秒增量读取各nginx的 access_log（从上次读到的位置继续），
+    用按 log_format 生成的正则逐块解析，按配置中的location汇总请求速率、状态码分布和
+    $request_time / $upstream_response_time 的对数桶直方图（分位数由直方图计算）。
+    统计和读取位置保存在 state_dir 中，重启后继续累计。
+    targets() 返回 {key: (nginx工作目录, nginx.conf路径)}。
+    """
+
+    def __init__(self, targets, state_dir="logs", interval=1, save_interval=10,
+                 chunk_size=1024 * 1024, initial_bytes=8 * 1024 * 1024):
+        self.targets = targets
+        self.state_dir = state_dir
+        self.interval = interval
+        self.save_interval = save_interval
+        self.chunk_size = chunk_size
+        self.initial_bytes = initial_bytes
+        self.entries = {}          # key -> TargetAnalytics
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.last_save = time.time()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="access-log")
+        self.thread.start()
+
+    def state_path(self, key):
+        return os.path.join(self.state_dir, target_file_name(key)[:-len(".log")] + ".access.json")
+
+    def _sync(self):
+        try:
+            targets = self.targets()
+        except Exception as e:
+            print(f"获取nginx列表失败: {e}")
+            return []
+        with self.lock:
+            for key in list(self.entries):
+                if key not in targets:
+                    self.entries.pop(key).save()
+            for key, (work_dir, conf_path) in targets.items():
+                entry = self.entries.get(key)
+                if entry is None or entry.conf_path != conf_path:
+                    if entry is not None:
+                        entry.save()
+                    entry = TargetAnalytics(key, work_dir, conf_path, self.state_path(key), self.initial_bytes)
+                    self.entries[key] = entry
+            return list(self.entries.values())
+
+    def _run(self):
+        while self.running:
+            started = time.time()
+            for entry in self._sync():
+                try:
+                    # 积压很多时每个周期最多读取若干秒，避免其他nginx长时间得不到处理
+                    entry.poll(self.chunk_size, started + max(self.interval, 5))
+                except Exception as e:
+                    print(f"访问日志分析失败 {entry.key[1]}: {e}")
+            if time.time() - self.last_save >= self.save_interval:
+                self.save()
+            self.wake.wait(max(0, self.interval - (time.time() - started)))
+            self.wake.clear()
+
+    def save(self):
+        now = time.time()
+        self.last_save = now
+        with self.lock:
+            entries = list(self.entries.values())
+        for entry in entries:
+            entry.prune(now)
+            entry.save()
+
+    def summary(self, key, window=300):
+        """返回nginx按location汇总的访问统计，还没有开始分析时返回None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry.summary(window, time.time())
+
+    def stats(self):
+        with self.lock:
+            entries = list(self.entries.items())
+        return {"{}:{}".format(*key): {"lines": entry.lines, "locations": len(entry.locations),
+                                        "files": [source.stats() for source in entry.sources.values()],
+                                        "error": entry.error}
+                for key, entry in entries}
+
+    def close(self):
+        self.running = False
+        self.wake.set()
+        self.save()
@@ -0,0 +1,189 @@
+"""状态检查耗时基准测试
+
+对比每个检查周期的进程检测耗时：
+  legacy   - 原实现：Java检测遍历一次进程表，中间件检测再调用tasklist并再次遍历进程表
+  snapshot - 每个周期只枚举一次进程表，Java和中间件检测通过索引查询
+  tracker  - PID跟踪器稳定状态：只校验已知PID，不扫描进程表
+
+用法: python bench_status.py [周期数] [--fake 进程数]
+  --fake  使用内存中的假进程表（FakeBackend），可在任意平台上得到可重复的结果
+
+结果说明：真正的收益来自 tracker，稳定状态下每个周期只校验已知PID（--fake 3000 约 0.01 ms）。
+snapshot 本身并不比 legacy 快：在假进程表上 legacy 只是两个简单循环（中间件命中即停止），
+--fake 3000 时 snapshot 约 7 ms，legacy 约 3 ms。snapshot 只在真实系统上省掉 tasklist 调用和
+重复的进程枚举，它的作用是让 tracker 需要全量扫描时 Java 和中间件检测共用一次枚举。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from jar_matcher import get_jar_matcher
+from process_backend import FakeBackend, get_backend, set_backend
+from process_snapshot import ProcessSnapshot, cwd_matches
+from process_tracker import PidTracker
+
+
+def load_config(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def legacy_tick(java_services, middlewares):
+    """原有实现的一个检查周期（通过进程后端枚举，以便在假进程表上同样可测）"""
+    backend = get_backend()
+    java_status = {name: {"pid": None} for name in java_services}
+    for info in backend.iter_processes(['pid', 'name', 'cmdline']):
+        cmdline = " ".join(info['cmdline']) if info.get('cmdline') else ""
+        for name, service in java_services.items():
+            jar_name = service.get("jar_name", "")
+            if jar_name and jar_name in cmdline:
+                java_status[name]["pid"] = info['pid']
+
+    middleware_status = {name: {"pid": None} for name in middlewares}
+    if backend.name != "fake" and sys.platform.startswith('win'):
+        try:
+            subprocess.check_output('tasklist /FO CSV /NH', shell=True).decode('gbk', errors='ignore')
+        except Exception:
+            pass
+    for name, service in middlewares.items():
+        process_name = service['process_name'].lower()
+        work_dir = service.get("work_dir", "").lower()
+        for info in backend.iter_processes(['pid', 'name', 'cmdline', 'exe']):
+            proc_name = (info.get('name') or "").lower()
+            if process_name not in proc_name:
+                continue
+            proc_cwd = backend.cwd(info['pid'])
+            if work_dir and not (proc_cwd and cwd_matches(work_dir, proc_cwd)):
+                continue
+            middleware_status[name]["pid"] = info['pid']
+            break
+    return java_status, middleware_status
+
+
+def build_fake_backend(count, java_services, middlewares):
+    """构造包含count个进程的假进程表，其中包含已配置的Java进程和中间件进程"""
+    backend = FakeBackend()
+    pid = 100
+    for service in java_services.values():
+        backend.add(pid, name="java.exe", exe="C:\\Java\\bin\\java.exe",
+                    cmdline=["java", "-Xmx1g", "-jar", service.get("jar_name", "")])
+        pid += 4
+    for service in middlewares.values():
+        for _ in range(3):
+            backend.add(pid, name=service['process_name'], exe=service['process_name'],
+                        cmdline=[service['process_name']], cwd=service.get("work_dir", ""))
+            pid += 4
+    while len(backend.processes) < count:
+        backend.add(pid, name=f"proc{pid}.exe", exe=f"C:\\Program Files\\proc{pid}.exe",
+                    cmdline=[f"proc{pid}.exe", "--flag", str(pid)], cwd="C:\\Windows")
+        pid += 4
+    return backend
+
+
+def snapshot_tick(java_services, middlewares):
+    """快照实现的一个检查周期"""
+    snapshot = ProcessSnapshot()
+    matches = snapshot.match_jars(get_jar_matcher(java_services))
+    java_status = {name: {"pid": matches.get(name)} for name in java_services}
+    middleware_status = {name: {"pid": snapshot.find_middleware(info['process_name'],
+                                                                info.get("work_dir", ""))}
+                         for name, info in middlewares.items()}
+    return java_status, middleware_status
+
+
+def make_tracker_tick():
+    """PID跟踪器实现的一个检查周期（稳定状态下只校验已知PID）"""
+    tracker = PidTracker(rescan_interval=3600)
+
+    def detect(snapshot, keys):
+        matches = snapshot.match_jars(get_jar_matcher(tracker_java))
+        pids = {}
+        for kind, name in keys:
+            if kind == "java":
+                pids[(kind, name)] = matches.get(name)
+            else:
+                info = tracker_middlewares[name]
+                pids[(kind, name)] = snapshot.find_middleware(info['process_name'], info.get("work_dir", ""))
+        return pids
+
+    tracker_java = {}
+    tracker_middlewares = {}
+
+    def tracker_tick(java_services, middlewares):
+        tracker_java.clear()
+        tracker_java.update(java_services)
+        tracker_middlewares.clear()
+        tracker_middlewares.update(middlewares)
+        keys = [("java", name) for name in java_services] + [("middleware", name) for name in middlewares]
+        return tracker.check(keys, detect)
+
+    return tracker_tick
+
+
+def nested_jar_match(processes, java_services):
+    """原有的 进程 x jar 子串嵌套循环"""
+    result = {}
+    for info in processes:
+        cmdline = " ".join(info['cmdline']) if info.get('cmdline') else ""
+        for name, service in java_services.items():
+            jar_name = service.get("jar_name", "")
+            if jar_name and jar_name in cmdline:
+                result[name] = info['pid']
+    return result
+
+
+def bench_jar_matching(ticks, jar_count):
+    """在当前进程表上对比大量jar配置时的分类耗时"""
+    processes = list(ProcessSnapshot().procs.values())
+    java_services = {f"svc{i}": {"jar_name": f"service-{i}.jar"} for i in range(jar_count)}
+    matcher = get_jar_matcher(java_services)
+    nested = bench(nested_jar_match, ticks, processes, java_services)
+    compiled = bench(matcher.match, ticks, processes)
+    print(f"{jar_count}个jar配置: 嵌套循环 {nested:8.2f} ms, 匹配器 {compiled:8.2f} ms")
+
+
+def bench(func, ticks, *args):
+    func(*args)  # 预热
+    start = time.perf_counter()
+    for _ in range(ticks):
+        func(*args)
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="状态检查耗时基准测试")
+    parser.add_argument("ticks", nargs="?", type=int, default=20, help="每种实现运行的周期数（默认20）")
+    parser.add_argument("--fake", type=int, metavar="进程数",
+                        help="使用包含指定进程数的假进程表（FakeBackend）")
+    args = parser.parse_args()
+    if args.ticks < 1:
+        parser.error("周期数必须大于0")
+    return args
+
+
+def main():
+    args = parse_args()
+    ticks = args.ticks
+    fake_count = args.fake
+    java_services = load_config("java_services_config.json")
+    middlewares = load_config("middleware_config.json")
+
+    if fake_count:
+        set_backend(build_fake_backend(fake_count, java_services, middlewares))
+    backend = get_backend()
+    process_count = sum(1 for _ in backend.iter_processes(['pid']))
+    print(f"后端: {backend.name}, 进程数: {process_count}, "
+          f"Java服务: {len(java_services)}, 中间件: {len(middlewares)}")
+    for label, func in (("legacy", legacy_tick), ("snapshot", snapshot_tick), ("tracker", make_tracker_tick())):
+        print(f"{label:>10}: {bench(func, ticks, java_services, middlewares):8.2f} ms/周期")
+    for jar_count in (10, 100, 500):
+        bench_jar_matching(ticks, jar_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import copy
+import json
+import os
+import threading
+import time
+
+
+class ConfigStore:
+    """JSON配置文件的内存存储
+
+    所有读取都直接使用内存中的字典（data），修改后调用 save() 标记变更，
+    短时间内的多次修改合并为一次写盘；需要知道写盘结果的调用方（接口、界面操作）
+    使用 save(immediate=True) 同步写盘。写盘先写入临时文件再原子替换，
+    写到一半崩溃不会损坏原配置文件。后台线程监视配置文件，
+    外部修改会按条目合并成新的字典后整体替换 data（保留pid等运行时字段），
+    其他线程正在遍历的旧字典不会被修改。读取方应每次通过 store.data 取得当前字典。
+
+    runtime_defaults: 只存在于内存中的运行时字段及其默认值（不写入文件）
+    on_change:        on_change(added, removed, changed) 外部修改合并后调用
+    """
+
+    def __init__(self, path, runtime_defaults=None, debounce=0.5, watch_interval=2, on_change=None):
+        self.path = path
+        self.runtime_defaults = runtime_defaults or {}
+        self.debounce = debounce
+        self.watch_interval = watch_interval
+        self.on_change = on_change
+
+        self.lock = threading.RLock()
+        self.timer = None
+        self.last_written = None    # 最近一次写入（或读取）的文件内容
+        self.last_stat = None       # 最近一次写入（或读取）时文件的 (mtime, size)
+        self.last_error = None
+        self.writes = 0
+        self.saves_coalesced = 0
+
+        self.data = self.load()
+
+        self.watching = True
+        self.watch_thread = threading.Thread(target=self._watch, daemon=True, name="config-watch")
+        self.watch_thread.start()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _with_runtime(self, entry):
+        for field, default in self.runtime_defaults.items():
+            entry.setdefault(field, copy.copy(default))
+        return entry
+
+    def _read_file(self):
+        """读取并解析配置文件，返回 (data, text)，格式错误时抛出 ValueError"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        data = json.loads(text) if text.strip() else {}
+        if not isinstance(data, dict):
+            raise ValueError("配置文件内容必须是对象")
+        return data, text
+
+    def load(self):
+        """从文件加载配置，文件不存在时创建空配置
+
+        文件格式错误时把它改名保留（不会删除），并使用空配置。
+        """
+        try:
+            if os.path.exists(self.path):
+                try:
+                    data, text = self._read_file()
+                    self.last_written = text
+                    self.last_stat = self._stat()
+                    return {name: self._with_runtime(entry) for name, entry in data.items()}
+                except ValueError as e:
+                    backup = f"{self.path}.corrupt-{time.strftime('%Y%m%d%H%M%S')}"
+                    print(f"配置文件格式错误，已另存为 {backup}，将使用空配置: {e}")
+                    os.replace(self.path, backup)
+
+            self.data = {}
+            self.flush()
+            return self.data
+        except Exception as e:
+            print(f"配置文件操作失败: {e}")
+            return {}
+
+    def serialize(self):
+        """生成要写入文件的内容（去掉运行时字段）"""
+        with self.lock:
+            persisted = {
+                name: {field: value for field, value in entry.items() if field not in self.runtime_defaults}
+                for name, entry in self.data.items()
+            }
+        return json.dumps(persisted, ensure_ascii=False, indent=4)
+
+    def save(self, immediate=False):
+        """标记配置已修改，debounce 秒内的多次修改合并为一次写盘
+
+        immediate 为 True 时同步写盘，返回本次写盘的结果；
+        否则本次修改尚未写盘，只能返回上一次写盘的错误（status 为 "pending" 表示等待写盘）。
+        """
+        with self.lock:
+            if immediate:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+            elif self.timer:
+                self.saves_coalesced += 1
+            else:
+                self.timer = threading.Timer(self.debounce, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+            error = self.last_error
+        if immediate:
+            error = self.flush()
+        if error:
+            return {"status": "error", "message": f"保存配置文件失败: {error}"}
+        if not immediate:
+            return {"status": "pending", "message": "配置将在稍后写入"}
+        return {"status": "success", "message": "配置已保存"}
+
+    def flush(self):
+        """立即写盘（内容未变化时跳过），返回错误信息，成功时返回None"""
+        with self.lock:
+            self.timer = None
+            try:
+                text = self.serialize()
+                if text == self.last_written and self._stat() == self.last_stat:
+                    return None
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.last_written = text
+                self.last_stat = self._stat()
+                self.last_error = None
+                self.writes += 1
+                return None
+            except Exception as e:
+                print(f"保存配置文件失败 {self.path}: {e}")
+                self.last_error = str(e)
+                return self.last_error
+
+    def _watch(self):
+        while self.watching:
+            time.sleep(self.watch_interval)
+            try:
+                self.check_external_change()
+            except Exception as e:
+                print(f"检查配置文件变化失败 {self.path}: {e}")
+
+    def check_external_change(self):
+        """配置文件被外部修改时，按条目合并到内存中，返回 (added, removed, changed)"""
+        stat = self._stat()
+        with self.lock:
+            if stat is None or stat == self.last_stat:
+                return [], [], []
+            if self.timer:
+                # 还有未写盘的修改，以内存为准，写盘后覆盖外部修改
+                print(f"配置文件 {self.path} 被外部修改，但存在未保存的修改，将以当前配置为准")
+                return [], [], []
+            try:
+                data, text = self._read_file()
+            except ValueError as e:
+                print(f"外部修改后的配置文件格式错误，暂不加载: {e}")
+                self.last_stat = stat
+                return [], [], []
+            self.last_stat = stat
+            if text == self.last_written:
+                return [], [], []
+            self.last_written = text
+
+            added = [name for name in data if name not in self.data]
+            removed = [name for name in self.data if name not in data]
+            changed = []
+            merged = {}
+            for name, entry in data.items():
+                current = self.data.get(name)
+                if current is None:
+                    merged[name] = self._with_runtime(dict(entry))
+                    continue
+                persisted = {field: value for field, value in current.items() if field not in self.runtime_defaults}
+                if persisted != entry:
+                    for field in list(persisted):
+                        if field not in entry:
+                            del current[field]
+                    current.update(entry)
+                    changed.append(name)
+                merged[name] = current
+            # 整体替换，不修改其他线程可能正在遍历的旧字典
+            self.data = merged
+
+        if (added or removed or changed) and self.on_change:
+            print(f"已加载配置文件的外部修改 {self.path}: 新增{added} 删除{removed} 修改{changed}")
+            self.on_change(added, removed, changed)
+        return added, removed, changed
+
+    def stats(self):
+        with self.lock:
+            return {
+                "path": self.path,
+                "entries": len(self.data),
+                "writes": self.writes,
+                "saves_coalesced": self.saves_coalesced,
+                "pending": self.timer is not None,
+                "last_error": self.last_error
+            }
+
+    def close(self):
+        """停止监视并写入未保存的修改"""
+        self.watching = False
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+        self.flush()
@@ -12,7 +12,21 @@ import pystray
 from PIL import Image, ImageDraw
 import sys
 import re
+import subprocess
 import tkinter.ttk as ttk
+from process_backend import PROCESS_ERRORS
+from process_snapshot import ProcessSnapshot, SnapshotProvider
+from process_tracker import PidTracker
+from jar_matcher import get_jar_matcher
+from poll_scheduler import PollScheduler
+from status_collector import StatusCollector
+from lock_manager import LockManager
+from readiness import ReadinessProber
+from config_store import ConfigStore
+from reload_coalescer import ReloadCoalescer
+from launcher import Launcher
+import nginx_conf as nginx_config
+from orchestrator import DependencyError, StartupOrchestrator, build_graph, parse_dependency
 
 class ServiceManagerApp:
     def __init__(self, root):
@@ -53,8 +67,8 @@ class ServiceManagerApp:
         self.middleware_config_file = "middleware_config.json"
         
         # 加载配置
-        self.java_services = self.load_java_services()
-        self.middlewares = self.load_middlewares()
+        self.load_java_services()
+        self.load_middlewares()
         
         self.status_labels = {}
         self.middleware_status_labels = {}
@@ -67,8 +81,37 @@ class ServiceManagerApp:
         self.last_check_time = 0
         self.CHECK_INTERVAL = 10
         
-        # 操作锁，防止并发操作导致的问题
-        self.operation_lock = threading.Lock()
+        # PID跟踪器：稳定状态下只校验已知PID，不再每个周期扫描全部进程
+        self.pid_tracker = PidTracker(rescan_interval=self.CHECK_INTERVAL * 3)
+        
+        # 自适应轮询：操作后快速轮询，长期稳定的对象逐步降低频率，窗口隐藏时降为低频轮询
+        self.scheduler = PollScheduler(base_interval=self.CHECK_INTERVAL, max_interval=60)
+        self.scheduler.set_watchers('tk', 1)
+        
+        # 最近一次检查得到的状态
+        self.status = {'services': {}, 'java': {}, 'middleware': {}}
+        
+        # 并发状态采集：单个采集任务超时只影响对应对象
+        self.COLLECT_TIMEOUT = 5
+        self.collector = StatusCollector(max_workers=4, timeout=self.COLLECT_TIMEOUT)
+        
+        # 按对象划分的操作锁：同一对象的操作互斥，不相关对象可以并行操作
+        self.locks = LockManager()
+        
+        # 重载合并：同一中间件短时间内的多次重载请求只执行一次，结果只提示一次
+        self.reloads = ReloadCoalescer(window=0.5)
+        self.reload_shown = {}
+        
+        # 就绪探测：进程存在之外再按配置检查端口、HTTP接口或日志
+        self.prober = ReadinessProber()
+        
+        # 启动器：直接创建进程并取得目标进程PID，启动后无需扫描进程表
+        self.launcher = Launcher()
+        
+        # 按 depends_on 依赖关系并行启动，每个对象在依赖就绪后立即启动
+        self.READY_TIMEOUT = 60
+        self.orchestrator = StartupOrchestrator(self.start_target, self.is_target_ready, self.wait_target_ready,
+                                                max_workers=4)
         
         # 初始化运行状态标志
         self.is_running = True
@@ -128,16 +171,23 @@ class ServiceManagerApp:
     def show_window(self, icon=None, item=None):
         """显示主窗口"""
         self.root.deiconify()
+        # 窗口可见时恢复状态轮询
+        self.scheduler.set_watchers('tk', 1)
         self.root.lift()
         self.root.focus_force()
         
     def hide_window(self):
         """隐藏主窗口"""
         self.root.withdraw()
+        # 窗口隐藏到托盘后没有人观察状态，降为低频轮询
+        self.scheduler.set_watchers('tk', 0)
         
     def quit_app(self, icon=None, item=None):
         """退出应用程序"""
         self.is_running = False
+        # 写入尚未保存的配置修改
+        self.java_store.close()
+        self.middleware_store.close()
         if hasattr(self, 'tray_icon'):
             self.tray_icon.stop()
         self.root.quit()
@@ -164,6 +214,7 @@ class ServiceManagerApp:
         self.create_menu_button("数据库管理", self.show_service_tab, "database")
         self.create_menu_button("中间件管理", self.show_middleware_tab, "server")
         self.create_menu_button("Java进程管理", self.show_java_tab, "coffee")
+        self.create_menu_button("一键启动", self.start_all, "play")
         
         # 添加版本信息
         version_frame = tk.Frame(self.menu_frame, bg=self.colors['menu_bg'])
@@ -453,7 +504,7 @@ class ServiceManagerApp:
                             messagebox.showwarning("警告", "请输入有效的端口号")
                             return
                         
-                        if self.update_nginx_port(nginx_conf, new_port):
+                        if self.update_nginx_port(middleware_name, new_port):
                             middleware_info["port"] = new_port
                             self.save_middlewares()
                             # 自动重载nginx
@@ -697,8 +748,10 @@ class ServiceManagerApp:
                 return
                 
             try:
-                with self.operation_lock:
-                    os.system(f'start "" "{script_path}"')
+                with self.target_lock("java", service_name, "start"):
+                    self.launch_java(service_name)
+                # 接下来一段时间内快速轮询
+                self.scheduler.boost(("java", service_name))
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("错误", f"启动 {service_name} 失败: {e}"))
         
@@ -706,20 +759,9 @@ class ServiceManagerApp:
 
     def check_java_processes(self):
         """ 检测Java进程是否在运行，并更新状态 """
-        # 先清空 PID 记录
-        for service_name in self.java_services:
-            self.java_services[service_name]["pid"] = None
-
-        # 遍历进程，找到对应的 Java 进程
-        for process in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = " ".join(process.info['cmdline']) if process.info['cmdline'] else ""
-                for service_name, service_info in self.java_services.items():
-                    jar_name = service_info.get("jar_name", "")
-                    if jar_name and jar_name in cmdline:
-                        self.java_services[service_name]["pid"] = process.info['pid']
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+        # 通过进程表快照查找对应的 Java 进程
+        for service_name, data in self.check_java_processes_status().items():
+            self.java_services[service_name]["pid"] = data["pid"]
 
         # 更新 UI
         for service_name, data in self.java_services.items():
@@ -734,8 +776,9 @@ class ServiceManagerApp:
             pid = self.java_services[jar_name]["pid"]
             if pid:
                 try:
-                    with self.operation_lock:
+                    with self.target_lock("java", jar_name, "stop"):
                         psutil.Process(pid).terminate()
+                    self.scheduler.boost(("java", jar_name))
                     self.root.after(0, lambda: messagebox.showinfo("成功", f"{jar_name} 已终止"))
                 except Exception as e:
                     self.root.after(0, lambda: messagebox.showerror("错误", f"终止 {jar_name} 失败: {e}"))
@@ -747,8 +790,9 @@ class ServiceManagerApp:
     def start_service(self, service_name):
         def _start():
             try:
-                with self.operation_lock:
+                with self.target_lock("service", service_name, "start"):
                     win32serviceutil.StartService(self.services[service_name])
+                self.scheduler.boost(("service", service_name))
                 self.root.after(0, lambda: messagebox.showinfo("成功", f"{service_name} 已启动"))
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("错误", f"启动 {service_name} 失败: {e}"))
@@ -758,8 +802,9 @@ class ServiceManagerApp:
     def stop_service(self, service_name):
         def _stop():
             try:
-                with self.operation_lock:
+                with self.target_lock("service", service_name, "stop"):
                     win32serviceutil.StopService(self.services[service_name])
+                self.scheduler.boost(("service", service_name))
                 self.root.after(0, lambda: messagebox.showinfo("成功", f"{service_name} 已停止"))
             except Exception as error:
                 self.root.after(0, lambda error=error: messagebox.showerror("错误", f"停止 {service_name} 失败: {error}"))
@@ -769,8 +814,9 @@ class ServiceManagerApp:
     def restart_service(self, service_name):
         def _restart():
             try:
-                with self.operation_lock:
+                with self.target_lock("service", service_name, "restart"):
                     win32serviceutil.RestartService(self.services[service_name])
+                self.scheduler.boost(("service", service_name))
                 self.root.after(0, lambda: messagebox.showinfo("成功", f"{service_name} 已重启"))
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("错误", f"重启 {service_name} 失败: {e}"))
@@ -785,11 +831,10 @@ class ServiceManagerApp:
             for service_name in self.services:
                 service_status[service_name] = self.is_service_running(service_name)
             
-            # 检查Java进程状态
-            java_status = self.check_java_processes_status()
-            
-            # 检查中间件状态
-            middleware_status = self.check_middleware_processes_status()
+            # 检查Java进程和中间件状态
+            pids = self.check_processes_status()
+            java_status = {name: {"pid": pids.get(("java", name))} for name in self.java_services}
+            middleware_status = {name: {"pid": pids.get(("middleware", name))} for name in self.middlewares}
             
             # 更新UI
             # 更新服务状态
@@ -834,50 +879,28 @@ class ServiceManagerApp:
             print(f"检查服务状态失败: {e}")
             return False
 
+    @property
+    def java_services(self):
+        # 外部修改配置文件后 ConfigStore 会整体替换 data，每次都取当前的字典
+        return self.java_store.data
+
+    @property
+    def middlewares(self):
+        return self.middleware_store.data
+
     def load_java_services(self):
-        try:
-            if os.path.exists(self.config_file):
-                try:
-                    with open(self.config_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    # 添加运行时需要的字段
-                    for service in data.values():
-                        service["pid"] = None
-                        service["status_label"] = None
-                        # 确保script字段存在
-                        if "script" not in service:
-                            service["script"] = ""
-                    return data
-                except json.JSONDecodeError:
-                    print("配置文件格式错误，将创建新的配置文件")
-                    os.remove(self.config_file)
-                    
-            # 如果配置文件不存在或已被删除，创建新的配置文件
-            empty_config = {}
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(empty_config, f, ensure_ascii=False, indent=4)
-            return empty_config
-            
-        except Exception as e:
-            print(f"配置文件操作失败: {e}")
-            return {}
+        # 配置保存在内存中，修改后合并写盘，外部修改自动合并
+        self.java_store = ConfigStore(self.config_file, runtime_defaults={"pid": None, "status_label": None},
+                                      on_change=lambda *changes: self.on_config_change("java", *changes))
+        for service in self.java_store.data.values():
+            # 确保script字段存在
+            service.setdefault("script", "")
+        return self.java_store.data
 
     def save_java_services(self):
-        try:
-            # 创建一个不包含UI元素的副本
-            services_to_save = {}
-            for name, service in self.java_services.items():
-                services_to_save[name] = {
-                    "process": service["process"],
-                    "jar_name": service["jar_name"],
-                    "script": service.get("script", ""),  # 保存脚本路径
-                }
-            
-            # 保存到文件
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(services_to_save, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            messagebox.showerror("错误", f"保存配置文件失败: {e}")
+        result = self.java_store.save(immediate=True)
+        if result["status"] != "success":
+            messagebox.showerror("错误", result["message"])
 
     def add_new_java_process(self):
         dialog = tk.Toplevel(self.root)
@@ -963,6 +986,7 @@ class ServiceManagerApp:
             
             # 删除进程配置
             del self.java_services[service_name]
+            self.locks.forget(("java", service_name))
             self.save_java_services()
             
             # 重新创建Java标签页
@@ -971,48 +995,34 @@ class ServiceManagerApp:
             self.create_java_tab()
 
     def load_middlewares(self):
-        try:
-            if os.path.exists(self.middleware_config_file):
-                try:
-                    with open(self.middleware_config_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    # 添加运行时需要的字段
-                    for middleware in data.values():
-                        middleware["pid"] = None
-                        middleware["status_label"] = None
-                    return data
-                except json.JSONDecodeError:
-                    print("中间件配置文件格式错误，将创建新的配置文件")
-                    os.remove(self.middleware_config_file)
-            
-            # 如果配置文件不存在或已被删除，创建新的配置文件
-            empty_config = {}
-            with open(self.middleware_config_file, 'w', encoding='utf-8') as f:
-                json.dump(empty_config, f, ensure_ascii=False, indent=4)
-            return empty_config
-            
-        except Exception as e:
-            print(f"中间件配置文件操作失败: {e}")
-            return {}
+        self.middleware_store = ConfigStore(self.middleware_config_file,
+                                            runtime_defaults={"pid": None, "status_label": None},
+                                            on_change=lambda *changes: self.on_config_change("middleware", *changes))
+        return self.middleware_store.data
 
     def save_middlewares(self):
-        try:
-            # 创建一个不包含UI元素的副本
-            middlewares_to_save = {}
-            for name, middleware in self.middlewares.items():
-                middlewares_to_save[name] = {
-                    "process_name": middleware["process_name"],
-                    "start_cmd": middleware["start_cmd"],
-                    "reload_cmd": middleware["reload_cmd"],
-                    "work_dir": middleware.get("work_dir", ""),
-                    "port": middleware.get("port", None)
-                }
-            
-            # 保存到文件
-            with open(self.middleware_config_file, 'w', encoding='utf-8') as f:
-                json.dump(middlewares_to_save, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            messagebox.showerror("错误", f"保存中间件配置失败: {e}")
+        result = self.middleware_store.save(immediate=True)
+        if result["status"] != "success":
+            messagebox.showerror("错误", result["message"])
+
+    def on_config_change(self, kind, added, removed, changed):
+        """配置文件被外部修改后，重新检测相关对象并在主线程中刷新标签页"""
+        for name in removed:
+            self.locks.forget((kind, name))
+        for name in added + changed:
+            self.pid_tracker.invalidate((kind, name))
+            self.scheduler.boost((kind, name), duration=0)
+        if added or removed:
+            self.root.after(0, lambda: self.rebuild_tab(kind))
+
+    def rebuild_tab(self, kind):
+        tab = self.java_tab if kind == "java" else self.middleware_tab
+        for widget in tab.winfo_children():
+            widget.destroy()
+        if kind == "java":
+            self.create_java_tab()
+        else:
+            self.create_middleware_tab()
 
     def add_new_middleware(self):
         dialog = tk.Toplevel(self.root)
@@ -1150,23 +1160,176 @@ class ServiceManagerApp:
         dialog.transient(self.root)
         dialog.grab_set()
 
+    def target_config(self, kind, name):
+        """返回Java进程或中间件的配置，Windows服务及不存在的对象返回空字典"""
+        return {"java": self.java_services, "middleware": self.middlewares}.get(kind, {}).get(name) or {}
+
+    def target_lock(self, kind, name, action):
+        """取得对象的操作锁，配置了 lock_groups 的对象与同组对象的操作互斥"""
+        key = (kind, name)
+        config = self.target_config(kind, name)
+        self.locks.set_groups(key, config.get("lock_groups"))
+        return self.locks.hold(key, action)
+
+    def dependency_graph(self):
+        """根据配置中的 depends_on 返回 {(类型, 名称): [依赖的key]}"""
+        targets = ([("service", name) for name in self.services] +
+                   [("java", name) for name in self.java_services] +
+                   [("middleware", name) for name in self.middlewares])
+        target_set = set(targets)
+        dependencies = {}
+        for key in targets:
+            config = self.target_config(*key)
+            deps = []
+            for ref in config.get("depends_on") or []:
+                dep = parse_dependency(ref, target_set)
+                if dep == key:
+                    raise DependencyError(f"{key[1]} 不能依赖自身")
+                deps.append(dep)
+            dependencies[key] = deps
+        return dependencies
+
+    def is_target_ready(self, key, rescan=True):
+        """对象当前是否已就绪：服务处于运行状态，Java进程和中间件检测到进程且就绪探测通过
+
+        已跟踪到进程（例如启动器已登记的PID）时只校验该PID；还没有跟踪到进程且 rescan 为 True 时
+        强制扫描进程表，刚启动的进程不受定期补扫间隔限制。
+        """
+        kind, name = key
+        if kind == "service":
+            return self.is_service_running(name)
+        if rescan and self.pid_tracker.tracked_process(key) is None:
+            self.pid_tracker.invalidate(key)
+        pid = self.check_processes_status(keys=[key]).get(key)
+        if not pid:
+            return False
+        probe = self.probe_readiness({key: pid}).get(key)
+        return probe["ready"] if probe else True
+
+    def probe_readiness(self, pids):
+        """对检测到进程且配置了 readiness 的对象并发执行就绪探测，返回 {key: 探测结果}"""
+        items = {}
+        for key, pid in pids.items():
+            config = self.target_config(*key)
+            probes = ReadinessProber.probes_of(config)
+            if not pid or not probes:
+                continue
+            tracked = self.pid_tracker.tracked_process(key)
+            if key[0] == "middleware":
+                base_dir = config.get("work_dir", "")
+            else:
+                base_dir = os.path.dirname(config.get("script") or config.get("jar_name", ""))
+            items[key] = {
+                "probes": probes,
+                "since": tracked[1] if tracked else None,
+                "base_dir": base_dir
+            }
+        return self.prober.probe_many(items, timeout=self.COLLECT_TIMEOUT)
+
+    def wait_target_ready(self, key, timeout=None):
+        """等待对象就绪，超时返回False"""
+        deadline = time.time() + (self.READY_TIMEOUT if timeout is None else timeout)
+        # 没有跟踪到进程时需要扫描进程表，扫描间隔从0.5秒开始逐次翻倍（最长8秒），
+        # 批量启动时多个等待中的对象不会每0.5秒各触发一次全量扫描
+        scan_delay = 0.5
+        next_scan = 0
+        while time.time() < deadline:
+            now = time.time()
+            rescan = now >= next_scan
+            if self.is_target_ready(key, rescan=rescan):
+                return True
+            if rescan:
+                next_scan = now + scan_delay
+                scan_delay = min(scan_delay * 2, 8)
+            time.sleep(0.5)
+        return False
+
+    def launch_target(self, key, command, work_dir, env=None, new_console=None):
+        """启动Java进程或中间件，在启动的进程树中识别目标进程并直接登记PID
+
+        返回目标进程PID，未能识别时标记该对象需要重新扫描并返回None。
+        """
+        kind, name = key
+        launched = self.launcher.launch(key, command, cwd=work_dir, env=env, new_console=new_console,
+                                        detect=lambda snapshot: self.detect_pids(snapshot, [key]).get(key))
+        pid = launched["target_pid"]
+        if not pid or not self.pid_tracker.adopt(key, pid, launched["create_time"]):
+            self.pid_tracker.invalidate(key)
+            return None
+        entries = self.java_services if kind == "java" else self.middlewares
+        if name in entries:
+            entries[name]["pid"] = pid
+        return pid
+
+    def launch_java(self, name):
+        service = self.java_services[name]
+        script_path = service["script"]
+        # 脚本在自己所在的目录（或配置的工作目录）中运行，与双击启动一致
+        work_dir = service.get("work_dir") or os.path.dirname(script_path) or None
+        return self.launch_target(("java", name), [script_path], work_dir, service.get("env"), new_console=True)
+
+    def launch_middleware(self, name):
+        # 在中间件工作目录中启动，不切换整个进程的当前目录（其他对象的操作可能在并行执行）
+        middleware = self.middlewares[name]
+        return self.launch_target(("middleware", name), middleware["start_cmd"],
+                                  middleware.get("work_dir", "") or None, middleware.get("env"))
+
+    def start_target(self, key):
+        """同步启动单个对象（供依赖编排使用），返回 {"status", "message"}"""
+        kind, name = key
+        try:
+            if kind == "service":
+                with self.target_lock(kind, name, "start"):
+                    win32serviceutil.StartService(self.services[name])
+            elif kind == "java":
+                script_path = self.java_services[name].get("script")
+                if not script_path:
+                    return {"status": "error", "message": f"请先配置 {name} 的启动脚本路径"}
+                with self.target_lock(kind, name, "start"):
+                    self.launch_java(name)
+            else:
+                with self.target_lock(kind, name, "start"):
+                    self.launch_middleware(name)
+            self.scheduler.boost(key)
+            return {"status": "success", "message": f"{name} 已启动"}
+        except Exception as e:
+            return {"status": "error", "message": f"启动 {name} 失败: {e}"}
+
+    def start_all(self):
+        """按依赖关系启动全部服务、中间件和Java进程"""
+        try:
+            graph = build_graph(self.dependency_graph())
+        except DependencyError as e:
+            messagebox.showerror("错误", f"依赖配置错误: {e}")
+            return
+        if not messagebox.askyesno("确认", "确定要按依赖顺序启动所有服务、中间件和Java进程吗？"):
+            return
+            
+        def _run():
+            try:
+                result = self.orchestrator.run(graph)
+            except DependencyError as e:
+                self.root.after(0, lambda: messagebox.showerror("错误", f"依赖配置错误: {e}"))
+                return
+            failed = [f"{target}: {item['message']}" for target, item in result["results"].items()
+                      if item["status"] != "success"]
+            message = "\n".join([result["message"]] + failed)
+            if failed:
+                self.root.after(0, lambda: messagebox.showwarning("提示", message))
+            else:
+                self.root.after(0, lambda: messagebox.showinfo("成功", message))
+        
+        threading.Thread(target=_run, daemon=True).start()
+
     def start_middleware(self, middleware_name):
         def _start():
             middleware = self.middlewares[middleware_name]
-            work_dir = middleware.get("work_dir", "")
-            
-            if work_dir:
-                current_dir = os.getcwd()
-                os.chdir(work_dir)
-                
             try:
-                with self.operation_lock:
-                    os.system(middleware["start_cmd"])
-                if work_dir:
-                    os.chdir(current_dir)
+                with self.target_lock("middleware", middleware_name, "start"):
+                    self.launch_middleware(middleware_name)
+                # 接下来一段时间内快速轮询
+                self.scheduler.boost(("middleware", middleware_name))
             except Exception as e:
-                if work_dir:
-                    os.chdir(current_dir)
                 self.root.after(0, lambda: messagebox.showerror("错误", f"启动 {middleware_name} 失败: {e}"))
         
         threading.Thread(target=_start, daemon=True).start()
@@ -1177,60 +1340,60 @@ class ServiceManagerApp:
             messagebox.showwarning("警告", f"{middleware_name} 未配置重载命令")
             return
             
-        work_dir = middleware.get("work_dir", "")
-        if work_dir:
-            current_dir = os.getcwd()
-            os.chdir(work_dir)
+        def _reload():
+            # 窗口期内的重载请求合并为一次执行，所有调用者共享结果
+            result = self.reloads.request(middleware_name, lambda: self._run_reload(middleware_name))
+            self.root.after(0, lambda: self.show_reload_result(middleware_name, result))
             
+        threading.Thread(target=_reload, daemon=True).start()
+
+    def _run_reload(self, middleware_name):
+        middleware = self.middlewares.get(middleware_name)
+        if not middleware or not middleware.get("reload_cmd"):
+            return {"status": "error", "message": f"{middleware_name} 配置已变更，无法重载"}
+            
+        work_dir = middleware.get("work_dir", "") or None
         try:
-            with self.operation_lock:
+            with self.target_lock("middleware", middleware_name, "reload"):
                 # 执行重载命令
-                result = os.system(middleware["reload_cmd"])
-                if result == 0:
-                    messagebox.showinfo("成功", f"{middleware_name} 重载成功")
-                else:
-                    messagebox.showerror("错误", f"{middleware_name} 重载失败，返回代码：{result}")
-            if work_dir:
-                os.chdir(current_dir)
+                result = subprocess.call(middleware["reload_cmd"], shell=True, cwd=work_dir)
+            self.scheduler.boost(("middleware", middleware_name))
+            if result == 0:
+                return {"status": "success", "message": f"{middleware_name} 重载成功"}
+            return {"status": "error", "message": f"{middleware_name} 重载失败，返回代码：{result}"}
         except Exception as e:
-            if work_dir:
-                os.chdir(current_dir)
-            messagebox.showerror("错误", f"重载 {middleware_name} 失败: {e}")
+            return {"status": "error", "message": f"重载 {middleware_name} 失败: {e}"}
+
+    def show_reload_result(self, middleware_name, result):
+        # 合并执行的多个请求共享同一个结果对象，只提示一次
+        if self.reload_shown.get(middleware_name) is result:
+            return
+        self.reload_shown[middleware_name] = result
+        if result["status"] == "success":
+            messagebox.showinfo("成功", result["message"])
+        else:
+            messagebox.showerror("错误", result["message"])
 
     def stop_middleware(self, middleware_name):
         def _stop():
             middleware = self.middlewares[middleware_name]
-            process_name = middleware['process_name'].lower()
-            work_dir = middleware.get("work_dir", "").lower()
             stopped = False
 
             try:
-                with self.operation_lock:
-                    # 获取所有进程
-                    for proc in psutil.process_iter(['pid', 'name', 'exe', 'cwd']):
+                with self.target_lock("middleware", middleware_name, "stop"):
+                    # 通过进程后端查找所有匹配的进程（按进程名索引，配置了工作目录时再比对工作目录）
+                    snapshot = ProcessSnapshot()
+                    backend = snapshot.backend
+                    for pid in snapshot.find_all_middleware(middleware['process_name'],
+                                                            middleware.get("work_dir", "")):
                         try:
-                            # 检查进程名是否匹配
-                            if (proc.info['name'].lower() == process_name or
-                                (proc.info['exe'] and os.path.basename(proc.info['exe']).lower() == process_name)):
-                                
-                                # 如果配置了工作目录，进行检查
-                                if work_dir:
-                                    try:
-                                        proc_cwd = proc.cwd().lower()
-                                        if not (work_dir in proc_cwd or 
-                                              proc_cwd in work_dir or 
-                                              os.path.normpath(work_dir) == os.path.normpath(proc_cwd)):
-                                            continue
-                                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                                        continue
-
-                                # 终止进程
-                                proc.terminate()
-                                stopped = True
-                                
-                        except (psutil.NoSuchProcess, psutil.AccessDenied):
+                            # 终止进程
+                            backend.terminate(pid)
+                            stopped = True
+                        except PROCESS_ERRORS:
                             continue
 
+                    self.scheduler.boost(("middleware", middleware_name))
                     if stopped:
                         self.root.after(0, lambda: messagebox.showinfo("成功", f"{middleware_name} 的所有相关进程已停止"))
                     else:
@@ -1248,6 +1411,9 @@ class ServiceManagerApp:
             
             # 删除配置
             del self.middlewares[middleware_name]
+            self.locks.forget(("middleware", middleware_name))
+            self.reloads.forget(middleware_name)
+            self.reload_shown.pop(middleware_name, None)
             self.save_middlewares()
             
             # 重新创建中间件标签页
@@ -1259,33 +1425,100 @@ class ServiceManagerApp:
         """后台状态检查线程"""
         while self.is_running:
             try:
-                # 检查服务状态
-                service_status = {}
-                for service_name in self.services:
-                    service_status[service_name] = self.is_service_running(service_name)
-                
-                # 检查Java进程状态
-                java_status = self.check_java_processes_status()
-                
-                # 检查中间件状态
-                middleware_status = self.check_middleware_processes_status()
-                
-                # 将状态放入队列
-                self.status_queue.put({
-                    'services': service_status,
-                    'java': java_status,
-                    'middleware': middleware_status
-                })
+                # 窗口隐藏时调度器降为低频轮询，但不会停止
+                # 将到期对象的检查结果放入队列
+                self.status_queue.put(self.check_due_status())
                 
                 # 通知主线程更新UI
                 self.root.after(0, self.update_ui_status)
                 
-                # 休眠时间改为和检查间隔一致
-                time.sleep(self.CHECK_INTERVAL)
+                # 等待到下一个对象需要检查（操作请求会立即唤醒）
+                self.scheduler.wait()
             except Exception as e:
                 print(f"状态检查错误: {e}")
                 time.sleep(1)
 
+    def check_due_status(self):
+        """检查所有到期的对象，返回合并后的完整状态（非UI操作）"""
+        now = time.time()
+        service_keys = [("service", name) for name in self.services]
+        process_keys = ([("java", name) for name in self.java_services] +
+                        [("middleware", name) for name in self.middlewares])
+        due = self.scheduler.due(service_keys + process_keys, now)
+        self.pid_tracker.retain(process_keys)
+        self.prober.retain(process_keys)
+        
+        # 构建采集任务：每个服务的SCM查询、Java检测、每个中间件检测并发执行，
+        # 需要全量扫描时共用同一份进程表快照
+        snapshots = SnapshotProvider()
+        tasks = {}
+        java_due = [key for key in due if key[0] == "java"]
+        if java_due:
+            tasks[("java", None)] = ("java", lambda: self.check_processes_status(java_due, snapshots))
+        for key in due:
+            kind, name = key
+            if kind == "service":
+                tasks[key] = ("service", lambda name=name: self.is_service_running(name))
+            elif kind == "middleware":
+                tasks[key] = ("middleware", lambda key=key: self.check_processes_status([key], snapshots))
+        results = self.collector.run(tasks)
+        
+        # 服务状态，超时的服务标记为未知（None）
+        for key in due:
+            kind, name = key
+            if kind != "service":
+                continue
+            value = results.get(key, StatusCollector.UNKNOWN)
+            self.status['services'][name] = None if value is StatusCollector.UNKNOWN else value
+            self.scheduler.record(key, self.status['services'][name])
+        
+        # Java进程和中间件状态，超时的对象标记为未知
+        pids = {}
+        unknown = []
+        java_result = results.get(("java", None))
+        if java_due:
+            if java_result is StatusCollector.UNKNOWN:
+                unknown.extend(java_due)
+            else:
+                pids.update(java_result)
+        for key in due:
+            if key[0] == "middleware":
+                value = results.get(key, StatusCollector.UNKNOWN)
+                if value is StatusCollector.UNKNOWN:
+                    unknown.append(key)
+                else:
+                    pids.update(value)
+        # 对检测到进程的对象执行就绪探测，结果作为独立的 ready 状态
+        probes = self.probe_readiness(pids)
+        for (kind, name), pid in pids.items():
+            entry = {"pid": pid, "ready": bool(pid)}
+            probe = probes.get((kind, name))
+            if probe:
+                entry["ready"] = probe["ready"]
+                # 探测耗时按10毫秒取整，避免微小波动在每个周期都产生状态推送
+                entry["latency"] = int(round(probe["latency"], -1)) if probe["latency"] is not None else None
+                if not probe["ready"]:
+                    entry["message"] = probe["message"]
+            self.status[kind][name] = entry
+            self.scheduler.record((kind, name), (pid, entry["ready"]))
+        for kind, name in unknown:
+            self.status[kind][name] = {"pid": None, "unknown": True}
+            self.scheduler.record((kind, name), "unknown")
+        
+        return {
+            'services': {name: self.status['services'].get(name, False) for name in self.services},
+            'java': {name: self.status['java'].get(name, {"pid": None}) for name in self.java_services},
+            'middleware': {name: self.status['middleware'].get(name, {"pid": None}) for name in self.middlewares}
+        }
+
+    def process_status_text(self, data):
+        """进程状态的显示文字和颜色，检测到进程但就绪探测未通过时显示为启动中"""
+        if not data["pid"]:
+            return "未运行", "red"
+        if data.get("ready") is False:
+            return "启动中", "#17a2b8"
+        return "运行中", "green"
+
     def update_ui_status(self):
         """在主线程中更新UI状态"""
         try:
@@ -1295,6 +1528,10 @@ class ServiceManagerApp:
             # 更新服务状态
             for service_name, is_running in status['services'].items():
                 if service_name in self.status_labels:
+                    if is_running is None:
+                        # 状态查询超时
+                        self.status_labels[service_name].config(text="未知", fg="orange")
+                        continue
                     self.status_labels[service_name].config(
                         text="运行中" if is_running else "已停止",
                         fg="green" if is_running else "red"
@@ -1303,119 +1540,96 @@ class ServiceManagerApp:
             # 更新Java进程状态
             for service_name, data in status['java'].items():
                 if service_name in self.java_services:
+                    if data.get("unknown"):
+                        if self.java_services[service_name].get("status_label"):
+                            self.java_services[service_name]["status_label"].config(text="未知", fg="orange")
+                        continue
                     self.java_services[service_name]["pid"] = data["pid"]
                     if "status_label" in self.java_services[service_name]:
-                        self.java_services[service_name]["status_label"].config(
-                            text="运行中" if data["pid"] else "未运行",
-                            fg="green" if data["pid"] else "red"
-                        )
+                        text, color = self.process_status_text(data)
+                        self.java_services[service_name]["status_label"].config(text=text, fg=color)
             
             # 更新中间件状态
             for middleware_name, data in status['middleware'].items():
                 if middleware_name in self.middlewares:
+                    if data.get("unknown"):
+                        if self.middlewares[middleware_name].get("status_label"):
+                            self.middlewares[middleware_name]["status_label"].config(text="未知", fg="orange")
+                        continue
                     self.middlewares[middleware_name]["pid"] = data["pid"]
                     if "status_label" in self.middlewares[middleware_name]:
-                        self.middlewares[middleware_name]["status_label"].config(
-                            text="运行中" if data["pid"] else "未运行",
-                            fg="green" if data["pid"] else "red"
-                        )
+                        text, color = self.process_status_text(data)
+                        self.middlewares[middleware_name]["status_label"].config(text=text, fg=color)
         except queue.Empty:
             pass
         except Exception as e:
             print(f"UI更新错误: {e}")
 
-    def check_java_processes_status(self):
+    def check_processes_status(self, keys=None, snapshots=None):
+        """通过PID跟踪器检查Java进程和中间件状态（非UI操作），返回 {(类型, 名称): pid}
+
+        已知存活的进程只校验PID和创建时间，只有进程退出或新增对象时才扫描进程表。
+        """
+        if keys is None:
+            keys = ([("java", name) for name in self.java_services] +
+                    [("middleware", name) for name in self.middlewares])
+        pids = self.pid_tracker.check(keys, self.detect_pids, snapshots)
+        
+        # 更新缓存和最后检查时间
+        for (kind, name), pid in pids.items():
+            if kind == "middleware":
+                self.process_cache[name] = {"pid": pid}
+        self.last_check_time = time.time()
+        
+        return pids
+
+    def detect_pids(self, snapshot, keys):
+        """在进程表快照中查找指定对象的PID，供PID跟踪器全量扫描时调用"""
+        java_names = [name for kind, name in keys if kind == "java"]
+        middleware_names = [name for kind, name in keys if kind == "middleware"]
+        pids = {}
+        if java_names:
+            for name, info in self.check_java_processes_status(snapshot, java_names).items():
+                pids[("java", name)] = info["pid"]
+        if middleware_names:
+            for name, info in self.check_middleware_processes_status(snapshot, middleware_names).items():
+                pids[("middleware", name)] = info["pid"]
+        return pids
+
+    def check_java_processes_status(self, snapshot=None, names=None):
         """检查Java进程状态（非UI操作）"""
-        status = {}
-        for service_name in self.java_services:
-            status[service_name] = {"pid": None}
+        if snapshot is None:
+            snapshot = ProcessSnapshot()
+        if names is None:
+            names = list(self.java_services)
             
-        for process in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = " ".join(process.info['cmdline']) if process.info['cmdline'] else ""
-                for service_name, service_info in self.java_services.items():
-                    jar_name = service_info.get("jar_name", "")
-                    if jar_name and jar_name in cmdline:
-                        status[service_name]["pid"] = process.info['pid']
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+        # 匹配器只在java_services变化时重新编译，一次扫描即可完成所有进程的分类
+        matches = snapshot.match_jars(get_jar_matcher(self.java_services))
+        status = {}
+        for service_name in names:
+            status[service_name] = {"pid": matches.get(service_name)}
                 
         return status
 
-    def check_middleware_processes_status(self):
+    def check_middleware_processes_status(self, snapshot=None, names=None):
         """检查中间件状态（非UI操作）"""
-        current_time = time.time()
-        
-        # 如果距离上次检查时间不足CHECK_INTERVAL秒，直接返回缓存的结果
-        if current_time - self.last_check_time < self.CHECK_INTERVAL:
-            return self.process_cache
+        if snapshot is None:
+            snapshot = ProcessSnapshot()
+        if names is None:
+            names = list(self.middlewares)
             
         status = {}
-        for middleware_name in self.middlewares:
-            status[middleware_name] = {"pid": None}
-            
-        # 首先尝试使用tasklist命令获取进程信息（效率更高）
-        try:
-            import subprocess
-            # 一次性获取所有进程信息
-            tasklist_output = subprocess.check_output('tasklist /FO CSV /NH', shell=True).decode('gbk')
-            
-            # 为每个中间件检查进程
-            for middleware_name, middleware_info in self.middlewares.items():
-                process_name = middleware_info['process_name'].lower()
-                
-                # 在tasklist输出中查找进程
-                for line in tasklist_output.splitlines():
-                    if process_name in line.lower():
-                        try:
-                            pid = int(line.split('"')[1])  # CSV格式，PID在第2个字段
-                            status[middleware_name]["pid"] = pid
-                            break
-                        except:
-                            continue
-        except Exception as e:
-            pass  # 如果tasklist失败，静默处理，继续使用psutil
-            
-        # 如果tasklist方法没有找到某些进程，使用psutil作为备选方案
-        try:
-            # 一次性获取所有进程信息
-            processes = {p.info['pid']: p for p in psutil.process_iter(['pid', 'name', 'exe'])}
-            
-            for middleware_name, middleware_info in self.middlewares.items():
-                if status[middleware_name]["pid"]:  # 如果已经找到了进程，跳过
-                    continue
-                    
-                process_name = middleware_info['process_name'].lower()
-                work_dir = middleware_info.get("work_dir", "").lower()
-                
-                # 在进程列表中查找匹配的进程
-                for pid, proc in processes.items():
-                    try:
-                        if (proc.info['name'].lower() == process_name or
-                            (proc.info['exe'] and os.path.basename(proc.info['exe']).lower() == process_name)):
-                            
-                            # 如果配置了工作目录，进行检查
-                            if work_dir:
-                                try:
-                                    proc_cwd = proc.cwd().lower()
-                                    if not (work_dir in proc_cwd or 
-                                          proc_cwd in work_dir or 
-                                          os.path.normpath(work_dir) == os.path.normpath(proc_cwd)):
-                                        continue
-                                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                                    continue
-                        
-                            status[middleware_name]["pid"] = pid
-                            break
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-                        
-        except Exception:
-            pass
-            
-        # 更新缓存和最后检查时间
-        self.process_cache = status
-        self.last_check_time = current_time
+        for middleware_name in names:
+            middleware_info = self.middlewares.get(middleware_name)
+            if not middleware_info:
+                continue
+            try:
+                # 按进程名/可执行文件名索引查找，配置了工作目录时再比对工作目录
+                pid = snapshot.find_middleware(middleware_info['process_name'],
+                                               middleware_info.get("work_dir", ""))
+            except Exception:
+                pid = None
+            status[middleware_name] = {"pid": pid}
                 
         return status
 
@@ -1440,34 +1654,44 @@ class ServiceManagerApp:
         return f"#{r:02x}{g:02x}{b:02x}"
 
     def get_nginx_port(self, nginx_conf_path):
-        """读取nginx配置文件中的端口号"""
+        """读取nginx配置文件中的端口号（解析结果按文件修改时间缓存）"""
         try:
-            with open(nginx_conf_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # 使用简单的文本匹配查找端口号
-                match = re.search(r'listen\s+(\d+)', content)
-                if match:
-                    return match.group(1)
+            return nginx_config.load(nginx_conf_path).listen_port()
         except Exception as e:
             messagebox.showerror("错误", f"读取nginx配置文件失败: {e}")
         return None
 
-    def update_nginx_port(self, nginx_conf_path, new_port):
-        """更新nginx配置文件中的端口号"""
+    def apply_nginx_edit(self, middleware_name, build):
+        """修改nginx配置：在中间件的配置锁内用 build(config) 生成修改，写入后用 nginx -t 校验，失败时恢复原配置"""
+        middleware = self.middlewares[middleware_name]
+        work_dir = middleware.get("work_dir", "")
+        conf_path = os.path.join(work_dir, "conf", "nginx.conf")
         try:
-            with open(nginx_conf_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 使用正则表达式替换端口号
-            new_content = re.sub(r'(listen\s+)\d+', rf'\g<1>{new_port}', content)
-            
-            with open(nginx_conf_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            
-            return True
-        except Exception as e:
+            with self.target_lock("middleware", middleware_name, "config"):
+                edit = build(nginx_config.load(conf_path))
+                ok, output, _ = nginx_config.apply_transaction(
+                    edit, lambda: nginx_config.test_config(work_dir, conf_path, middleware["process_name"]))
+        except nginx_config.NginxConfigError as e:
             messagebox.showerror("错误", f"更新nginx配置文件失败: {e}")
             return False
+        if not ok:
+            messagebox.showerror("错误", f"配置检查未通过，已恢复原配置:\n{output}")
+            return False
+        return True
+
+    def update_nginx_port(self, middleware_name, new_port):
+        """更新nginx配置文件中的端口号（所有监听当前端口的 listen 指令）"""
+        return self.apply_nginx_edit(middleware_name,
+                                     lambda config: nginx_config.listen_port_changes(config, new_port))
+
+    def get_nginx_proxies(self, nginx_conf_path):
+        """返回nginx配置中的反向代理列表（不包含内置的location）"""
+        return nginx_config.load(nginx_conf_path).proxy_locations()
+
+    def add_nginx_proxy(self, middleware_name, suffix, target):
+        """在第一个带 server_name 的server块中添加反向代理location"""
+        return self.apply_nginx_edit(middleware_name,
+                                     lambda config: nginx_config.proxy_addition(config, suffix, target))
 
     def add_proxy_config(self, middleware_info):
         """添加Nginx代理配置"""
@@ -1481,21 +1705,6 @@ class ServiceManagerApp:
             messagebox.showwarning("警告", "未找到nginx配置文件")
             return
         
-        # 定义需要过滤的路径列表
-        filter_paths = [
-            r"location\s+/api/",
-            r"location\s+/admin/api/files/upload/",
-            r"location\s+/papi/",
-            r"location\s+/www",
-            r"location\s+/",
-            r"location\s+/authcenter/",
-            r"location\s+/usercenter/",
-            r"location\s+/permissions/",
-            r"location\s+/wish3dearth/",
-            r"location\s+/datamanage/",
-            r"location\s+~\s+\^/wish3dearth/static/v1\.0\.0/cad/api/v1/map/\(.*\)\$"
-        ]
-        
         # 创建对话框
         dialog = tk.Toplevel(self.root)
         dialog.title("添加反向代理配置")
@@ -1534,31 +1743,14 @@ class ServiceManagerApp:
             if not suffix.startswith('/'):
                 suffix = '/' + suffix
             
-            # 读取nginx配置文件
+            # 在配置锁内添加location并用 nginx -t 校验，失败时恢复原配置
             try:
-                with open(nginx_conf, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 查找server_name行
-                server_block = re.search(r'server\s*{[^}]*server_name[^;]*;', content, re.DOTALL)
-                if not server_block:
-                    messagebox.showerror("错误", "无法在配置文件中找到server配置块")
+                middleware_name = next(name for name, info in self.middlewares.items() if info == middleware_info)
+                if not self.add_nginx_proxy(middleware_name, suffix, target):
                     return
                 
-                # 构建新的location配置
-                location_config = f"\n    location {suffix} {{\n        proxy_pass {target};\n    }}"
-                
-                # 在server_name后插入location配置
-                insert_pos = server_block.end()
-                new_content = content[:insert_pos] + location_config + content[insert_pos:]
-                
-                # 写入配置文件
-                with open(nginx_conf, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                
                 # 重载nginx
-                self.reload_middleware(next(name for name, info in self.middlewares.items() 
-                                         if info == middleware_info))
+                self.reload_middleware(middleware_name)
                 
                 messagebox.showinfo("成功", "代理配置已添加并重载nginx")
                 dialog.destroy()
@@ -1598,21 +1790,6 @@ class ServiceManagerApp:
             messagebox.showwarning("警告", "未找到nginx配置文件")
             return
         
-        # 定义需要过滤的路径列表
-        filter_paths = [
-            r"location\s+/api/",
-            r"location\s+/admin/api/files/upload/",
-            r"location\s+/papi/",
-            r"location\s+/w(?:\s|{)",
-            r"location\s+/(?:\s|{)",
-            r"location\s+/authcenter/",
-            r"location\s+/usercenter/",
-            r"location\s+/permissions/",
-            r"location\s+/wish3dearth/",
-            r"location\s+/datamanage/",
-            r"location\s+~\s+\^/wish3dearth/static/v1\.0\.0/cad/api/v1/map/\(.*\)\$"
-        ]
-        
         # 创建对话框
         dialog = tk.Toplevel(self.root)
         dialog.title("查看代理配置")
@@ -1640,30 +1817,10 @@ class ServiceManagerApp:
         scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
         tree.configure(yscrollcommand=scrollbar.set)
         
-        # 读取nginx配置文件并解析代理配置
+        # 解析nginx配置（按文件修改时间缓存），内置的location不显示
         try:
-            with open(nginx_conf, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # 使用正则表达式查找所有location配置
-            locations = re.finditer(r'location\s+([^{]+)\s*{\s*proxy_pass\s+([^;]+);', content)
-            
-            # 添加到表格中，但过滤掉指定的路径
-            for match in locations:
-                location_block = f"location {match.group(1)}"
-                
-                # 检查是否需要过滤
-                should_filter = False
-                for filter_path in filter_paths:
-                    if re.match(filter_path, location_block.strip()):
-                        should_filter = True
-                        break
-                
-                # 如果不需要过滤，则添加到表格中
-                if not should_filter:
-                    path = match.group(1).strip()
-                    target = match.group(2).strip()
-                    tree.insert("", tk.END, values=(path, target))
+            for proxy in self.get_nginx_proxies(nginx_conf):
+                tree.insert("", tk.END, values=(proxy["path"], proxy["target"]))
                 
         except Exception as e:
             messagebox.showerror("错误", f"读取nginx配置文件失败: {e}")
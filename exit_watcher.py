@@ -0,0 +1,182 @@
+import threading
+import time
+
+import psutil
+
+from process_backend import PROCESS_ERRORS
+
+try:
+    import win32api
+    import win32con
+    import win32event
+except ImportError:
+    win32event = None
+
+
+# WaitForMultipleObjects 一次最多等待64个句柄，留一个给唤醒事件
+WIN32_WAIT_CHUNK = 63
+
+
+class ExitWatcher:
+    """进程退出监视
+
+    在后台线程中等待PID跟踪器中的进程退出，进程一退出就调用 on_exit(key, pid)，
+    不必等到下一个状态检查周期，也不需要额外扫描进程表：
+      - Windows 上打开进程句柄，用 WaitForMultipleObjects 等待
+      - 其他平台用 psutil.wait_procs 等待
+      - 假进程后端（测试）按 poll_interval 轮询
+    跟踪器开始跟踪新的PID时通过 tracker.on_track 唤醒监视线程，重新构建等待列表。
+    """
+
+    def __init__(self, tracker, on_exit, poll_interval=0.5):
+        self.tracker = tracker
+        self.on_exit = on_exit
+        self.poll_interval = poll_interval
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+        self.waitables = {}     # (pid, create_time) -> 进程句柄或 psutil.Process
+        self.exits = 0
+        self.last_exit = None
+
+        if getattr(tracker.backend, "name", "") == "fake":
+            self.mode = "poll"
+        elif win32event is not None:
+            self.mode = "win32"
+            self.wake_handle = win32event.CreateEvent(None, False, False, None)
+        else:
+            self.mode = "psutil"
+
+        tracker.on_track = self.refresh
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="exit-watcher")
+        self.thread.start()
+
+    def refresh(self):
+        """跟踪的进程有变化，唤醒监视线程重新构建等待列表"""
+        self.wake.set()
+        if self.mode == "win32":
+            win32event.SetEvent(self.wake_handle)
+
+    def stop(self):
+        self.running = False
+        self.refresh()
+
+    def _run(self):
+        while self.running:
+            watched = self.tracker.tracked_items()
+            self._release(watched)
+            if not watched:
+                self.wake.wait(5)
+                self.wake.clear()
+                continue
+            try:
+                exited = getattr(self, f"_wait_{self.mode}")(watched)
+            except Exception as e:
+                print(f"进程退出监视失败: {e}")
+                time.sleep(self.poll_interval)
+                continue
+            for key, pid in exited:
+                self._report(key, pid)
+
+    def _report(self, key, pid):
+        # 跟踪器中已经是别的PID（对象被重新启动）时忽略
+        if not self.tracker.mark_exited(key, pid):
+            return
+        with self.lock:
+            self.exits += 1
+            self.last_exit = {"target": "{}:{}".format(*key), "pid": pid, "time": time.time()}
+        try:
+            self.on_exit(key, pid)
+        except Exception as e:
+            print(f"处理进程退出失败 {key}: {e}")
+
+    def _release(self, watched):
+        """释放不再跟踪的进程的句柄"""
+        current = set(watched.values())
+        for entry in list(self.waitables):
+            if entry not in current:
+                waitable = self.waitables.pop(entry)
+                if self.mode == "win32" and waitable is not None:
+                    win32api.CloseHandle(waitable)
+
+    def _wait_poll(self, watched):
+        self.wake.wait(self.poll_interval)
+        self.wake.clear()
+        backend = self.tracker.backend
+        return [(key, pid) for key, (pid, create_time) in watched.items()
+                if not backend.is_same_process(pid, create_time)]
+
+    def _process(self, pid, create_time):
+        """缓存的 psutil.Process，进程已退出或PID已被复用时返回None"""
+        entry = (pid, create_time)
+        if entry not in self.waitables:
+            try:
+                proc = psutil.Process(pid)
+                self.waitables[entry] = proc if proc.create_time() == create_time else None
+            except PROCESS_ERRORS:
+                self.waitables[entry] = None
+        return self.waitables[entry]
+
+    def _wait_psutil(self, watched):
+        exited = []
+        procs = {}
+        for key, (pid, create_time) in watched.items():
+            proc = self._process(pid, create_time)
+            if proc is None:
+                exited.append((key, pid))
+            else:
+                procs[proc] = key
+        if exited:
+            return exited
+        self.wake.clear()
+        # 回调在进程退出时立即执行，不等待 wait_procs 超时返回
+        psutil.wait_procs(list(procs), timeout=self.poll_interval,
+                          callback=lambda proc: self._report(procs[proc], proc.pid))
+        return []
+
+    def _handle(self, pid, create_time):
+        """打开进程的同步句柄，进程已退出或PID已被复用时返回None"""
+        entry = (pid, create_time)
+        if entry not in self.waitables:
+            try:
+                handle = win32api.OpenProcess(win32con.SYNCHRONIZE, False, pid)
+            except Exception:
+                handle = None
+            # 打开句柄后再确认仍是同一个进程，之后句柄会一直指向它
+            if handle is not None and not self.tracker.backend.is_same_process(pid, create_time):
+                win32api.CloseHandle(handle)
+                handle = None
+            self.waitables[entry] = handle
+        return self.waitables[entry]
+
+    def _wait_win32(self, watched):
+        exited = []
+        items = []
+        for key, (pid, create_time) in watched.items():
+            handle = self._handle(pid, create_time)
+            if handle is None:
+                exited.append((key, pid))
+            else:
+                items.append((key, pid, handle))
+        if exited:
+            return exited
+
+        chunks = [items[i:i + WIN32_WAIT_CHUNK] for i in range(0, len(items), WIN32_WAIT_CHUNK)]
+        # 只有一组时一直等待到有进程退出或被唤醒，超过64个进程时轮流等待各组
+        timeout = 5000 if len(chunks) == 1 else max(1, int(self.poll_interval * 1000 / len(chunks)))
+        for chunk in chunks:
+            handles = [handle for _, _, handle in chunk] + [self.wake_handle]
+            result = win32event.WaitForMultipleObjects(handles, False, timeout)
+            index = result - win32event.WAIT_OBJECT_0
+            if 0 <= index < len(chunk):
+                key, pid, _ = chunk[index]
+                return [(key, pid)]
+            if index == len(chunk):
+                break
+        self.wake.clear()
+        return []
+
+    def stats(self):
+        with self.lock:
+            return {"mode": self.mode, "watching": len(self.waitables), "exits": self.exits,
+                    "last_exit": dict(self.last_exit) if self.last_exit else None}
@@ -0,0 +1,143 @@
+import os
+import string
+import threading
+from collections import OrderedDict
+
+try:
+    import win32api
+except ImportError:
+    win32api = None
+
+
+# 选择启动脚本、jar包时默认只显示的文件类型（目录总是显示）
+DEFAULT_EXTENSIONS = (".jar", ".bat", ".exe")
+SORT_KEYS = {
+    "name": lambda item: item["name"].lower(),
+    "mtime": lambda item: item["mtime"] or 0,
+    "size": lambda item: item["size"] or 0,
+}
+
+
+def list_drives():
+    """Windows 上返回盘符列表（C:、D: ...），其他平台返回根目录"""
+    if os.name != "nt":
+        return ["/"]
+    if win32api is not None:
+        drives = win32api.GetLogicalDriveStrings().split("\0")
+        return [drive.rstrip("\\") for drive in drives if drive]
+    return [f"{letter}:" for letter in string.ascii_uppercase if os.path.exists(f"{letter}:\\")]
+
+
+def normalize_path(path):
+    """页面拼出的路径（C:、C:\\sdk/service 等）转换为规范的绝对路径"""
+    path = os.path.expanduser(path.strip().strip('"'))
+    drive, rest = os.path.splitdrive(path)
+    if drive and not rest:
+        # "C:" 表示C盘的当前目录，这里按盘符根目录处理
+        path = drive + os.sep
+    path = os.path.normpath(os.path.abspath(path))
+    if os.name != "nt" and path.startswith("//"):
+        path = "/" + path.lstrip("/")
+    return path
+
+
+def _entry_info(entry):
+    # Windows 上 scandir 返回的目录项已带有类型和大小，不需要再逐个访问磁盘
+    try:
+        is_dir = entry.is_dir()
+        stat = entry.stat()
+        return {"name": entry.name, "is_dir": is_dir, "size": None if is_dir else stat.st_size,
+                "mtime": stat.st_mtime}
+    except OSError:
+        return {"name": entry.name, "is_dir": False, "size": None, "mtime": None}
+
+
+class DirectoryCache:
+    """目录列表缓存（最多 max_entries 个目录，最久未用的先移除）
+
+    目录的修改时间变化（有文件被新建、删除或改名）时重新读取。
+    过滤和排序的结果也随目录一起缓存，翻页时只做切片。
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()    # 目录 -> (修改时间, 目录项列表, {(排序, 倒序, 扩展名): 排序后的列表})
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def scan(self, directory):
+        """返回 (目录项列表, 排序视图缓存)，目录修改时间变化时重新读取"""
+        mtime = os.stat(directory).st_mtime_ns
+        with self.lock:
+            cached = self.entries.get(directory)
+            if cached is not None and cached[0] == mtime:
+                self.entries.move_to_end(directory)
+                self.hits += 1
+                return cached[1], cached[2]
+            self.misses += 1
+        with os.scandir(directory) as iterator:
+            items = [_entry_info(entry) for entry in iterator]
+        views = {}
+        with self.lock:
+            self.entries[directory] = (mtime, items, views)
+            self.entries.move_to_end(directory)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return items, views
+
+    def view(self, directory, sort, reverse, extensions):
+        """过滤并排序后的目录项（目录在前），翻页时直接使用缓存的结果"""
+        items, views = self.scan(directory)
+        if sort not in SORT_KEYS:
+            sort = "name"
+        if extensions is not None:
+            extensions = tuple(sorted(extension.lower() for extension in extensions))
+        view_key = (sort, reverse, extensions)
+        result = views.get(view_key)
+        if result is None:
+            if extensions is not None:
+                items = [item for item in items if item["is_dir"] or item["name"].lower().endswith(extensions)]
+            key = SORT_KEYS[sort]
+            directories = sorted((item for item in items if item["is_dir"]), key=key, reverse=reverse)
+            files = sorted((item for item in items if not item["is_dir"]), key=key, reverse=reverse)
+            result = views[view_key] = directories + files
+        return result
+
+    def browse(self, path, offset=0, limit=500, sort="name", reverse=False, extensions=DEFAULT_EXTENSIONS):
+        """列出目录内容，目录在前，按 sort 排序后返回 [offset, offset+limit) 项
+
+        path 为空时返回盘符列表；path 是文件时列出其所在目录，并在 file 中返回文件名。
+        extensions 为 None 时显示全部文件。
+        """
+        if not path:
+            items = [{"name": drive, "is_dir": True, "size": None, "mtime": None} for drive in list_drives()]
+            return {"path": "", "parent": None, "is_dir": True, "items": items, "total": len(items),
+                    "offset": 0, "has_more": False}
+
+        path = normalize_path(path)
+        selected = None
+        if os.path.isfile(path):
+            path, selected = os.path.split(path)
+        if not os.path.isdir(path):
+            raise FileNotFoundError("路径不存在")
+
+        items = self.view(path, sort, reverse, extensions)
+
+        offset = max(0, offset)
+        page = items[offset:offset + max(1, limit)]
+        parent = os.path.dirname(path)
+        return {
+            "path": path,
+            "parent": parent if parent != path else "",
+            "is_dir": True,
+            "file": selected,
+            "items": page,
+            "total": len(items),
+            "offset": offset,
+            "has_more": offset + len(page) < len(items)
+        }
+
+    def stats(self):
+        with self.lock:
+            return {"directories": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,138 @@
+import os
+import threading
+
+# Java可执行文件名，用于 -jar 参数的精确匹配
+JAVA_EXE_NAMES = {"java", "java.exe", "javaw", "javaw.exe"}
+
+
+class AhoCorasick:
+    """Aho-Corasick多模式匹配自动机，一次扫描文本即可找出所有命中的模式"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]       # 状态 -> {字符: 下一状态}
+        self.fail = [0]
+        self.output = [[]]     # 状态 -> 命中的模式序号列表
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(index)
+
+        # 广度优先构建失败指针
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """返回文本中命中的模式序号集合"""
+        found = set()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class JarMatcher:
+    """Java进程命令行分类器
+
+    根据 java_services 中配置的 jar_name 编译：
+      - java/javaw 进程的 -jar 参数按文件名做字典精确匹配
+      - 其余情况用Aho-Corasick自动机一次扫描命令行，替代 进程数 x jar数 的子串嵌套循环
+    """
+
+    def __init__(self, java_services):
+        self.signature = self.make_signature(java_services)
+        self.by_jar_file = {}   # 小写jar文件名 -> [服务名]
+        patterns = {}           # 小写jar_name -> [服务名]
+        for service_name, jar_name in self.signature:
+            if not jar_name:
+                continue
+            patterns.setdefault(jar_name.lower(), []).append(service_name)
+            self.by_jar_file.setdefault(os.path.basename(jar_name).lower(), []).append(service_name)
+
+        self.pattern_names = list(patterns.values())
+        self.automaton = AhoCorasick(patterns.keys())
+        # 所有模式都以.jar结尾时，命令行中不含.jar的进程不可能命中，可以直接跳过
+        self.jar_only = all(pattern.endswith('.jar') for pattern in patterns)
+
+    @staticmethod
+    def make_signature(java_services):
+        return tuple(sorted(
+            (name, info.get("jar_name", "") or "") for name, info in java_services.items()
+        ))
+
+    @staticmethod
+    def _jar_argument(cmdline):
+        """取出 -jar 后面的jar文件名"""
+        for index, arg in enumerate(cmdline[:-1]):
+            if arg == "-jar":
+                return os.path.basename(cmdline[index + 1].strip('"').replace('\\', '/')).lower()
+        return None
+
+    def classify(self, info):
+        """返回该进程命中的服务名列表"""
+        cmdline = info.get('cmdline')
+        if not cmdline or not self.pattern_names:
+            return []
+
+        name = (info.get('name') or "").lower()
+        if name in JAVA_EXE_NAMES:
+            jar_file = self._jar_argument(cmdline)
+            if jar_file and jar_file in self.by_jar_file:
+                return self.by_jar_file[jar_file]
+
+        text = " ".join(cmdline).lower()
+        if self.jar_only and '.jar' not in text:
+            return []
+        matched = []
+        for index in sorted(self.automaton.search(text)):
+            matched.extend(self.pattern_names[index])
+        return matched
+
+    def match(self, processes):
+        """对一组进程信息分类，返回 {服务名: pid}"""
+        result = {}
+        for info in processes:
+            for service_name in self.classify(info):
+                result[service_name] = info['pid']
+        return result
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_jar_matcher(java_services):
+    """获取当前配置对应的匹配器，只有 java_services 变化时才重新编译"""
+    global _matcher
+    signature = JarMatcher.make_signature(java_services)
+    with _matcher_lock:
+        if _matcher is None or _matcher.signature != signature:
+            _matcher = JarMatcher(java_services)
+        return _matcher
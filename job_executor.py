@@ -0,0 +1,167 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class JobExecutor:
+    """异步操作执行器
+
+    启动/停止/重启/重载等操作提交后立即返回任务ID，由线程池在后台执行，
+    任务的进度和结果通过 notify 回调（Socket.IO）推送，也可以按ID查询。
+    操作函数形如 func(report)，report(progress, message) 用于汇报进度
+    （report.job_id 为当前任务ID），返回 {"status": "success"/"error", "message": ...}。
+    """
+
+    def __init__(self, max_workers=4, notify=None, max_history=200):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.notify = notify
+        self.max_history = max_history
+        self.jobs = OrderedDict()   # 任务ID -> 任务信息
+        self.totals = {}            # (类型, 操作, 结果) -> [次数, 总耗时(秒)]
+        self.lock = threading.Lock()
+
+    def _emit(self, job_id):
+        with self.lock:
+            job = dict(self.jobs[job_id]) if job_id in self.jobs else None
+        if job and self.notify:
+            try:
+                self.notify('job_update', job)
+            except Exception as e:
+                print(f"任务状态推送失败: {e}")
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+        self._emit(job_id)
+
+    def submit(self, kind, target, action, func):
+        """提交操作，返回任务信息（包含任务ID）"""
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "target": target,
+            "action": action,
+            "status": "queued",
+            "progress": 0,
+            "message": "等待执行",
+            "result": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+            # 只保留最近的任务记录
+            while len(self.jobs) > self.max_history:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if oldest["status"] in ("queued", "running"):
+                    break
+                del self.jobs[oldest_id]
+            snapshot = dict(job)
+        self._emit(job_id)
+        self.executor.submit(self._run, job_id, func)
+        return snapshot
+
+    def _run(self, job_id, func):
+        self._update(job_id, status="running", started_at=time.time(), message="执行中")
+
+        def report(progress, message=None):
+            fields = {"progress": progress}
+            if message:
+                fields["message"] = message
+            self._update(job_id, **fields)
+        report.job_id = job_id
+
+        try:
+            result = func(report) or {"status": "success", "message": "完成"}
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                total_key = (job["kind"], job["action"], result.get("status", "success"))
+                total = self.totals.setdefault(total_key, [0, 0.0])
+                total[0] += 1
+                total[1] += time.time() - job["started_at"]
+        self._update(job_id,
+                     status=result.get("status", "success"),
+                     message=result.get("message", ""),
+                     result=result,
+                     progress=100,
+                     finished_at=time.time())
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, limit=50):
+        with self.lock:
+            jobs = list(self.jobs.values())[-limit:]
+            return [dict(job) for job in reversed(jobs)]
+
+    def stats(self):
+        """按 (类型, 操作, 结果) 统计的累计次数和总耗时（秒），不受任务记录数量限制"""
+        with self.lock:
+            return [{"kind": kind, "action": action, "status": status, "count": count, "duration": duration}
+                    for (kind, action, status), (count, duration) in self.totals.items()]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def run_batch(targets, run, concurrency, on_result=None, report=None):
+    """并行执行一批操作，返回与 targets 一一对应的结果列表
+
+    targets 为 [{"kind", "name", "action", "error"}]，带 error 的项不执行，直接记为失败；
+    其余项在最多 concurrency 个线程中调用 run(target)，抛出的异常记为失败。
+    每项完成时调用 on_result(index, result)，并通过 report(progress, message) 汇报整体进度。
+    """
+    total = len(targets)
+    results = [None] * total
+
+    def finish(index, result):
+        target = targets[index]
+        results[index] = {
+            "kind": target["kind"],
+            "name": target["name"],
+            "action": target["action"],
+            "status": result.get("status", "error"),
+            "message": result.get("message", "")
+        }
+        if on_result:
+            try:
+                on_result(index, results[index])
+            except Exception as e:
+                print(f"批量操作进度推送失败: {e}")
+
+    def run_one(index):
+        try:
+            return run(targets[index])
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    # 校验失败的对象直接记录错误，不占用工作线程
+    runnable = []
+    for index, target in enumerate(targets):
+        if target.get("error"):
+            finish(index, {"status": "error", "message": target["error"]})
+        else:
+            runnable.append(index)
+
+    done = total - len(runnable)
+    if runnable:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk") as pool:
+            futures = {pool.submit(run_one, index): index for index in runnable}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+                done += 1
+                if report:
+                    report(int(done * 100 / total), f"已完成 {done}/{total}")
+    return results
@@ -0,0 +1,150 @@
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+
+import psutil
+
+from process_backend import PROCESS_ERRORS, get_backend
+from process_snapshot import ProcessSnapshot
+
+# cmd 的 start 命令前缀（可带窗口标题），由启动器改为直接在新控制台中创建进程
+START_PREFIX_RE = re.compile(r'^\s*start\s+(?:"[^"]*"\s+)?', re.IGNORECASE)
+
+CREATE_NEW_CONSOLE = getattr(subprocess, "CREATE_NEW_CONSOLE", 0)
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def parse_command(command, cwd=None):
+    """把配置中的启动命令转换为 (命令, 是否使用shell, 是否新建控制台)
+
+    "start nginx.exe"、'start "" "xxx.bat"' 这类命令去掉 start 前缀后直接创建进程，
+    这样新进程仍是启动器的子进程，可以立即取得它的PID。
+    相对路径按启动时的工作目录 cwd（而不是管理程序自身的当前目录）解析。
+    """
+    new_console = False
+    match = START_PREFIX_RE.match(command)
+    if match:
+        command = command[match.end():]
+        new_console = True
+    stripped = command.strip().strip('"')
+    if stripped.lower().endswith((".bat", ".cmd", ".exe")):
+        path = os.path.abspath(os.path.join(cwd or "", stripped))
+        if os.path.isfile(path):
+            return [path], False, new_console
+    return command, True, new_console
+
+
+class Launcher:
+    """受管对象的启动器
+
+    使用 subprocess.Popen 以指定的工作目录和环境变量创建进程（不调用 os.chdir，
+    不通过 os.system('start ...')），启动后立即取得进程及其子进程树，
+    在这棵树里（而不是整个进程表）用 detect 找出真正的目标进程（java.exe、nginx主进程等），
+    调用方把它登记到PID跟踪器，操作返回时状态就已经是准确的。
+    """
+
+    def __init__(self, backend=None, timeout=5, poll_interval=0.1, max_history=50):
+        self._backend = backend
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.children = {}      # 启动的进程PID -> Popen（用于回收）
+        self.history = deque(maxlen=max_history)
+        self.lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _reap(self):
+        with self.lock:
+            for pid, popen in list(self.children.items()):
+                if popen.poll() is not None:
+                    del self.children[pid]
+
+    @staticmethod
+    def process_tree(pid):
+        """返回进程及其全部子孙进程的PID（父进程在前）"""
+        try:
+            proc = psutil.Process(pid)
+            return [pid] + [child.pid for child in proc.children(recursive=True)]
+        except PROCESS_ERRORS:
+            return []
+
+    def _snapshot(self, pids):
+        infos = []
+        for pid in pids:
+            info = self.backend.process_info(pid, ProcessSnapshot.ATTRS)
+            if info:
+                infos.append(info)
+        return ProcessSnapshot(processes=infos, backend=self.backend)
+
+    def launch(self, key, command, cwd=None, env=None, detect=None, timeout=None, new_console=None, capture=None):
+        """启动对象，返回 {"pid", "tree", "target_pid", "create_time"}
+
+        command: 命令字符串或参数列表
+        env:     额外的环境变量，与当前进程的环境合并
+        new_console: 是否在新的控制台窗口中运行（Windows），None 时由命令中的 start 前缀决定
+        detect:  detect(snapshot) -> pid，在子进程树的快照中识别目标进程；
+                 timeout 秒内未识别到时 target_pid 为 None，由调用方退回全量扫描
+        capture: capture(popen)，指定时 stdout/stderr 重定向到管道交给它读取，
+                 此时不再打开控制台窗口
+        """
+        self._reap()
+        if isinstance(command, str):
+            args, shell, start_prefix = parse_command(command, cwd)
+        else:
+            args, shell, start_prefix = list(command), False, False
+        if new_console is None:
+            new_console = start_prefix
+        environ = None
+        if env:
+            environ = dict(os.environ)
+            environ.update({str(name): str(value) for name, value in env.items()})
+
+        if capture:
+            popen = subprocess.Popen(args, shell=shell, cwd=cwd or None, env=environ,
+                                     stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     creationflags=CREATE_NO_WINDOW)
+            capture(popen)
+        else:
+            popen = subprocess.Popen(args, shell=shell, cwd=cwd or None, env=environ,
+                                     creationflags=CREATE_NEW_CONSOLE if new_console else 0)
+        with self.lock:
+            self.children[popen.pid] = popen
+
+        started = time.time()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        tree = [popen.pid]
+        target_pid = None
+        while detect is not None:
+            tree = self.process_tree(popen.pid) or tree
+            target_pid = detect(self._snapshot(tree))
+            if target_pid or time.time() >= deadline or popen.poll() is not None:
+                break
+            time.sleep(self.poll_interval)
+        if detect is not None and not target_pid and popen.poll() is not None:
+            # 启动脚本已经退出（例如用 start 再次转交），最后再看一次它留下的子进程
+            target_pid = detect(self._snapshot(tree))
+
+        create_time = self.backend.create_time(target_pid) if target_pid else None
+        record = {
+            "target": "{}:{}".format(*key),
+            "pid": popen.pid,
+            "tree": tree,
+            "target_pid": target_pid,
+            "create_time": create_time,
+            "cwd": cwd,
+            "started_at": started,
+            "elapsed": round(time.time() - started, 3)
+        }
+        with self.lock:
+            self.history.append(record)
+        return dict(record)
+
+    def stats(self):
+        self._reap()
+        with self.lock:
+            return {"running": sorted(self.children), "recent": list(reversed(self.history))}
@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LockManager:
+    """按受管对象划分的操作锁
+
+    每个对象（Windows服务、Java进程、中间件）有独立的锁，不相关对象的启动、停止、
+    重载可以并行执行，同一对象上的并发操作仍然互斥。对象可以加入若干锁组
+    （例如共用端口或工作目录、相互依赖的对象），同组对象的操作相互排斥。
+    每次加锁的等待时间都会记录，便于观察锁竞争情况。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}     # 锁key -> threading.Lock
+        self.groups = {}    # 对象key -> 所属锁组
+        self.holders = {}   # 锁key -> (操作名称, 开始持有时间)
+        self.waits = {}     # 锁key -> 等待时间统计
+
+    def _lock_for(self, key):
+        with self.lock:
+            lock = self.locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self.locks[key] = lock
+            return lock
+
+    def set_groups(self, key, groups):
+        """设置对象所属的锁组，groups为空时清除"""
+        groups = tuple(sorted(set(group for group in groups or () if group)))
+        with self.lock:
+            if groups:
+                self.groups[key] = groups
+            else:
+                self.groups.pop(key, None)
+
+    def forget(self, key):
+        """对象被删除后清理其锁和统计信息（正在持有的锁保留到释放为止）"""
+        with self.lock:
+            self.groups.pop(key, None)
+            if key not in self.holders:
+                self.locks.pop(key, None)
+                self.waits.pop(key, None)
+
+    def lock_keys(self, key):
+        """对象操作需要获取的全部锁，按固定顺序排列（先锁组后对象）以避免死锁"""
+        with self.lock:
+            groups = self.groups.get(key, ())
+        return [("group", group) for group in groups] + [key]
+
+    def _record_wait(self, key, waited, action):
+        with self.lock:
+            stats = self.waits.get(key)
+            if stats is None:
+                stats = {"acquired": 0, "contended": 0, "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0}
+                self.waits[key] = stats
+            stats["acquired"] += 1
+            stats["total_wait"] += waited
+            stats["last_wait"] = waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            if waited > 0.001:
+                stats["contended"] += 1
+            self.holders[key] = (action, time.time())
+
+    @contextmanager
+    def hold(self, key, action=None, timeout=None):
+        """持有对象（及其锁组）的操作锁
+
+        timeout 为 None 时一直等待，否则超时抛出 TimeoutError。
+        """
+        acquired = []
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        try:
+            for lock_key in self.lock_keys(key):
+                lock = self._lock_for(lock_key)
+                start = time.perf_counter()
+                if deadline is None:
+                    lock.acquire()
+                elif not lock.acquire(timeout=max(0, deadline - start)):
+                    raise TimeoutError(f"等待操作锁超时: {self.format_key(lock_key)}")
+                acquired.append((lock_key, lock))
+                self._record_wait(lock_key, time.perf_counter() - start, action)
+            yield
+        finally:
+            for lock_key, lock in reversed(acquired):
+                with self.lock:
+                    self.holders.pop(lock_key, None)
+                lock.release()
+
+    def is_busy(self, key):
+        """对象当前是否有操作在执行"""
+        with self.lock:
+            return key in self.holders
+
+    @staticmethod
+    def format_key(key):
+        return "{}:{}".format(*key) if isinstance(key, tuple) else str(key)
+
+    def stats(self):
+        """返回每个锁的持有者和等待时间统计（毫秒）"""
+        now = time.time()
+        with self.lock:
+            result = {}
+            for key in set(self.waits) | set(self.holders):
+                stats = self.waits.get(key, {})
+                holder = self.holders.get(key)
+                acquired = stats.get("acquired", 0)
+                result[self.format_key(key)] = {
+                    "held_by": holder[0] if holder else None,
+                    "held_for": round(now - holder[1], 3) if holder else None,
+                    "acquired": acquired,
+                    "contended": stats.get("contended", 0),
+                    "avg_wait": round(stats.get("total_wait", 0) / acquired * 1000, 3) if acquired else 0,
+                    "max_wait": round(stats.get("max_wait", 0) * 1000, 3),
+                    "last_wait": round(stats.get("last_wait", 0) * 1000, 3)
+                }
+            return {
+                "locks": result,
+                "groups": {self.format_key(key): list(groups) for key, groups in self.groups.items()}
+            }
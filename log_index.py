@@ -0,0 +1,289 @@
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from output_store import decode_line
+
+
+INDEX_SUFFIX = ".lineidx"
+INDEX_MAGIC = b"LIDX2\0\0\0"
+HEAD_BYTES = 64
+# 索引文件头：魔数、已索引的字节数、行数、文件ID（inode/NTFS文件索引号）、文件开头字节数、
+# 文件开头的内容（文件ID和开头内容用于识别日志轮转）
+HEADER = struct.Struct(f"<8sQQQI{HEAD_BYTES}s")
+SCAN_CHUNK = 4 * 1024 * 1024
+
+
+class LineIndex:
+    """大日志文件的行偏移索引
+
+    ends[i] 为第 i 行（含换行符）结束后的偏移，第 i 行的内容是 [ends[i-1], ends[i])，
+    最后一个换行符之后未结束的内容作为最后一行返回。索引保存在日志文件旁的
+    <文件名>.lineidx 中，文件增长后只扫描新增部分并追加到索引文件；
+    文件变小、文件ID或开头内容改变（被轮转或清空），或者大小不变但修改时间变化（被原地改写）时重建。
+    目录不可写时只保存在内存中。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.ends = array('Q')
+        self.indexed = 0          # 已索引到的偏移（最后一个换行符之后）
+        self.head = b""
+        self.size = 0
+        self.file_id = 0          # 建立索引时文件的 st_ino
+        self.mtime = None         # 上次刷新时文件的修改时间（纳秒），只保存在内存中
+        self.persist = True
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, indexed, count, file_id, head_len, head = HEADER.unpack(f.read(HEADER.size))
+                if magic != INDEX_MAGIC:
+                    return
+                ends = array('Q')
+                ends.frombytes(f.read(count * ends.itemsize))
+        except (OSError, struct.error):
+            return
+        if len(ends) != count:
+            return
+        self.ends = ends
+        self.indexed = indexed
+        self.file_id = file_id
+        self.head = head[:head_len]
+
+    def _read_head(self, mapped):
+        return bytes(mapped[:HEAD_BYTES])
+
+    def _save(self, appended_from):
+        """把新增的偏移追加到索引文件，再更新文件头（中途失败时以文件头中的行数为准）"""
+        if not self.persist:
+            return
+        try:
+            mode = 'r+b' if appended_from and os.path.exists(self.index_path) else 'wb'
+            with open(self.index_path, mode) as f:
+                if mode == 'wb':
+                    f.write(b"\0" * HEADER.size)
+                    appended_from = 0
+                f.seek(HEADER.size + appended_from * self.ends.itemsize)
+                f.write(self.ends[appended_from:].tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(HEADER.pack(INDEX_MAGIC, self.indexed, len(self.ends), self.file_id, len(self.head),
+                                    self.head.ljust(HEAD_BYTES, b"\0")))
+        except OSError as e:
+            print(f"无法保存日志索引 {self.index_path}，改为只在内存中保存: {e}")
+            self.persist = False
+
+    def _reset(self):
+        self.ends = array('Q')
+        self.indexed = 0
+        self.head = b""
+        self.size = 0
+
+    def refresh(self):
+        """文件有变化时增量更新索引，返回当前文件大小"""
+        with self.lock:
+            stat = os.stat(self.path)
+            size = stat.st_size
+            if (size == self.size and size >= self.indexed and stat.st_mtime_ns == self.mtime
+                    and stat.st_ino == self.file_id):
+                return size
+            with open(self.path, 'rb') as f:
+                # 打开后重新取大小：日志可能在两次调用之间被截断，映射长度不能超过文件大小
+                stat = os.fstat(f.fileno())
+                size = stat.st_size
+                if size == 0:
+                    self._reset()
+                    return 0
+                mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+                try:
+                    head = self._read_head(mapped)
+                    known = self.head[:len(head)]
+                    # 日志只会追加：大小不变而修改时间变化说明文件被原地改写
+                    rewritten = size == self.size and stat.st_mtime_ns != self.mtime
+                    if (size < self.indexed or head[:len(known)] != known or rewritten
+                            or stat.st_ino != self.file_id):
+                        # 文件被轮转、清空或改写，重建索引
+                        self.ends = array('Q')
+                        self.indexed = 0
+                    appended_from = len(self.ends)
+                    position = self.indexed
+                    find = mapped.find
+                    append = self.ends.append
+                    while True:
+                        newline = find(b"\n", position)
+                        if newline < 0:
+                            break
+                        position = newline + 1
+                        append(position)
+                    self.indexed = position
+                    self.head = head
+                    self.file_id = stat.st_ino
+                finally:
+                    mapped.close()
+            self.size = size
+            self.mtime = stat.st_mtime_ns
+            if len(self.ends) != appended_from or appended_from == 0:
+                self._save(appended_from)
+            return size
+
+    @property
+    def total(self):
+        """总行数（包括最后未结束的一行）"""
+        return len(self.ends) + (1 if self.size > self.indexed else 0)
+
+    def line_range(self, line):
+        start = self.ends[line - 1] if line > 0 else 0
+        end = self.ends[line] if line < len(self.ends) else self.size
+        return start, end
+
+    def line_of(self, offset):
+        """偏移所在的行号"""
+        return bisect_right(self.ends, offset)
+
+    def read_lines(self, start, count):
+        """读取 [start, start+count) 行，返回 [(行号, 文本)]"""
+        with self.lock:
+            total = self.total
+            start = max(0, start)
+            stop = min(total, start + max(0, count))
+            if start >= stop:
+                return []
+            begin = self.line_range(start)[0]
+            end = self.line_range(stop - 1)[1]
+            bounds = [self.line_range(line) for line in range(start, stop)]
+        with open(self.path, 'rb') as f:
+            f.seek(begin)
+            data = f.read(end - begin)
+        return [(start + i, decode_line(data[s - begin:e - begin].rstrip(b"\r\n")))
+                for i, (s, e) in enumerate(bounds)]
+
+    def search(self, pattern, start=0, max_matches=200, time_limit=10, progress=None):
+        """从第 start 行开始按正则搜索，逐个产生 (行号, 文本)
+
+        按大块读取并直接在字节上匹配，只对命中的位置通过索引换算行号。
+        progress 字典中会写入 next_line（下次继续搜索的起始行）和 complete（是否已搜索到文件末尾）。
+        """
+        if progress is None:
+            progress = {}
+        regex = re.compile(pattern.encode("utf-8") if isinstance(pattern, str) else pattern, re.MULTILINE)
+        with self.lock:
+            size = self.size
+            offset = self.line_range(start)[0] if start < self.total else size
+        deadline = time.time() + time_limit
+        found = 0
+        last_line = -1
+        progress.update(next_line=start, complete=offset >= size)
+        if offset >= size:
+            return
+        with open(self.path, 'rb') as f:
+            # 索引之后文件可能被截断，按实际大小映射
+            size = min(size, os.fstat(f.fileno()).st_size)
+            if offset >= size:
+                progress.update(complete=True)
+                return
+            mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            try:
+                while offset < size and found < max_matches and time.time() < deadline:
+                    # 每块截止到换行符，匹配不会跨块
+                    chunk_end = min(size, offset + SCAN_CHUNK)
+                    if chunk_end < size:
+                        newline = mapped.rfind(b"\n", offset, chunk_end)
+                        if newline < 0:
+                            newline = mapped.find(b"\n", chunk_end)
+                        chunk_end = newline + 1 if newline >= 0 else size
+                    for match in regex.finditer(mapped, offset, chunk_end):
+                        line = self.line_of(match.start())
+                        if line == last_line:
+                            continue
+                        last_line = line
+                        line_start, line_end = self.line_range(line)
+                        yield line, decode_line(mapped[line_start:line_end].rstrip(b"\r\n"))
+                        found += 1
+                        if found >= max_matches:
+                            offset = line_end
+                            break
+                    else:
+                        offset = chunk_end
+            finally:
+                mapped.close()
+        progress.update(next_line=self.line_of(offset) if offset < size else self.total, complete=offset >= size)
+
+
+class LogIndexCache:
+    """按路径缓存行索引（最多 max_entries 个，最久未用的先移除）"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.realpath(path)
+        with self.lock:
+            index = self.entries.get(path)
+            if index is None:
+                index = LineIndex(path)
+                self.entries[path] = index
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(path)
+        index.refresh()
+        return index
+
+
+def is_log_name(name):
+    """按文件名判断是否为日志文件（*.log、*.log.1 等轮转文件、*.out、*.txt），索引文件除外"""
+    name = name.lower()
+    if name.endswith(INDEX_SUFFIX):
+        return False
+    return ".log" in name or name.endswith((".out", ".txt"))
+
+
+def is_log_file_in(path, directories):
+    """path 是否为 directories 中某个目录下（不含子目录）的日志文件，与 list_log_files 列出的范围一致"""
+    if not is_log_name(os.path.basename(path)):
+        return False
+    parent = os.path.normcase(os.path.dirname(os.path.realpath(path)))
+    return any(parent == os.path.normcase(os.path.realpath(directory)) for directory in directories)
+
+
+def _file_info(path, name):
+    stat = os.stat(path)
+    return {"path": path, "name": name, "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def list_log_files(directories, files=()):
+    """列出目录中的日志文件（不递归，跳过索引文件）及 files 中的文件，按修改时间倒序"""
+    result = []
+    seen = set()
+    for path in files:
+        real = os.path.realpath(path)
+        if real not in seen and os.path.isfile(path):
+            seen.add(real)
+            result.append(_file_info(path, os.path.basename(path)))
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if not is_log_name(entry.name) or not entry.is_file():
+                continue
+            real = os.path.realpath(entry.path)
+            if real in seen:
+                continue
+            seen.add(real)
+            result.append(_file_info(entry.path, entry.name))
+    result.sort(key=lambda item: item["mtime"], reverse=True)
+    return result
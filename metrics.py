@@ -0,0 +1,162 @@
+import threading
+import time
+from array import array
+
+import psutil
+
+
+# 每个采样点的字段，顺序即推送和接口返回的列顺序
+FIELDS = ("time", "cpu", "rss", "threads", "handles", "read_bytes", "write_bytes")
+
+
+class RingSeries:
+    """定长环形缓冲区，每个字段一个 array('d')
+
+    写入采样时只覆盖数组中的元素，不为每个采样点分配字典或元组，
+    内存占用固定为 容量 x 字段数 x 8 字节。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = [array('d', bytes(8 * capacity)) for _ in FIELDS]
+        self.next = 0      # 下一个写入位置
+        self.count = 0     # 有效采样数
+        self.total = 0     # 累计写入次数，作为增量推送的序号
+
+    def append(self, values):
+        index = self.next
+        for column, value in zip(self.columns, values):
+            column[index] = value
+        self.next = (index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def since(self, seq=0, limit=None):
+        """返回序号大于 seq 的采样（按时间顺序），每列一个列表"""
+        available = min(self.count, max(0, self.total - seq))
+        if limit is not None:
+            available = min(available, limit)
+        start = (self.next - available) % self.capacity
+        if start + available <= self.capacity:
+            return [column[start:start + available].tolist() for column in self.columns]
+        tail = self.capacity - start
+        return [column[start:].tolist() + column[:available - tail].tolist() for column in self.columns]
+
+    def last(self):
+        if not self.count:
+            return None
+        index = (self.next - 1) % self.capacity
+        return [column[index] for column in self.columns]
+
+
+class MetricsCollector:
+    """受管进程的资源指标采集
+
+    对每个受管对象的PID采样 CPU%、内存（RSS）、线程数、句柄数（非Windows为文件描述符数）
+    和累计I/O字节数，保存在每个对象独立的定长环形缓冲区中。
+    psutil.Process 对象按PID缓存，CPU%为两次采样之间的平均值。
+    """
+
+    def __init__(self, capacity=300, interval=2):
+        self.capacity = capacity
+        self.interval = interval
+        self.series = {}      # key -> RingSeries
+        self.processes = {}   # key -> psutil.Process
+        self.sent = {}        # key -> 已推送的序号
+        self.last_sample = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def _process(self, key, pid):
+        process = self.processes.get(key)
+        if process is None or process.pid != pid:
+            process = psutil.Process(pid)
+            process.cpu_percent(None)   # 第一次调用只建立基准
+            self.processes[key] = process
+        return process
+
+    @staticmethod
+    def _read(process, now):
+        with process.oneshot():
+            memory = process.memory_info()
+            if hasattr(process, "num_handles"):
+                handles = process.num_handles()
+            else:
+                handles = process.num_fds()
+            try:
+                io = process.io_counters()
+                read_bytes, write_bytes = io.read_bytes, io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                read_bytes = write_bytes = -1
+            return (now, process.cpu_percent(None), memory.rss, process.num_threads(),
+                    handles, read_bytes, write_bytes)
+
+    def due(self, now=None):
+        return (now or time.time()) - self.last_sample >= self.interval
+
+    def sample(self, pids, now=None):
+        """对 {key: pid} 中正在运行的进程采样，pid 为空的对象跳过"""
+        now = now or time.time()
+        with self.lock:
+            self.last_sample = now
+            for key in list(self.processes):
+                if not pids.get(key):
+                    del self.processes[key]
+            for key, pid in pids.items():
+                if not pid:
+                    continue
+                try:
+                    values = self._read(self._process(key, pid), now)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    self.processes.pop(key, None)
+                    self.errors += 1
+                    continue
+                series = self.series.get(key)
+                if series is None:
+                    series = RingSeries(self.capacity)
+                    self.series[key] = series
+                series.append(values)
+
+    def retain(self, keys):
+        """移除已删除对象的历史数据"""
+        key_set = set(keys)
+        with self.lock:
+            for store in (self.series, self.processes, self.sent):
+                for key in list(store):
+                    if key not in key_set:
+                        del store[key]
+
+    def history(self, key, limit=None):
+        """返回对象最近的采样，{"fields": [...], "samples": 每列一个列表}"""
+        with self.lock:
+            series = self.series.get(key)
+            samples = series.since(0, limit) if series else [[] for _ in FIELDS]
+        return {"fields": list(FIELDS), "capacity": self.capacity, "samples": samples}
+
+    def delta(self):
+        """返回上次调用之后新增的采样 {"类型:名称": [[字段值...], ...]}，没有新数据时返回空字典"""
+        result = {}
+        with self.lock:
+            for key, series in self.series.items():
+                seq = self.sent.get(key, 0)
+                if series.total <= seq:
+                    continue
+                columns = series.since(seq)
+                result["{}:{}".format(*key)] = [list(row) for row in zip(*columns)]
+                self.sent[key] = series.total
+        return result
+
+    def latest(self):
+        """正在运行的对象最近一次采样，{"类型:名称": {字段: 值}}
+
+        最近一次采样时已经停止的对象不返回，避免导出已退出进程的旧数据。
+        """
+        with self.lock:
+            result = {}
+            for key, series in self.series.items():
+                if key not in self.processes:
+                    continue
+                values = series.last()
+                if values is not None:
+                    result["{}:{}".format(*key)] = dict(zip(FIELDS, values))
+            return result
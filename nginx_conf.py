@@ -0,0 +1,528 @@
+import glob
+import os
+import re
+import subprocess
+import threading
+
+# 词法单元：空白、注释、引号字符串、花括号、分号、普通单词（支持 ${var}）
+TOKEN_RE = re.compile(r'''
+      (?P<ws>\s+)
+    | (?P<comment>\#[^\n]*)
+    | (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+    | (?P<open>\{)
+    | (?P<close>\})
+    | (?P<semicolon>;)
+    | (?P<word>(?:\$\{[^}]*\}|\\.|[^\s;{}"'\\])+)
+''', re.VERBOSE)
+
+# 代理列表中不显示的内置location（预编译，匹配 "location 路径 {"）
+PROXY_FILTERS = [re.compile(pattern) for pattern in (
+    r"location\s+/api/",
+    r"location\s+/admin/api/files/upload/",
+    r"location\s+/papi/",
+    r"location\s+/w(?:\s|{)",
+    r"location\s+/(?:\s|{)",
+    r"location\s+/authcenter/",
+    r"location\s+/usercenter/",
+    r"location\s+/permissions/",
+    r"location\s+/wish3dearth/",
+    r"location\s+/datamanage/",
+    r"location\s+~\s+\^/wish3dearth/static/v1\.0\.0/cad/api/v1/map/\(.*\)\$"
+)]
+
+# apply_transaction 在替换配置文件之前写入的原始内容备份
+BACKUP_SUFFIX = ".earth.bak"
+
+
+class NginxConfigError(Exception):
+    """nginx配置文件无法解析"""
+
+
+class Directive:
+    """配置中的一条指令或一个块
+
+    start/end 为指令在文件中的起止位置，arg_spans 为每个参数的位置，
+    块指令的 children 为子指令列表，body_end 为右花括号的位置。
+    include 指令的 included 为被包含文件解析出的指令列表。
+    """
+
+    __slots__ = ("name", "args", "arg_spans", "path", "line", "start", "end",
+                 "children", "body_end", "included", "parent")
+
+    def __init__(self, name, path, line, start, parent=None):
+        self.name = name
+        self.args = []
+        self.arg_spans = []
+        self.path = path
+        self.line = line
+        self.start = start
+        self.end = start
+        self.children = None
+        self.body_end = None
+        self.included = None
+        self.parent = parent
+
+    @property
+    def is_block(self):
+        return self.children is not None
+
+    def iter_children(self):
+        """遍历子指令，include 的内容按原位置展开，跳过注释"""
+        for child in self.children or ():
+            if child.name == "#":
+                continue
+            if child.name == "include" and child.included is not None:
+                for item in child.included:
+                    if item.name != "#":
+                        yield item
+            else:
+                yield child
+
+    def find(self, name):
+        return [child for child in self.iter_children() if child.name == name]
+
+    def first(self, name):
+        for child in self.iter_children():
+            if child.name == name:
+                return child
+        return None
+
+    def to_dict(self):
+        data = {"name": self.name, "args": list(self.args), "file": self.path, "line": self.line}
+        if self.is_block:
+            data["children"] = [child.to_dict() for child in self.iter_children()]
+        return data
+
+
+def _unquote(token):
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in "\"'":
+        return re.sub(r"\\(.)", r"\1", token[1:-1])
+    return token
+
+
+def parse_text(text, path="<string>"):
+    """把配置文本解析为指令列表（不展开 include）"""
+    root = Directive("", path, 0, 0)
+    root.children = []
+    stack = [root]
+    current = None
+    line = 1
+    pos = 0
+    length = len(text)
+
+    while pos < length:
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            raise NginxConfigError(f"{path}:{line} 无法识别的字符 {text[pos]!r}")
+        kind = match.lastgroup
+        token = match.group()
+        start, pos = match.start(), match.end()
+
+        if kind == "ws":
+            pass
+        elif kind == "comment":
+            if current is None:
+                comment = Directive("#", path, line, start, stack[-1])
+                comment.args = [token[1:].strip()]
+                comment.end = pos
+                stack[-1].children.append(comment)
+        elif kind in ("word", "string"):
+            if current is None:
+                current = Directive(_unquote(token), path, line, start, stack[-1])
+            else:
+                current.args.append(_unquote(token))
+                current.arg_spans.append((start, pos))
+        elif kind == "semicolon":
+            if current is None:
+                raise NginxConfigError(f"{path}:{line} 多余的分号")
+            current.end = pos
+            stack[-1].children.append(current)
+            current = None
+        elif kind == "open":
+            if current is None:
+                raise NginxConfigError(f"{path}:{line} 块缺少名称")
+            current.children = []
+            stack[-1].children.append(current)
+            stack.append(current)
+            current = None
+        elif kind == "close":
+            if current is not None:
+                raise NginxConfigError(f"{path}:{line} 指令 {current.name} 缺少分号")
+            if len(stack) == 1:
+                raise NginxConfigError(f"{path}:{line} 多余的右花括号")
+            block = stack.pop()
+            block.body_end = start
+            block.end = pos
+        line += token.count("\n")
+
+    if current is not None:
+        raise NginxConfigError(f"{path}: 指令 {current.name} 缺少分号")
+    if len(stack) > 1:
+        raise NginxConfigError(f"{path}: 块 {stack[-1].name} 缺少右花括号")
+    return root
+
+
+def parse_port(listen_arg):
+    """从 listen 参数（81、0.0.0.0:81、[::]:81）中取出端口号"""
+    match = re.search(r"(?:^|:)(\d+)$", listen_arg)
+    return match.group(1) if match else None
+
+
+class NginxConfig:
+    """解析后的nginx配置（包含 include 的文件）"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.base_dir = os.path.dirname(self.path)
+        self.texts = {}        # 文件路径 -> 文件内容
+        self.signature = {}    # 文件路径 -> (mtime, size)
+        self.root = self._parse_file(self.path)
+        self._proxies = None
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _parse_file(self, path):
+        self.signature[path] = self._stat(path)
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        self.texts[path] = text
+        root = parse_text(text, path)
+        self._resolve_includes(root)
+        return root
+
+    def _resolve_includes(self, block):
+        for child in block.children:
+            if child.name == "include" and child.args:
+                pattern = child.args[0]
+                if not os.path.isabs(pattern):
+                    pattern = os.path.join(self.base_dir, pattern)
+                child.included = []
+                for included_path in sorted(glob.glob(pattern)):
+                    included_path = os.path.abspath(included_path)
+                    if included_path in self.texts:
+                        continue
+                    try:
+                        included = self._parse_file(included_path)
+                    except NginxConfigError as e:
+                        print(f"解析被包含的nginx配置失败: {e}")
+                        continue
+                    for item in included.children:
+                        item.parent = block
+                    child.included.extend(included.children)
+            elif child.is_block:
+                self._resolve_includes(child)
+
+    def is_current(self):
+        """配置文件（包括被包含的文件）自解析后是否未被修改"""
+        try:
+            return all(self._stat(path) == signature for path, signature in self.signature.items())
+        except OSError:
+            return False
+
+    def walk(self, block=None):
+        """深度优先遍历全部指令（展开 include）"""
+        stack = list(reversed(list((block or self.root).iter_children())))
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.is_block:
+                stack.extend(reversed(list(node.iter_children())))
+
+    def servers(self):
+        return [node for node in self.walk() if node.name == "server" and node.is_block
+                and node.parent is not None and node.parent.name == "http"]
+
+    def find_server(self, port=None, server_name=None):
+        """按监听端口或 server_name 查找server块，都未指定时返回第一个带 server_name 的server"""
+        servers = self.servers()
+        for server in servers:
+            if port is not None:
+                ports = [parse_port(listen.args[0]) for listen in server.find("listen") if listen.args]
+                if str(port) not in ports:
+                    continue
+            if server_name is not None:
+                names = [name for directive in server.find("server_name") for name in directive.args]
+                if server_name not in names:
+                    continue
+            if port is None and server_name is None and not server.find("server_name"):
+                continue
+            return server
+        if port is None and server_name is None and servers:
+            return servers[0]
+        return None
+
+    def listen_port(self):
+        """第一个 listen 指令的端口号"""
+        for node in self.walk():
+            if node.name == "listen" and node.args:
+                port = parse_port(node.args[0])
+                if port:
+                    return port
+        return None
+
+    def proxy_locations(self, filtered=True):
+        """所有配置了 proxy_pass 的location，filtered 为 True 时去掉内置的location"""
+        if self._proxies is None:
+            proxies = []
+            for node in self.walk():
+                if node.name != "location" or not node.is_block:
+                    continue
+                proxy_pass = node.first("proxy_pass")
+                if proxy_pass is None or not proxy_pass.args:
+                    continue
+                path = " ".join(node.args)
+                proxies.append({
+                    "path": path,
+                    "target": proxy_pass.args[0],
+                    "file": node.path,
+                    "line": node.line,
+                    "builtin": any(pattern.match(f"location {path} {{") for pattern in PROXY_FILTERS)
+                })
+            self._proxies = proxies
+        if filtered:
+            return [{"path": item["path"], "target": item["target"]} for item in self._proxies if not item["builtin"]]
+        return list(self._proxies)
+
+    def line_indent(self, path, pos):
+        """pos 所在行的缩进"""
+        text = self.texts[path]
+        line_start = text.rfind("\n", 0, pos) + 1
+        match = re.match(r"[ \t]*", text[line_start:])
+        return match.group()
+
+    def edit(self):
+        return ConfigEdit(self)
+
+
+class ConfigEdit:
+    """对配置的结构化修改
+
+    修改以指令/参数的位置为准记录下来，commit 时每个文件一次性写入（临时文件+原子替换），
+    未涉及的内容（包括注释和格式）保持不变。
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.changes = {}   # 文件路径 -> [(start, end, text)]
+
+    def replace(self, path, start, end, text):
+        self.changes.setdefault(path, []).append((start, end, text))
+        return self
+
+    def set_arg(self, directive, index, value):
+        start, end = directive.arg_spans[index]
+        return self.replace(directive.path, start, end, value)
+
+    def remove(self, directive):
+        """删除指令（连同所在行的缩进和换行）"""
+        text = self.config.texts[directive.path]
+        start = text.rfind("\n", 0, directive.start) + 1
+        if text[start:directive.start].strip():
+            start = directive.start
+        end = directive.end
+        if text[end:end + 1] == "\n":
+            end += 1
+        return self.replace(directive.path, start, end, "")
+
+    def insert_after(self, directive, text):
+        return self.replace(directive.path, directive.end, directive.end, text)
+
+    def insert_into(self, block, text):
+        """在块的右花括号之前插入内容"""
+        return self.replace(block.path, block.body_end, block.body_end, text)
+
+    def render(self):
+        """返回修改后的 {文件路径: 新内容}"""
+        result = {}
+        for path, changes in self.changes.items():
+            text = self.config.texts[path]
+            for start, end, new in sorted(changes, key=lambda change: (change[0], change[1]), reverse=True):
+                text = text[:start] + new + text[end:]
+            result[path] = text
+        return result
+
+    def commit(self):
+        """写入修改后的文件，返回被修改的文件列表"""
+        rendered = self.render()
+        for path, text in rendered.items():
+            write_atomic(path, text)
+        invalidate(self.config.path)
+        return list(rendered)
+
+
+def write_atomic(path, data):
+    """写入临时文件并原子替换，data 为 bytes 时按原样写入，否则按UTF-8编码"""
+    tmp_path = f"{path}.tmp"
+    if isinstance(data, bytes):
+        f = open(tmp_path, 'wb')
+    else:
+        f = open(tmp_path, 'w', encoding='utf-8')
+    with f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def location_block(path, target, indent="    ", step="    "):
+    """生成一个反向代理location块的文本"""
+    return f"{indent}location {path} {{\n{indent}{step}proxy_pass {target};\n{indent}}}"
+
+
+def location_changes(config, server, operations):
+    """把一批location修改（add/update/delete）转换为一次 ConfigEdit
+
+    operations: [{"op": "add"/"update"/"delete", "path": "/api2/", "target": "http://..."}]
+    只处理 server 块中直接包含的location，任何一项不合法时抛出 NginxConfigError，不做任何修改。
+    """
+    locations = {}
+    for node in server.iter_children():
+        if node.name == "location" and node.is_block:
+            locations[" ".join(node.args)] = node
+
+    edit = config.edit()
+    additions = []
+    seen = set()
+    for index, operation in enumerate(operations, 1):
+        op = operation.get("op")
+        path = (operation.get("path") or "").strip()
+        target = (operation.get("target") or "").strip()
+        if not path:
+            raise NginxConfigError(f"第{index}项缺少路径")
+        if op in ("add", "update") and (not target or re.search(r"[\s;{}]", target)):
+            raise NginxConfigError(f"第{index}项目标地址无效: {target}")
+        if re.search(r"[;{}]", path):
+            raise NginxConfigError(f"第{index}项路径无效: {path}")
+        if path in seen:
+            raise NginxConfigError(f"同一批修改中路径重复: {path}")
+        seen.add(path)
+
+        node = locations.get(path)
+        if op == "add":
+            if node is not None:
+                raise NginxConfigError(f"location {path} 已存在")
+            additions.append((path, target))
+        elif op == "update":
+            if node is None:
+                raise NginxConfigError(f"location {path} 不存在")
+            proxy_pass = node.first("proxy_pass")
+            if proxy_pass is not None and proxy_pass.args:
+                edit.set_arg(proxy_pass, 0, target)
+            else:
+                indent = config.line_indent(node.path, node.start)
+                edit.insert_into(node, f"    proxy_pass {target};\n{indent}")
+        elif op == "delete":
+            if node is None:
+                raise NginxConfigError(f"location {path} 不存在")
+            edit.remove(node)
+        else:
+            raise NginxConfigError(f"第{index}项操作类型无效: {op}")
+
+    if additions:
+        # 新增的location放在该server块（同一文件中）最后一个location之后，没有location时放在 server_name/listen 之后
+        anchors = [node for node in server.children if node.name == "location" and node.is_block]
+        anchors = anchors or [node for node in server.children if node.name in ("server_name", "listen")]
+        if anchors:
+            anchor = anchors[-1]
+            indent = config.line_indent(anchor.path, anchor.start)
+            text = "".join("\n" + location_block(path, target, indent) for path, target in additions)
+            edit.insert_after(anchor, text)
+        else:
+            indent = config.line_indent(server.path, server.start) + "    "
+            text = "".join(location_block(path, target, indent) + "\n" for path, target in additions)
+            edit.insert_into(server, text)
+    return edit
+
+
+def listen_port_changes(config, new_port):
+    """把监听当前端口（第一个 listen 指令的端口）的所有 listen 指令改为 new_port"""
+    old_port = config.listen_port()
+    if old_port is None:
+        raise NginxConfigError("未找到 listen 配置")
+    edit = config.edit()
+    for node in config.walk():
+        if node.name == "listen" and node.args and parse_port(node.args[0]) == old_port:
+            arg = node.args[0]
+            edit.set_arg(node, 0, arg[:len(arg) - len(old_port)] + str(new_port))
+    return edit
+
+
+def proxy_addition(config, path, target):
+    """在第一个带 server_name 的server块中添加一个反向代理location"""
+    server = config.find_server()
+    if server is None:
+        raise NginxConfigError("无法在配置文件中找到server配置块")
+    return location_changes(config, server, [{"op": "add", "path": path, "target": target}])
+
+
+def test_config(work_dir, conf_path, executable="nginx.exe", timeout=30):
+    """用 nginx -t 校验配置，返回 (是否通过, 输出)"""
+    exe = os.path.join(work_dir, executable) if work_dir and os.path.exists(os.path.join(work_dir, executable)) else executable
+    try:
+        result = subprocess.run([exe, "-t", "-c", os.path.abspath(conf_path)], cwd=work_dir or None,
+                                capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return False, f"无法执行配置检查: {e}"
+    output = (result.stdout + result.stderr).strip()
+    return result.returncode == 0, output
+
+
+def apply_transaction(edit, validate):
+    """写入修改并校验，校验失败时恢复原文件
+
+    替换之前先把每个要修改的文件的原始内容（按字节，不经过解码）写入 <文件>.earth.bak 并落盘，
+    校验失败或写入出错时按原始字节恢复；管理程序在校验过程中退出时也可以从备份手动恢复。
+    完成后删除备份。validate() 返回 (是否通过, 输出)，返回 (是否成功, 输出, 被修改的文件)。
+    """
+    config = edit.config
+    originals = {}
+    for path in edit.changes:
+        with open(path, 'rb') as f:
+            originals[path] = f.read()
+        write_atomic(path + BACKUP_SUFFIX, originals[path])
+    try:
+        changed = edit.commit()
+        ok, output = validate()
+    except BaseException:
+        _restore(originals)
+        invalidate(config.path)
+        raise
+    if not ok:
+        _restore(originals)
+        invalidate(config.path)
+    for path in originals:
+        try:
+            os.remove(path + BACKUP_SUFFIX)
+        except OSError:
+            pass
+    return ok, output, changed
+
+
+def _restore(originals):
+    for path, data in originals.items():
+        write_atomic(path, data)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load(path):
+    """返回解析后的配置，配置文件（包括 include 的文件）未修改时直接使用缓存"""
+    path = os.path.abspath(path)
+    with _cache_lock:
+        config = _cache.get(path)
+    if config is not None and config.is_current():
+        return config
+    config = NginxConfig(path)
+    with _cache_lock:
+        _cache[path] = config
+    return config
+
+
+def invalidate(path):
+    with _cache_lock:
+        _cache.pop(os.path.abspath(path), None)
@@ -0,0 +1,194 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DependencyError(Exception):
+    """依赖配置错误（引用不存在的对象或存在循环依赖）"""
+
+
+def format_key(key):
+    return "{}:{}".format(*key) if isinstance(key, tuple) else str(key)
+
+
+def parse_dependency(ref, targets):
+    """解析 depends_on 中的一项，支持 "类型:名称" 或唯一的名称
+
+    targets 为所有受管对象的key集合，返回对应的key，无法解析时抛出 DependencyError。
+    """
+    if isinstance(ref, (list, tuple)) and len(ref) == 2:
+        key = tuple(ref)
+        if key in targets:
+            return key
+    elif isinstance(ref, str):
+        kind, sep, name = ref.partition(":")
+        if sep and (kind, name) in targets:
+            return (kind, name)
+        matches = [key for key in targets if key[1] == ref]
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            raise DependencyError(f"依赖 {ref} 不唯一，请使用 类型:名称 的形式")
+    raise DependencyError(f"依赖的对象不存在: {ref}")
+
+
+def build_graph(dependencies, roots=None):
+    """根据 {key: [依赖key]} 构建需要启动的子图
+
+    roots 为需要启动的对象（None 表示全部），会自动包含它们的全部依赖。
+    """
+    if roots is None:
+        roots = list(dependencies)
+    graph = {}
+    stack = list(roots)
+    while stack:
+        key = stack.pop()
+        if key in graph:
+            continue
+        if key not in dependencies:
+            raise DependencyError(f"对象不存在: {format_key(key)}")
+        graph[key] = set(dependencies[key])
+        stack.extend(graph[key])
+    return graph
+
+
+def topological_layers(graph):
+    """Kahn算法分层：同一层的对象互不依赖，可以并行启动
+
+    存在循环依赖时抛出 DependencyError，并列出环上的对象。
+    """
+    indegree = {key: len(deps) for key, deps in graph.items()}
+    dependents = {key: [] for key in graph}
+    for key, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(key)
+
+    layers = []
+    layer = sorted((key for key, count in indegree.items() if count == 0), key=format_key)
+    visited = 0
+    while layer:
+        layers.append(layer)
+        visited += len(layer)
+        next_layer = []
+        for key in layer:
+            for dependent in dependents[key]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    next_layer.append(dependent)
+        layer = sorted(next_layer, key=format_key)
+
+    if visited < len(graph):
+        cycle = sorted((format_key(key) for key, count in indegree.items() if count > 0))
+        raise DependencyError(f"存在循环依赖: {', '.join(cycle)}")
+    return layers
+
+
+class StartupOrchestrator:
+    """按依赖关系并行启动
+
+    每个对象在它的全部依赖就绪后立即启动（不等待同一层的其他对象），
+    因此整体冷启动耗时取决于关键路径，而不是所有步骤之和。
+    已经就绪的对象不会重复启动；某个对象失败时，依赖它的对象全部跳过。
+
+    start(key)      执行启动操作，返回 {"status", "message"}
+    is_ready(key)   对象当前是否已经就绪
+    wait_ready(key) 等待对象就绪，返回是否就绪
+    notify(event, data) 每个对象状态变化时调用
+    """
+
+    def __init__(self, start, is_ready, wait_ready, max_workers=4, notify=None):
+        self.start = start
+        self.is_ready = is_ready
+        self.wait_ready = wait_ready
+        self.max_workers = max_workers
+        self.notify = notify
+
+    def _emit(self, data):
+        if self.notify:
+            try:
+                self.notify('orchestrator_progress', data)
+            except Exception as e:
+                print(f"启动进度推送失败: {e}")
+
+    def _launch(self, key):
+        """启动单个对象并等待就绪，返回结果"""
+        started = time.time()
+        try:
+            if self.is_ready(key):
+                return {"status": "success", "message": f"{key[1]} 已在运行", "skipped": True, "elapsed": 0}
+            result = self.start(key) or {}
+            if result.get("status") != "success":
+                return {"status": "error", "message": result.get("message", "启动失败"), "elapsed": round(time.time() - started, 3)}
+            if not self.wait_ready(key):
+                return {"status": "error", "message": f"{key[1]} 启动后未就绪", "elapsed": round(time.time() - started, 3)}
+            return {"status": "success", "message": f"{key[1]} 已就绪", "elapsed": round(time.time() - started, 3)}
+        except Exception as e:
+            return {"status": "error", "message": str(e), "elapsed": round(time.time() - started, 3)}
+
+    def run(self, graph, report=None):
+        """启动 graph（{key: 依赖key集合}）中的全部对象，返回每个对象的结果"""
+        layers = topological_layers(graph)
+        total = len(graph)
+        started = time.time()
+
+        remaining = {key: set(deps) for key, deps in graph.items()}
+        dependents = {key: [] for key in graph}
+        for key, deps in graph.items():
+            for dep in deps:
+                dependents[dep].append(key)
+
+        results = {}
+        lock = threading.Lock()
+        all_done = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="orchestrator")
+
+        def finish(key, result):
+            ready = []
+            skipped = []
+            with lock:
+                results[key] = result
+                if result["status"] == "success":
+                    for dependent in dependents[key]:
+                        remaining[dependent].discard(key)
+                        if not remaining[dependent] and dependent not in results:
+                            ready.append(dependent)
+                else:
+                    # 依赖失败，依赖它的对象全部跳过
+                    stack = list(dependents[key])
+                    while stack:
+                        dependent = stack.pop()
+                        if dependent in results:
+                            continue
+                        results[dependent] = {"status": "error", "message": f"依赖 {format_key(key)} 启动失败，已跳过", "elapsed": 0}
+                        skipped.append(dependent)
+                        stack.extend(dependents[dependent])
+                done = len(results)
+            for item in [key] + skipped:
+                self._emit({"target": format_key(item), "done": done, "total": total, **results[item]})
+            if report:
+                report(int(done * 100 / total), f"已完成 {done}/{total}")
+            for dependent in ready:
+                submit(dependent)
+            if done >= total:
+                all_done.set()
+
+        def submit(key):
+            self._emit({"target": format_key(key), "status": "running", "message": f"{key[1]} 启动中"})
+            pool.submit(lambda: finish(key, self._launch(key)))
+
+        try:
+            if total == 0:
+                all_done.set()
+            for key in layers[0] if layers else []:
+                submit(key)
+            all_done.wait()
+        finally:
+            pool.shutdown(wait=False)
+
+        failed = sum(1 for result in results.values() if result["status"] != "success")
+        return {
+            "status": "success" if failed == 0 else "error",
+            "message": f"启动完成：成功 {total - failed} 个，失败 {failed} 个，耗时 {time.time() - started:.1f} 秒",
+            "layers": [[format_key(key) for key in layer] for layer in layers],
+            "results": {format_key(key): result for key, result in results.items()}
+        }
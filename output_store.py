@@ -0,0 +1,223 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+
+
+def target_file_name(key):
+    """对象key对应的日志文件名（去掉文件名中不允许的字符）"""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", "{}-{}".format(*key)) + ".log"
+
+
+def decode_line(data):
+    # 中文Windows控制台默认使用GBK输出，UTF-8解码失败时再按GBK解码
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("gbk", errors="replace")
+
+
+class TargetOutput:
+    """单个对象的输出：按大小轮转的日志文件 + 内存中最近若干行的环形缓冲"""
+
+    def __init__(self, path, max_bytes, backups, ring_size):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.ring = deque(maxlen=ring_size)   # (序号, 时间, 流, 文本)
+        self.seq = 0
+        self.pending = []                      # 尚未推送的行
+        self.dropped = 0                       # 推送积压过多时丢弃的行数
+        self.lock = threading.Lock()
+        self.file = None
+        self.size = 0
+        self.dirty = False
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+        self.size = self.file.tell()
+
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def append(self, stream, text, max_pending):
+        now = time.time()
+        with self.lock:
+            self.seq += 1
+            item = (self.seq, now, stream, text)
+            self.ring.append(item)
+            self.pending.append(item)
+            if len(self.pending) > max_pending:
+                # 客户端跟不上时只保留最新的行，被丢弃的行仍然保存在日志文件中
+                overflow = len(self.pending) - max_pending
+                del self.pending[:overflow]
+                self.dropped += overflow
+
+            if self.file is None:
+                self._open()
+            line = f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))} [{stream}] {text}\n"
+            self.file.write(line)
+            self.size += len(line.encode("utf-8"))
+            self.dirty = True
+            if self.size >= self.max_bytes:
+                self._rotate()
+
+    def take_pending(self):
+        with self.lock:
+            lines, self.pending = self.pending, []
+            dropped, self.dropped = self.dropped, 0
+            return lines, dropped
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None and self.dirty:
+                self.file.flush()
+                self.dirty = False
+
+    def tail(self, after=0, limit=200):
+        with self.lock:
+            lines = [item for item in self.ring if item[0] > after]
+        return lines[-limit:]
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class OutputStore:
+    """受管对象的标准输出/标准错误采集
+
+    启动器创建的进程的 stdout/stderr 由各自的读取线程逐行读入，写入按大小轮转的
+    日志文件（base_dir/类型-名称.log），同时保存在内存环形缓冲中供页面查看。
+    新行先积攒起来，由推送线程每隔 flush_interval 秒批量推送给订阅了该对象的客户端，
+    输出很快时也不会阻塞读取线程或启动器；积压超过 max_pending 行时只推送最新的行。
+    notify(key, payload) 负责把一批行推送给订阅者。
+    """
+
+    def __init__(self, base_dir="logs", max_bytes=10 * 1024 * 1024, backups=5, ring_size=2000,
+                 flush_interval=0.2, max_pending=1000, notify=None):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.ring_size = ring_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.notify = notify
+        self.targets = {}       # key -> TargetOutput
+        self.subscribers = {}   # key -> 订阅数
+        self.readers = 0
+        self.lock = threading.Lock()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._push_loop, daemon=True, name="output-push")
+        self.thread.start()
+
+    def path_of(self, key):
+        return os.path.join(self.base_dir, target_file_name(key))
+
+    def _target(self, key):
+        with self.lock:
+            target = self.targets.get(key)
+            if target is None:
+                target = TargetOutput(self.path_of(key), self.max_bytes, self.backups, self.ring_size)
+                self.targets[key] = target
+            return target
+
+    def attach(self, key, popen):
+        """为启动的进程的 stdout/stderr 各启动一个读取线程"""
+        target = self._target(key)
+        for stream, pipe in (("stdout", popen.stdout), ("stderr", popen.stderr)):
+            if pipe is None:
+                continue
+            thread = threading.Thread(target=self._read, args=(key, target, stream, pipe, popen.pid),
+                                      daemon=True, name=f"output-{stream}-{popen.pid}")
+            thread.start()
+
+    def _read(self, key, target, stream, pipe, pid):
+        with self.lock:
+            self.readers += 1
+        try:
+            # 一直读到管道关闭，保证子进程不会因为管道写满而阻塞
+            for data in iter(pipe.readline, b""):
+                target.append(stream, decode_line(data.rstrip(b"\r\n")), self.max_pending)
+        except (OSError, ValueError) as e:
+            print(f"读取 {key[1]} 的输出失败: {e}")
+        finally:
+            pipe.close()
+            with self.lock:
+                self.readers -= 1
+            target.append("system", f"进程 {pid} 的 {stream} 已关闭", self.max_pending)
+
+    def subscribe(self, key):
+        with self.lock:
+            self.subscribers[key] = self.subscribers.get(key, 0) + 1
+
+    def unsubscribe(self, key):
+        with self.lock:
+            count = self.subscribers.get(key, 0) - 1
+            if count > 0:
+                self.subscribers[key] = count
+            else:
+                self.subscribers.pop(key, None)
+
+    def _push_loop(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            with self.lock:
+                targets = list(self.targets.items())
+                watched = set(self.subscribers)
+            for key, target in targets:
+                lines, dropped = target.take_pending()
+                target.flush()
+                if not lines or key not in watched or not self.notify:
+                    continue
+                try:
+                    self.notify(key, {"target": "{}:{}".format(*key), "lines": [list(item) for item in lines],
+                                      "dropped": dropped})
+                except Exception as e:
+                    print(f"输出推送失败: {e}")
+
+    def tail(self, key, after=0, limit=200):
+        """返回内存中序号大于 after 的最近 limit 行，每行为 [序号, 时间, 流, 文本]"""
+        with self.lock:
+            target = self.targets.get(key)
+        if target is None:
+            return []
+        return [list(item) for item in target.tail(after, limit)]
+
+    def forget(self, key):
+        with self.lock:
+            target = self.targets.pop(key, None)
+            self.subscribers.pop(key, None)
+        if target:
+            target.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "readers": self.readers,
+                "targets": {"{}:{}".format(*key): {"lines": target.seq, "path": target.path,
+                                                    "subscribers": self.subscribers.get(key, 0)}
+                            for key, target in self.targets.items()}
+            }
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            targets = list(self.targets.values())
+        for target in targets:
+            target.close()
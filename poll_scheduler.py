@@ -0,0 +1,148 @@
+import threading
+import time
+
+
+class PollScheduler:
+    """自适应状态轮询调度器
+
+    每个受管对象（Windows服务、Java进程、中间件）有独立的轮询间隔：
+      - 启动/停止/重启等操作之后的 boost_duration 秒内按 fast_interval 快速轮询
+      - 状态持续 stable_after 秒未变化后，间隔逐步翻倍，最长 max_interval
+      - 没有任何观察者（Socket.IO客户端、可见的Tk窗口）时降为按 max_interval 轮询，
+        不会停止：进程守护、退出监视、指标导出等在无人观察时仍依赖状态检查
+    """
+
+    def __init__(self, base_interval, fast_interval=0.5, max_interval=30,
+                 boost_duration=15, stable_after=30):
+        self.base_interval = base_interval
+        self.fast_interval = fast_interval
+        self.max_interval = max_interval
+        self.boost_duration = boost_duration
+        self.stable_after = stable_after
+
+        self.entities = {}   # key -> 调度状态
+        self.watchers = {}   # 观察者来源 -> 数量
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def _entity(self, key, now):
+        entity = self.entities.get(key)
+        if entity is None:
+            entity = {
+                "interval": self.base_interval,
+                "next_due": now,
+                "last_change": now,
+                "boost_until": 0,
+                "value": None
+            }
+            self.entities[key] = entity
+        return entity
+
+    def _effective_interval(self, entity, now):
+        if entity["boost_until"] > now:
+            return self.fast_interval
+        if not any(self.watchers.values()):
+            return self.max_interval
+        return entity["interval"]
+
+    def set_watchers(self, source, count):
+        """设置某个来源的观察者数量（例如Socket.IO连接数、可见窗口数）"""
+        with self.lock:
+            was_paused = not any(self.watchers.values())
+            self.watchers[source] = max(0, count)
+            now_paused = not any(self.watchers.values())
+        if was_paused and not now_paused:
+            # 恢复观察时立即检查一次所有对象
+            self.boost(duration=0)
+
+    def add_watcher(self, source):
+        with self.lock:
+            count = self.watchers.get(source, 0) + 1
+        self.set_watchers(source, count)
+
+    def remove_watcher(self, source):
+        with self.lock:
+            count = self.watchers.get(source, 0) - 1
+        self.set_watchers(source, count)
+
+    def is_paused(self):
+        """是否没有观察者（此时仍按 max_interval 低频轮询）"""
+        with self.lock:
+            return not any(self.watchers.values())
+
+    def boost(self, key=None, duration=None):
+        """操作之后对指定对象（key为None时为全部对象）立即并快速轮询"""
+        if duration is None:
+            duration = self.boost_duration
+        now = time.time()
+        with self.lock:
+            keys = [key] if key is not None else list(self.entities)
+            for item in keys:
+                entity = self._entity(item, now)
+                entity["next_due"] = now
+                entity["boost_until"] = max(entity["boost_until"], now + duration)
+                entity["interval"] = self.base_interval
+        self.wakeup.set()
+
+    def due(self, keys, now=None):
+        """返回当前需要检查的对象，同时清理已删除的对象"""
+        now = now or time.time()
+        keys = list(keys)
+        with self.lock:
+            key_set = set(keys)
+            for key in list(self.entities):
+                if key not in key_set:
+                    del self.entities[key]
+            return [key for key in keys if self._entity(key, now)["next_due"] <= now]
+
+    def record(self, key, value, now=None):
+        """记录一次检查结果并安排下一次检查时间"""
+        now = now or time.time()
+        with self.lock:
+            entity = self._entity(key, now)
+            if value != entity["value"]:
+                entity["value"] = value
+                entity["last_change"] = now
+                entity["interval"] = self.base_interval
+            elif now - entity["last_change"] >= self.stable_after:
+                entity["interval"] = min(entity["interval"] * 2, self.max_interval)
+            entity["next_due"] = now + self._effective_interval(entity, now)
+
+    def wait(self, max_wait=None):
+        """等待到最近一个对象需要检查，或被boost/观察者变化唤醒"""
+        now = time.time()
+        with self.lock:
+            if self.entities:
+                timeout = max(0, min(e["next_due"] for e in self.entities.values()) - now)
+            else:
+                timeout = self.base_interval
+        if max_wait is not None and timeout is not None:
+            timeout = min(timeout, max_wait)
+        self.wakeup.wait(timeout)
+        self.wakeup.clear()
+
+    def tick_interval(self):
+        """当前最短的有效轮询间隔，即状态检查周期的正常间隔（无人观察时为 max_interval）"""
+        now = time.time()
+        with self.lock:
+            if not self.entities:
+                return self.base_interval
+            return min(self._effective_interval(entity, now) for entity in self.entities.values())
+
+    def intervals(self):
+        """返回每个对象的当前有效轮询间隔，便于确认无人观察时已降为低频轮询"""
+        now = time.time()
+        with self.lock:
+            paused = not any(self.watchers.values())
+            return {
+                "paused": paused,
+                "watchers": dict(self.watchers),
+                "entities": {
+                    "{}:{}".format(*key) if isinstance(key, tuple) else str(key): {
+                        "interval": self._effective_interval(entity, now),
+                        "next_due_in": round(max(0, entity["next_due"] - now), 3),
+                        "stable_for": round(now - entity["last_change"], 1)
+                    }
+                    for key, entity in self.entities.items()
+                }
+            }
@@ -0,0 +1,234 @@
+import os
+import sys
+import threading
+import time
+import psutil
+
+# 进程对象可能随时退出或无权限访问，查询失败时统一按以下异常处理
+PROCESS_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, OSError)
+
+
+class ProcessBackend:
+    """进程清单后端接口
+
+    状态检测只通过后端枚举和查询进程，不再调用 tasklist 等外部命令。
+    lightweight 为 True 的后端只在枚举时提供 pid/ppid/name，其余属性由快照按需查询。
+    """
+
+    name = "base"
+    lightweight = False
+
+    def iter_processes(self, attrs):
+        """枚举进程，逐个返回包含 attrs 中属性的字典"""
+        raise NotImplementedError
+
+    def process_info(self, pid, attrs):
+        """查询单个进程的属性，进程不存在时返回None"""
+        raise NotImplementedError
+
+    def cwd(self, pid):
+        raise NotImplementedError
+
+    def create_time(self, pid):
+        raise NotImplementedError
+
+    def is_same_process(self, pid, create_time):
+        """PID对应的进程仍然存活，且创建时间一致（未被复用）"""
+        return create_time is not None and self.create_time(pid) == create_time
+
+    def terminate(self, pid):
+        raise NotImplementedError
+
+
+class PsutilBackend(ProcessBackend):
+    """基于psutil的通用实现"""
+
+    name = "psutil"
+
+    def iter_processes(self, attrs):
+        for proc in psutil.process_iter(attrs):
+            yield proc.info
+
+    def process_info(self, pid, attrs):
+        try:
+            return psutil.Process(pid).as_dict(attrs)
+        except PROCESS_ERRORS:
+            return None
+
+    def cwd(self, pid):
+        try:
+            return psutil.Process(pid).cwd()
+        except PROCESS_ERRORS:
+            return None
+
+    def create_time(self, pid):
+        try:
+            return psutil.Process(pid).create_time()
+        except PROCESS_ERRORS:
+            return None
+
+    def is_same_process(self, pid, create_time):
+        try:
+            proc = psutil.Process(pid)
+            return proc.is_running() and proc.create_time() == create_time
+        except PROCESS_ERRORS:
+            return False
+
+    def terminate(self, pid):
+        psutil.Process(pid).terminate()
+
+
+class WindowsToolhelpBackend(PsutilBackend):
+    """Windows快速路径
+
+    通过 CreateToolhelp32Snapshot 一次调用取得所有进程的 pid/ppid/进程名，
+    不需要逐个打开进程句柄；命令行、工作目录等昂贵属性只对候选进程按需查询。
+    """
+
+    name = "toolhelp"
+    lightweight = True
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESSENTRY32W(ctypes.Structure):
+            _fields_ = [
+                ('dwSize', wintypes.DWORD),
+                ('cntUsage', wintypes.DWORD),
+                ('th32ProcessID', wintypes.DWORD),
+                ('th32DefaultHeapID', ctypes.c_size_t),
+                ('th32ModuleID', wintypes.DWORD),
+                ('cntThreads', wintypes.DWORD),
+                ('th32ParentProcessID', wintypes.DWORD),
+                ('pcPriClassBase', ctypes.c_long),
+                ('dwFlags', wintypes.DWORD),
+                ('szExeFile', ctypes.c_wchar * 260),
+            ]
+
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+        kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+        kernel32.Process32FirstW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+        kernel32.Process32FirstW.restype = wintypes.BOOL
+        kernel32.Process32NextW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+        kernel32.Process32NextW.restype = wintypes.BOOL
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+        self._ctypes = ctypes
+        self._kernel32 = kernel32
+        self._entry_type = PROCESSENTRY32W
+        self._invalid_handle = wintypes.HANDLE(-1).value
+
+    def iter_processes(self, attrs):
+        TH32CS_SNAPPROCESS = 0x00000002
+        ctypes = self._ctypes
+        kernel32 = self._kernel32
+
+        handle = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+        if not handle or handle == self._invalid_handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            entry = self._entry_type()
+            entry.dwSize = ctypes.sizeof(self._entry_type)
+            ok = kernel32.Process32FirstW(handle, ctypes.byref(entry))
+            while ok:
+                yield {
+                    'pid': entry.th32ProcessID,
+                    'ppid': entry.th32ParentProcessID,
+                    'name': entry.szExeFile
+                }
+                ok = kernel32.Process32NextW(handle, ctypes.byref(entry))
+        finally:
+            kernel32.CloseHandle(handle)
+
+
+class FakeBackend(ProcessBackend):
+    """内存中的假进程表，用于在任意平台上测试和基准测试状态检测
+
+    processes 中每项为包含 pid/ppid/name/exe/cmdline/cwd/create_time 的字典。
+    """
+
+    name = "fake"
+
+    def __init__(self, processes=None):
+        self.lock = threading.Lock()
+        self.processes = {}
+        self.terminated = []
+        for info in processes or []:
+            self.add(**info)
+
+    def add(self, pid, name="", exe=None, cmdline=None, cwd=None, ppid=0, create_time=None):
+        with self.lock:
+            self.processes[pid] = {
+                'pid': pid,
+                'ppid': ppid,
+                'name': name,
+                'exe': exe,
+                'cmdline': list(cmdline or []),
+                'cwd': cwd,
+                'create_time': create_time if create_time is not None else time.time()
+            }
+
+    def kill(self, pid):
+        with self.lock:
+            self.processes.pop(pid, None)
+
+    def iter_processes(self, attrs):
+        with self.lock:
+            infos = list(self.processes.values())
+        for info in infos:
+            yield {attr: info.get(attr) for attr in attrs}
+
+    def process_info(self, pid, attrs):
+        with self.lock:
+            info = self.processes.get(pid)
+        if info is None:
+            return None
+        return {attr: info.get(attr) for attr in attrs}
+
+    def cwd(self, pid):
+        with self.lock:
+            info = self.processes.get(pid)
+        return info.get('cwd') if info else None
+
+    def create_time(self, pid):
+        with self.lock:
+            info = self.processes.get(pid)
+        return info.get('create_time') if info else None
+
+    def terminate(self, pid):
+        self.terminated.append(pid)
+        self.kill(pid)
+
+
+_default_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None):
+    """按名称创建后端，未指定时Windows优先使用快速路径，失败则退回psutil"""
+    name = name or os.environ.get("SERVICES_MANAGER_PROCESS_BACKEND", "")
+    if name == "psutil":
+        return PsutilBackend()
+    if name in ("", "toolhelp") and sys.platform.startswith('win'):
+        try:
+            return WindowsToolhelpBackend()
+        except Exception as e:
+            print(f"进程快速枚举不可用，改用psutil: {e}")
+    return PsutilBackend()
+
+
+def get_backend():
+    global _default_backend
+    with _backend_lock:
+        if _default_backend is None:
+            _default_backend = create_backend()
+        return _default_backend
+
+
+def set_backend(backend):
+    """替换默认后端（测试和基准测试中注入FakeBackend）"""
+    global _default_backend
+    with _backend_lock:
+        _default_backend = backend
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+
+from jar_matcher import JAVA_EXE_NAMES
+from process_backend import get_backend
+
+
+def _normalize_path(path):
+    """统一路径格式，便于比较（忽略大小写和分隔符差异）"""
+    return os.path.normcase(os.path.normpath(path)).lower() if path else ""
+
+
+def cwd_matches(work_dir, proc_cwd):
+    """判断进程工作目录是否与配置的工作目录匹配（与原有的宽松匹配规则保持一致）"""
+    work_dir = work_dir.lower()
+    proc_cwd = proc_cwd.lower()
+    return (work_dir in proc_cwd or
+            proc_cwd in work_dir or
+            _normalize_path(work_dir) == _normalize_path(proc_cwd))
+
+
+class ProcessSnapshot:
+    """进程表快照
+
+    每个状态检查周期只枚举一次进程表，Java检测和中间件检测都通过字典查询使用同一份快照。
+    进程名、可执行文件名、jar包名和工作目录索引在首次查询时才建立，
+    只做少量查询的周期不必为全部进程建立索引。
+    """
+
+    # 枚举进程时一次性获取的属性，cwd代价较高，只对候选进程按需获取
+    ATTRS = ['pid', 'ppid', 'name', 'exe', 'cmdline', 'create_time']
+    # 轻量后端只枚举基本属性，详细属性只对Java进程补充查询
+    BASIC_ATTRS = ['pid', 'ppid', 'name']
+    DETAIL_ATTRS = ['exe', 'cmdline', 'create_time']
+
+    def __init__(self, processes=None, backend=None):
+        self.backend = backend or get_backend()
+        self.taken_at = time.time()
+        self.procs = {}       # pid -> 进程信息
+        self._by_name = None  # 小写进程名或可执行文件名 -> [pid]（首次使用时构建）
+        self._by_jar = None   # 小写jar文件名 -> [pid]（首次使用时构建）
+        self.by_cwd = {}      # 规范化工作目录 -> [pid]（按需填充）
+        self._cwd_cache = {}  # pid -> 工作目录，None表示无法获取
+        self._cmdlines = None
+        self._jar_matches = {}  # 匹配器签名 -> {服务名: pid}
+
+        start = time.perf_counter()
+        if processes is None:
+            processes = self._enumerate()
+        for info in processes:
+            pid = info.get('pid')
+            if pid is not None:
+                self.procs[pid] = info
+        self.build_time = time.perf_counter() - start
+
+    def _enumerate(self):
+        if not self.backend.lightweight:
+            yield from self.backend.iter_processes(self.ATTRS)
+            return
+        for info in self.backend.iter_processes(self.BASIC_ATTRS):
+            if (info.get('name') or "").lower() in JAVA_EXE_NAMES:
+                detail = self.backend.process_info(info['pid'], self.DETAIL_ATTRS)
+                if detail:
+                    info.update(detail)
+            yield info
+
+    @property
+    def by_name(self):
+        """进程名和可执行文件名合并为一个索引，一次遍历建立"""
+        if self._by_name is None:
+            index = self._by_name = {}
+            for pid, info in self.procs.items():
+                name = (info.get('name') or "").lower()
+                if name:
+                    index.setdefault(name, []).append(pid)
+                exe = info.get('exe')
+                if exe:
+                    exe = exe.replace('\\', '/').rpartition('/')[2].lower()
+                    if exe != name:
+                        index.setdefault(exe, []).append(pid)
+        return self._by_name
+
+    @property
+    def by_jar(self):
+        if self._by_jar is None:
+            self._by_jar = {}
+            for pid, info in self.procs.items():
+                for jar in self._jar_names(info.get('cmdline')):
+                    pids = self._by_jar.setdefault(jar, [])
+                    if not pids or pids[-1] != pid:
+                        pids.append(pid)
+        return self._by_jar
+
+    @staticmethod
+    def _jar_names(cmdline):
+        """从命令行参数中提取所有jar文件名（包括 -jar 参数和classpath中的jar）"""
+        if not cmdline:
+            return
+        for arg in cmdline:
+            lowered = arg.lower()
+            if '.jar' not in lowered:
+                continue
+            for part in lowered.replace(';', os.pathsep).split(os.pathsep):
+                part = part.strip().strip('"')
+                if part.endswith('.jar'):
+                    yield os.path.basename(part.replace('\\', '/'))
+
+    def __len__(self):
+        return len(self.procs)
+
+    def cmdlines(self):
+        """所有进程的完整命令行字符串（首次使用时构建）"""
+        if self._cmdlines is None:
+            self._cmdlines = {
+                pid: " ".join(info['cmdline'])
+                for pid, info in self.procs.items() if info.get('cmdline')
+            }
+        return self._cmdlines
+
+    def cmdline(self, pid):
+        """获取进程的完整命令行字符串"""
+        return self.cmdlines().get(pid, "")
+
+    def cwd(self, pid):
+        """按需获取进程工作目录，结果在本次快照内缓存并写入工作目录索引"""
+        if pid in self._cwd_cache:
+            return self._cwd_cache[pid]
+        cwd = self.backend.cwd(pid)
+        self._cwd_cache[pid] = cwd
+        if cwd:
+            self.by_cwd.setdefault(_normalize_path(cwd), []).append(pid)
+        return cwd
+
+    def find_jar(self, jar_name):
+        """查找命令行中包含指定jar包的进程，返回PID或None"""
+        if not jar_name:
+            return None
+        pids = self.by_jar.get(os.path.basename(jar_name).lower())
+        if pids:
+            return pids[-1]
+
+        # jar名称不是完整文件名时，退回到命令行子串匹配
+        found = None
+        for pid, cmdline in self.cmdlines().items():
+            if jar_name in cmdline:
+                found = pid
+        return found
+
+    def match_jars(self, matcher):
+        """用编译好的jar匹配器对快照中的进程一次性分类，返回 {服务名: pid}"""
+        matches = self._jar_matches.get(matcher.signature)
+        if matches is None:
+            matches = matcher.match(self.procs.values())
+            self._jar_matches[matcher.signature] = matches
+        return matches
+
+    def find_by_process_name(self, process_name):
+        """按进程名或可执行文件名查找进程，返回PID列表"""
+        return list(self.by_name.get(process_name.lower(), []))
+
+    def find_all_middleware(self, process_name, work_dir=""):
+        """查找所有匹配的中间件进程，配置了工作目录时只匹配工作目录一致的进程"""
+        candidates = self.find_by_process_name(process_name)
+        if work_dir:
+            candidates = [
+                pid for pid in candidates
+                if self.cwd(pid) and cwd_matches(work_dir, self.cwd(pid))
+            ]
+        return candidates
+
+    def find_middleware(self, process_name, work_dir=""):
+        """查找中间件进程
+
+        同名进程有多个时（如nginx的master和worker），优先返回父进程不在候选中的主进程。
+        """
+        candidates = self.find_all_middleware(process_name, work_dir)
+        if not candidates:
+            return None
+        for pid in candidates:
+            if self.procs[pid].get('ppid') not in candidates:
+                return pid
+        return candidates[0]
+
+
+class SnapshotProvider:
+    """同一检查周期内按需创建并共享一份进程表快照（线程安全）
+
+    并发执行的Java检测和中间件检测都需要全量扫描时，只枚举一次进程表。
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.snapshot is None:
+                self.snapshot = ProcessSnapshot(backend=self.backend)
+            return self.snapshot
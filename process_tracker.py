@@ -0,0 +1,181 @@
+import threading
+import time
+
+from process_backend import get_backend
+from process_snapshot import SnapshotProvider
+
+
+class PidTracker:
+    """增量PID跟踪器
+
+    记录每个受管对象的PID和进程创建时间。每个周期只校验已知PID是否存活且仍是
+    同一个进程（创建时间一致，防止PID复用），只有在跟踪的进程退出、出现新的
+    受管对象或对象被标记失效时才做一次全量进程表扫描。
+    未运行的对象按 rescan_interval 定期补扫，以便发现在管理工具之外启动的进程。
+    """
+
+    def __init__(self, rescan_interval=10, backend=None):
+        self.rescan_interval = rescan_interval
+        self._backend = backend
+        self.tracked = {}        # key -> (pid, create_time)
+        self.known = set()       # 已经通过全量扫描确认过的key
+        self.dirty = set()       # 被标记为需要重新扫描的key
+        self.last_full_scan = 0
+        self.full_scans = 0
+        self.fast_checks = 0
+        self.on_track = None     # 开始跟踪新的PID时调用（退出监视器据此刷新等待列表）
+        self.lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _create_time(self, pid):
+        return self.backend.create_time(pid)
+
+    def _is_same_process(self, pid, create_time):
+        return self.backend.is_same_process(pid, create_time)
+
+    def invalidate(self, key=None):
+        """标记对象需要在下个周期重新扫描，key为None时全部失效"""
+        with self.lock:
+            if key is None:
+                self.dirty.update(self.known)
+                self.known.clear()
+            else:
+                self.dirty.add(key)
+
+    def adopt(self, key, pid, create_time=None):
+        """直接登记已知PID（例如由管理工具自己启动的进程），无需扫描"""
+        if create_time is None:
+            create_time = self._create_time(pid)
+        if create_time is None:
+            return False
+        with self.lock:
+            self.tracked[key] = (pid, create_time)
+            self.known.add(key)
+            self.dirty.discard(key)
+        self._notify_track()
+        return True
+
+    def _notify_track(self):
+        if self.on_track:
+            try:
+                self.on_track()
+            except Exception as e:
+                print(f"PID跟踪通知失败: {e}")
+
+    def forget(self, key):
+        with self.lock:
+            self.tracked.pop(key, None)
+            self.known.discard(key)
+            self.dirty.discard(key)
+
+    def tracked_items(self):
+        """返回当前跟踪的全部 {key: (pid, create_time)}"""
+        with self.lock:
+            return dict(self.tracked)
+
+    def mark_exited(self, key, pid):
+        """进程退出通知：移除跟踪记录，对象按未运行处理（无需重新扫描）
+
+        PID与当前跟踪的不一致（已被替换）时忽略，返回是否生效。
+        """
+        with self.lock:
+            entry = self.tracked.get(key)
+            if entry is None or entry[0] != pid:
+                return False
+            del self.tracked[key]
+            self.known.add(key)
+            return True
+
+    def tracked_process(self, key):
+        """返回当前跟踪的 (pid, create_time)，未跟踪时返回None"""
+        with self.lock:
+            return self.tracked.get(key)
+
+    def retain(self, keys):
+        """只保留仍然存在的受管对象，移除已删除对象的跟踪记录"""
+        key_set = set(keys)
+        with self.lock:
+            for key in list(self.tracked):
+                if key not in key_set:
+                    del self.tracked[key]
+            self.known.intersection_update(key_set)
+            self.dirty.intersection_update(key_set)
+
+    def check(self, keys, detect, snapshots=None):
+        """返回 {key: pid}
+
+        keys:      本次需要检查的受管对象的key
+        detect:    detect(snapshot, keys) -> {key: pid}，在需要全量扫描时调用
+        snapshots: SnapshotProvider，多个并发检查共用同一周期的快照
+        """
+        keys = list(keys)
+        now = time.time()
+        result = {}
+        pending = []
+
+        with self.lock:
+            tracked = dict(self.tracked)
+            dirty = set(self.dirty)
+            known = set(self.known)
+
+        absent = []
+        for key in keys:
+            entry = tracked.get(key)
+            if entry and key not in dirty:
+                with self.lock:
+                    self.fast_checks += 1
+                if self._is_same_process(*entry):
+                    result[key] = entry[0]
+                    continue
+                # 跟踪的进程已退出
+                with self.lock:
+                    self.tracked.pop(key, None)
+                pending.append(key)
+            elif key in dirty or key not in known:
+                pending.append(key)
+            else:
+                # 上次扫描时未运行
+                absent.append(key)
+
+        # 已经需要扫描或到了定期补扫时间时，顺带检查未运行的对象
+        if pending or now - self.last_full_scan >= self.rescan_interval:
+            pending.extend(absent)
+        else:
+            for key in absent:
+                result[key] = None
+
+        if pending:
+            if snapshots is None:
+                snapshots = SnapshotProvider(self.backend)
+            snapshot = snapshots.get()
+            found = detect(snapshot, pending)
+            tracked_new = False
+            with self.lock:
+                for key in pending:
+                    pid = found.get(key)
+                    result[key] = pid
+                    self.known.add(key)
+                    self.dirty.discard(key)
+                    if pid:
+                        create_time = snapshot.procs.get(pid, {}).get('create_time') or self._create_time(pid)
+                        if create_time is not None:
+                            tracked_new = tracked_new or tracked.get(key) != (pid, create_time)
+                            self.tracked[key] = (pid, create_time)
+                self.full_scans += 1
+                self.last_full_scan = now
+            if tracked_new:
+                self._notify_track()
+
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tracked": len(self.tracked),
+                "full_scans": self.full_scans,
+                "fast_checks": self.fast_checks,
+                "last_full_scan": self.last_full_scan
+            }
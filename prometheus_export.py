@@ -0,0 +1,111 @@
+import math
+import time
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PREFIX = "earth"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+class MetricsText:
+    """按Prometheus文本格式（0.0.4）拼接指标，同名指标的样本归在一个 HELP/TYPE 下"""
+
+    def __init__(self):
+        self.families = {}   # 指标名 -> (类型, 说明, 样本列表)
+
+    def add(self, name, metric_type, help_text, value, labels=None, suffix=""):
+        name = f"{PREFIX}_{name}"
+        family = self.families.get(name)
+        if family is None:
+            family = (metric_type, help_text, [])
+            self.families[name] = family
+        family[2].append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+    def render(self):
+        lines = []
+        for name, (metric_type, help_text, samples) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def render(snapshot, operations=(), now=None):
+    """把后台状态检查线程生成的快照渲染为Prometheus文本
+
+    snapshot 为 ServiceManager.export_snapshot，operations 为 JobExecutor.stats()。
+    渲染只读取已有数据，不会触发进程表扫描。
+    """
+    now = now or time.time()
+    text = MetricsText()
+
+    text.add("snapshot_age_seconds", "gauge", "Seconds since the status snapshot was produced",
+             round(now - snapshot["time"], 3) if snapshot.get("time") else None)
+    text.add("polling_paused", "gauge", "1 when nobody is watching and status polling runs at the slowest interval",
+             snapshot.get("paused", False))
+    text.add("status_poll_interval_seconds", "gauge",
+             "Current status polling interval; a snapshot older than a few intervals is stale",
+             snapshot.get("poll_interval"))
+    text.add("status_ticks_total", "counter", "Status check ticks since start", snapshot.get("ticks", 0))
+    text.add("status_tick_duration_seconds", "gauge", "Duration of the last status check tick",
+             snapshot.get("tick_duration"))
+
+    for target in snapshot.get("targets", []):
+        labels = {"kind": target["kind"], "name": target["name"]}
+        text.add("target_up", "gauge", "1 when the target process or service is running, NaN when unknown",
+                 target["up"], labels)
+        text.add("target_ready", "gauge", "1 when the target passed its readiness probes, NaN when unknown",
+                 target["ready"], labels)
+        text.add("target_pid_restarts_total", "counter", "Times the target came back with a different PID",
+                 target.get("restarts", 0), labels)
+
+    for target, values in snapshot.get("resources", {}).items():
+        kind, _, name = target.partition(":")
+        labels = {"kind": kind, "name": name}
+        text.add("process_cpu_percent", "gauge", "Process CPU usage in percent of one core", values["cpu"], labels)
+        text.add("process_resident_memory_bytes", "gauge", "Process resident set size", values["rss"], labels)
+        text.add("process_threads", "gauge", "Process thread count", values["threads"], labels)
+        text.add("process_handles", "gauge", "Process handle count (open fds outside Windows)", values["handles"], labels)
+
+    collector = snapshot.get("collector", {})
+    for name, latency in collector.get("latency", {}).items():
+        text.add("collector_latency_seconds", "gauge", "Duration of the last run of each status collector",
+                 latency / 1000, {"collector": name})
+    for name, count in collector.get("timeouts", {}).items():
+        text.add("collector_timeouts_total", "counter", "Status collector runs that timed out",
+                 count, {"collector": name})
+
+    for operation in operations:
+        labels = {"kind": operation["kind"], "action": operation["action"], "status": operation["status"]}
+        text.add("operations_total", "counter", "Completed start/stop/restart/reload operations",
+                 operation["count"], labels)
+        text.add("operation_duration_seconds", "summary", "Time spent executing operations",
+                 round(operation["duration"], 6), labels, suffix="_sum")
+        text.add("operation_duration_seconds", "summary", "Time spent executing operations",
+                 operation["count"], labels, suffix="_count")
+
+    return text.render()
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import re
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class ReadinessProber:
+    """就绪探测
+
+    进程存在不代表已经可用（JVM仍在预热、nginx端口绑定失败等），
+    每个对象可以在配置中通过 "readiness" 指定一个或多个探测，全部通过才视为就绪：
+
+        {"type": "tcp", "port": 8761, "host": "127.0.0.1"}
+        {"type": "http", "url": "http://127.0.0.1:8761/actuator/health", "expect_status": [200]}
+        {"type": "log", "path": "logs/app.log", "pattern": "Started .* in"}
+
+    所有探测在后台线程的 asyncio 事件循环中并发执行，单个探测超时只影响对应对象。
+    日志探测只认可进程启动之后写入的日志。
+    """
+
+    def __init__(self, default_timeout=2, log_tail_bytes=64 * 1024):
+        self.default_timeout = default_timeout
+        self.log_tail_bytes = log_tail_bytes
+        self.patterns = {}   # 正则缓存
+        self.results = {}    # key -> 最近一次探测结果
+        self.lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="readiness-probe")
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @staticmethod
+    def probes_of(config):
+        """取得对象配置中的探测列表，未配置时返回空列表"""
+        readiness = (config or {}).get("readiness")
+        if not readiness:
+            return []
+        if isinstance(readiness, dict):
+            readiness = [readiness]
+        return [probe for probe in readiness if isinstance(probe, dict) and probe.get("type")]
+
+    def _pattern(self, pattern):
+        compiled = self.patterns.get(pattern)
+        if compiled is None:
+            compiled = re.compile(pattern)
+            self.patterns[pattern] = compiled
+        return compiled
+
+    async def _probe_tcp(self, probe, context):
+        host = probe.get("host", "127.0.0.1")
+        port = int(probe["port"])
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        return True, f"{host}:{port} 可连接"
+
+    async def _probe_http(self, probe, context):
+        url = probe["url"]
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        ssl_context = None
+        if https:
+            ssl_context = ssl.create_default_context()
+            if probe.get("verify") is False:
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=ssl_context)
+        try:
+            path = parts.path or "/"
+            if parts.query:
+                path = f"{path}?{parts.query}"
+            writer.write(f"GET {path} HTTP/1.0\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n".encode("ascii"))
+            await writer.drain()
+            status_line = (await reader.readline()).decode("latin-1").split()
+        finally:
+            writer.close()
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            return False, "无效的HTTP响应"
+        code = int(status_line[1])
+        expect = probe.get("expect_status")
+        if expect:
+            ok = code in (expect if isinstance(expect, list) else [expect])
+        else:
+            ok = 200 <= code < 400
+        return ok, f"HTTP {code}"
+
+    def _scan_log(self, path, pattern, since):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False, "日志文件不存在"
+        if since and stat.st_mtime < since:
+            return False, "进程启动后日志未更新"
+        with open(path, 'rb') as f:
+            f.seek(max(0, stat.st_size - self.log_tail_bytes))
+            text = f.read().decode("utf-8", errors="replace")
+        if self._pattern(pattern).search(text):
+            return True, "日志已就绪"
+        return False, "未找到就绪日志"
+
+    async def _probe_log(self, probe, context):
+        path = probe["path"]
+        if not os.path.isabs(path) and context.get("base_dir"):
+            path = os.path.join(context["base_dir"], path)
+        return await self.loop.run_in_executor(None, self._scan_log, path, probe["pattern"], context.get("since"))
+
+    async def _probe_target(self, key, probes, context):
+        start = time.perf_counter()
+        ready = True
+        message = ""
+        for probe in probes:
+            handler = getattr(self, f"_probe_{probe['type']}", None)
+            if handler is None:
+                ready, message = False, f"不支持的探测类型: {probe['type']}"
+                break
+            try:
+                ready, message = await asyncio.wait_for(handler(probe, context),
+                                                        probe.get("timeout", self.default_timeout))
+            except asyncio.TimeoutError:
+                ready, message = False, f"{probe['type']} 探测超时"
+            except Exception as e:
+                ready, message = False, f"{probe['type']} 探测失败: {e}"
+            if not ready:
+                break
+        return key, {
+            "ready": ready,
+            "message": message,
+            "latency": round((time.perf_counter() - start) * 1000, 3),
+            "checked_at": time.time()
+        }
+
+    async def _probe_all(self, items):
+        results = await asyncio.gather(*(self._probe_target(key, item["probes"], item)
+                                         for key, item in items.items()))
+        return dict(results)
+
+    def probe_many(self, items, timeout=None):
+        """并发执行探测
+
+        items: {key: {"probes": [...], "since": 进程启动时间, "base_dir": 相对路径的基准目录}}
+        返回 {key: {"ready", "message", "latency"(毫秒), "checked_at"}}
+        """
+        if not items:
+            return {}
+        timeout = timeout or self.default_timeout * 2
+        future = asyncio.run_coroutine_threadsafe(self._probe_all(items), self.loop)
+        try:
+            results = future.result(timeout)
+        except Exception as e:
+            future.cancel()
+            print(f"就绪探测超时或失败: {e}")
+            results = {key: {"ready": False, "message": "探测超时", "latency": None, "checked_at": time.time()}
+                       for key in items}
+        with self.lock:
+            self.results.update(results)
+        return results
+
+    def retain(self, keys):
+        """移除已删除对象的探测结果"""
+        key_set = set(keys)
+        with self.lock:
+            for key in list(self.results):
+                if key not in key_set:
+                    del self.results[key]
+
+    def stats(self):
+        with self.lock:
+            return {"{}:{}".format(*key): dict(result) for key, result in self.results.items()}
@@ -0,0 +1,99 @@
+import threading
+import time
+
+
+class _Batch:
+    """一批合并执行的重载请求"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.waiters = 1
+
+
+class ReloadCoalescer:
+    """按中间件合并重载请求
+
+    修改配置后往往会连续触发多次重载（批量添加代理、修改端口后自动重载等），
+    第一个请求到达后等待 window 秒，期间同一中间件的其他请求并入同一批，
+    窗口结束后只执行一次重载，所有调用者得到同一个结果。
+    重载执行期间到达的请求会开始新的一批，保证它们看到的是最新配置。
+    """
+
+    def __init__(self, window=0.5):
+        self.window = window
+        self.lock = threading.Lock()
+        self.pending = {}     # key -> 正在收集请求的批次
+        self.run_locks = {}   # key -> 执行锁（同一对象的重载串行执行）
+        self.metrics = {}     # key -> 统计信息
+
+    def _metrics_for(self, key):
+        metrics = self.metrics.get(key)
+        if metrics is None:
+            metrics = {"requests": 0, "executions": 0, "saved": 0, "last_batch": 0, "last_run": None, "last_duration": None}
+            self.metrics[key] = metrics
+        return metrics
+
+    def request(self, key, func):
+        """请求执行一次重载，返回 func() 的结果（可能与其他调用者共享）
+
+        func 抛出异常时返回 {"status": "error", "message": ...}。
+        """
+        with self.lock:
+            metrics = self._metrics_for(key)
+            metrics["requests"] += 1
+            batch = self.pending.get(key)
+            if batch is not None:
+                batch.waiters += 1
+                metrics["saved"] += 1
+                leader = False
+            else:
+                batch = _Batch()
+                self.pending[key] = batch
+                leader = True
+            run_lock = self.run_locks.setdefault(key, threading.Lock())
+
+        if not leader:
+            batch.event.wait()
+            return batch.result
+
+        try:
+            time.sleep(self.window)
+            with run_lock:
+                with self.lock:
+                    # 关闭本批次，之后到达的请求进入下一批
+                    if self.pending.get(key) is batch:
+                        del self.pending[key]
+                    metrics["last_batch"] = batch.waiters
+                started = time.perf_counter()
+                try:
+                    batch.result = func()
+                except Exception as e:
+                    batch.result = {"status": "error", "message": str(e)}
+                with self.lock:
+                    metrics["executions"] += 1
+                    metrics["last_run"] = time.time()
+                    metrics["last_duration"] = round((time.perf_counter() - started) * 1000, 3)
+        finally:
+            with self.lock:
+                if self.pending.get(key) is batch:
+                    del self.pending[key]
+            batch.event.set()
+        return batch.result
+
+    def forget(self, key):
+        """对象被删除后清理统计信息"""
+        with self.lock:
+            if key not in self.pending:
+                self.metrics.pop(key, None)
+                self.run_locks.pop(key, None)
+
+    def stats(self):
+        """返回每个对象的请求数、实际执行次数和被合并（节省）的次数"""
+        with self.lock:
+            result = {str(key): dict(metrics) for key, metrics in self.metrics.items()}
+        return {
+            "window": self.window,
+            "targets": result,
+            "saved": sum(metrics["saved"] for metrics in result.values())
+        }
@@ -0,0 +1,83 @@
+import copy
+import threading
+
+
+class StatusBroadcaster:
+    """基于差量的状态推送
+
+    记录上一次发送给客户端的状态，每个周期只推送发生变化的条目（带版本号的增量），
+    状态没有变化时不发送任何消息。客户端连接或重连时通过 full_sync 获取一次全量状态，
+    收到的增量 base 与本地版本不一致时应请求重新同步。
+    """
+
+    SECTIONS = ('services', 'java', 'middleware')
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.version = 0
+        self.state = {section: {} for section in self.SECTIONS}
+        self.lock = threading.Lock()
+        self.deltas_sent = 0
+        self.ticks_skipped = 0
+
+    def diff(self, status):
+        """计算新状态相对上次发送状态的变化，返回 (changes, removed)"""
+        changes = {}
+        removed = {}
+        for section in self.SECTIONS:
+            old = self.state.get(section, {})
+            new = status.get(section, {})
+            changed = {name: value for name, value in new.items() if old.get(name) != value}
+            gone = [name for name in old if name not in new]
+            if changed:
+                changes[section] = changed
+            if gone:
+                removed[section] = gone
+        return changes, removed
+
+    def publish(self, status):
+        """发布一次状态检查结果，有变化时推送增量并返回增量内容，否则返回None"""
+        with self.lock:
+            return self._publish(status)
+
+    def _publish(self, status):
+        # 需持有 self.lock：计算增量、分配版本号和推送在同一个临界区内完成，
+        # 多个线程同时发布时客户端收到的增量版本号严格递增，不会因乱序而频繁重新同步
+        changes, removed = self.diff(status)
+        if not changes and not removed:
+            self.ticks_skipped += 1
+            return None
+
+        for section, changed in changes.items():
+            self.state[section].update(copy.deepcopy(changed))
+        for section, names in removed.items():
+            for name in names:
+                self.state[section].pop(name, None)
+
+        self.version += 1
+        delta = {
+            'version': self.version,
+            'base': self.version - 1,
+            'changes': changes,
+            'removed': removed
+        }
+        self.deltas_sent += 1
+        self.emit('status_delta', delta)
+        return delta
+
+    def update_entry(self, section, name, value):
+        """单个条目状态变化时立即推送（无需等待下一个检查周期）"""
+        with self.lock:
+            # 在锁内基于最新状态构造，避免用旧的状态副本覆盖其他线程刚发布的变化
+            status = dict(self.state)
+            status[section] = dict(status.get(section, {}))
+            status[section][name] = value
+            return self._publish(status)
+
+    def full_sync(self):
+        """返回当前全量状态，用于客户端首次连接或重新同步"""
+        with self.lock:
+            return {
+                'version': self.version,
+                'status': copy.deepcopy(self.state)
+            }
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class StatusCollector:
+    """并发状态采集
+
+    在有界线程池中并发执行各采集任务（每个Windows服务的SCM查询、Java检测、
+    各中间件检测），每个任务有独立的超时时间。超时或出错的任务只把自己对应的
+    对象标记为未知，不会拖住整个状态推送；上一次仍未返回的任务不会重复提交。
+    """
+
+    UNKNOWN = object()
+
+    def __init__(self, max_workers=8, timeout=5):
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="status-collector")
+        self.inflight = {}   # key -> 仍在执行的future
+        self.latency = {}    # 采集器名称 -> 最近一次耗时（秒）
+        self.timeouts = {}   # 采集器名称 -> 超时次数
+        self.lock = threading.Lock()
+
+    def _run_task(self, collector, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            with self.lock:
+                self.latency[collector] = time.perf_counter() - start
+
+    def run(self, tasks, timeout=None):
+        """并发执行任务
+
+        tasks: {key: (采集器名称, 可调用对象)}
+        返回 {key: 结果}，超时、出错或上次仍在执行的任务结果为 UNKNOWN
+        """
+        timeout = self.timeout if timeout is None else timeout
+        results = {}
+        futures = {}
+
+        with self.lock:
+            for key, (collector, func) in tasks.items():
+                previous = self.inflight.get(key)
+                if previous is not None and not previous.done():
+                    # 上次的任务还卡着，不再重复占用工作线程
+                    results[key] = self.UNKNOWN
+                    continue
+                future = self.executor.submit(self._run_task, collector, func)
+                self.inflight[key] = future
+                futures[future] = (key, collector)
+
+        done, not_done = wait(futures, timeout=timeout)
+        for future in done:
+            key, collector = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"状态采集失败 {collector}: {e}")
+                results[key] = self.UNKNOWN
+        for future in not_done:
+            key, collector = futures[future]
+            print(f"状态采集超时 {collector}: {key}")
+            with self.lock:
+                self.timeouts[collector] = self.timeouts.get(collector, 0) + 1
+            results[key] = self.UNKNOWN
+
+        with self.lock:
+            for future in done:
+                key = futures[future][0]
+                if self.inflight.get(key) is future:
+                    del self.inflight[key]
+        return results
+
+    def stats(self):
+        with self.lock:
+            return {
+                "latency": {name: round(value * 1000, 3) for name, value in self.latency.items()},
+                "timeouts": dict(self.timeouts),
+                "inflight": sum(1 for future in self.inflight.values() if not future.done())
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,236 @@
+import threading
+import time
+from collections import deque
+
+
+class Supervisor:
+    """进程守护：意外退出的对象按指数退避自动重启
+
+    只守护配置中开启了 "supervise" 的对象，可以是 true，也可以指定参数：
+
+        "supervise": {"base_delay": 2, "max_delay": 60, "max_restarts": 5, "window": 300, "start_grace": 30}
+
+    由状态检查循环调用 observe() 驱动。对象从运行变为停止、且之前没有通过
+    expect_stop() 声明过停止（用户停止、删除等），即视为崩溃，
+    等待 base_delay * 2^n 秒（最多 max_delay 秒）后调用 restart(key)。
+    重启后 start_grace 秒内仍未检测到进程、或重启命令失败，同样按崩溃处理。
+    window 秒内崩溃超过 max_restarts 次视为崩溃循环，停止自动重启，
+    直到用户手动启动该对象。所有事件都会记录并通过 notify 推送。
+    """
+
+    DEFAULTS = {"base_delay": 2, "max_delay": 60, "max_restarts": 5, "window": 300,
+                "stable_after": 60, "start_grace": 30}
+
+    def __init__(self, restart, notify=None, max_events=500):
+        self.restart = restart
+        self.notify = notify
+        self.states = {}     # key -> 守护状态
+        self.events = deque(maxlen=max_events)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def options_of(cls, config):
+        """取得对象的守护参数，未开启守护时返回None"""
+        supervise = (config or {}).get("supervise")
+        if not supervise:
+            return None
+        options = dict(cls.DEFAULTS)
+        if isinstance(supervise, dict):
+            options.update({name: value for name, value in supervise.items() if name in cls.DEFAULTS})
+        return options
+
+    def _state(self, key):
+        state = self.states.get(key)
+        if state is None:
+            state = {
+                "running": None,         # 最近一次观察到的状态
+                "running_since": None,
+                "expect_stop": False,
+                "attempts": 0,           # 连续重启次数，决定退避时间
+                "crashes": deque(),      # window 内的崩溃时间
+                "timer": None,
+                "timer_id": None,
+                "next_restart": None,
+                "launched_at": None,     # 自动重启的时间，检测到进程后清除
+                "restarting": False,
+                "gave_up": False
+            }
+            self.states[key] = state
+        return state
+
+    def _record(self, key, event, message, **fields):
+        item = {"time": time.time(), "target": "{}:{}".format(*key), "event": event, "message": message}
+        item.update(fields)
+        with self.lock:
+            self.events.append(item)
+        print(f"进程守护 {item['target']}: {message}")
+        if self.notify:
+            try:
+                self.notify('supervisor_event', item)
+            except Exception as e:
+                print(f"守护事件推送失败: {e}")
+
+    def _cancel(self, state):
+        if state["timer"]:
+            state["timer"].cancel()
+            state["timer"] = None
+        state["next_restart"] = None
+        state["launched_at"] = None
+
+    def expect_stop(self, key):
+        """声明接下来的停止是预期的（用户停止、删除等），不触发自动重启"""
+        with self.lock:
+            state = self._state(key)
+            state["expect_stop"] = True
+            self._cancel(state)
+
+    def stop_failed(self, key):
+        """停止操作失败（进程仍在运行），撤销 expect_stop，之后的意外退出仍按崩溃处理"""
+        with self.lock:
+            state = self.states.get(key)
+            if state is not None:
+                state["expect_stop"] = False
+
+    def user_started(self, key):
+        """用户手动启动对象：清除崩溃循环状态（守护自身发起的重启不受影响）"""
+        with self.lock:
+            state = self.states.get(key)
+            if state is None or state["restarting"]:
+                return
+            state["expect_stop"] = False
+            state["gave_up"] = False
+            state["attempts"] = 0
+            state["crashes"].clear()
+            self._cancel(state)
+
+    def forget(self, key):
+        with self.lock:
+            state = self.states.pop(key, None)
+            if state:
+                self._cancel(state)
+
+    def retain(self, keys):
+        key_set = set(keys)
+        with self.lock:
+            for key in list(self.states):
+                if key not in key_set:
+                    self._cancel(self.states.pop(key))
+
+    def _schedule(self, key, state, options, now):
+        """登记一次崩溃并安排重启，返回 (是否进入崩溃循环, 退避秒数)，需持有 self.lock"""
+        crashes = state["crashes"]
+        crashes.append(now)
+        while crashes and now - crashes[0] > options["window"]:
+            crashes.popleft()
+        state["launched_at"] = None
+        if len(crashes) > options["max_restarts"]:
+            state["gave_up"] = True
+            return True, None
+        delay = min(options["base_delay"] * (2 ** state["attempts"]), options["max_delay"])
+        state["attempts"] += 1
+        state["options"] = options
+        state["next_restart"] = now + delay
+        timer_id = object()
+        timer = threading.Timer(delay, self._restart, args=(key, timer_id))
+        timer.daemon = True
+        state["timer"] = timer
+        state["timer_id"] = timer_id
+        timer.start()
+        return False, delay
+
+    def _report(self, key, give_up, delay, reason, attempt, window=None, crashes=0, **fields):
+        if give_up:
+            self._record(key, "crash_loop",
+                         f"{reason}，{window} 秒内崩溃 {crashes} 次，已停止自动重启，请检查后手动启动", **fields)
+        else:
+            self._record(key, "crash", f"{reason}，{delay} 秒后第 {attempt} 次重启",
+                         delay=delay, attempt=attempt, **fields)
+
+    def observe(self, key, running, config, now=None):
+        """状态检查循环每次得到对象状态后调用（状态未知时不要调用）"""
+        now = now or time.time()
+        options = self.options_of(config)
+        reason = None
+        uptime = None
+        with self.lock:
+            state = self._state(key)
+            previous = state["running"]
+            state["running"] = running
+            if running:
+                state["launched_at"] = None
+                if not previous:
+                    state["running_since"] = now
+                    state["expect_stop"] = False
+                elif state["attempts"] and now - state["running_since"] >= (options or self.DEFAULTS)["stable_after"]:
+                    # 重启后稳定运行一段时间，重置退避
+                    state["attempts"] = 0
+                return
+            if options is None:
+                self._cancel(state)
+                state["expect_stop"] = False
+                return
+            if state["restarting"] or state["timer"] or state["gave_up"]:
+                return
+            if previous and not state["expect_stop"]:
+                uptime = round(now - state["running_since"], 1) if state["running_since"] else None
+                reason = f"意外退出（运行了 {uptime} 秒）"
+            elif state["launched_at"] and now - state["launched_at"] > options["start_grace"]:
+                reason = f"自动重启后 {options['start_grace']} 秒内未检测到进程"
+            state["expect_stop"] = False
+            if reason is None:
+                return
+            give_up, delay = self._schedule(key, state, options, now)
+            attempt = state["attempts"]
+            crashes = len(state["crashes"])
+        self._report(key, give_up, delay, reason, attempt, options["window"], crashes, uptime=uptime)
+
+    def _restart(self, key, timer_id):
+        with self.lock:
+            state = self.states.get(key)
+            if state is None or state["timer_id"] is not timer_id or state["timer"] is None:
+                return
+            state["timer"] = None
+            state["next_restart"] = None
+            state["restarting"] = True
+            attempt = state["attempts"]
+        try:
+            result = self.restart(key) or {}
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        with self.lock:
+            state["restarting"] = False
+            succeeded = result.get("status") == "success"
+            if succeeded:
+                state["launched_at"] = time.time()
+            elif self.states.get(key) is state and not state["expect_stop"]:
+                # 重启命令失败，按崩溃处理继续退避
+                options = state["options"]
+                give_up, delay = self._schedule(key, state, options, time.time())
+                next_attempt = state["attempts"]
+                crashes = len(state["crashes"])
+            else:
+                return
+        if succeeded:
+            self._record(key, "restart", f"第 {attempt} 次自动重启: {result.get('message', '')}", attempt=attempt)
+        else:
+            self._report(key, give_up, delay, f"第 {attempt} 次自动重启失败: {result.get('message', '')}",
+                         next_attempt, options["window"], crashes)
+
+    def list_events(self, limit=100, target=None):
+        with self.lock:
+            events = [event for event in self.events if target is None or event["target"] == target]
+        return list(reversed(events[-limit:]))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "{}:{}".format(*key): {
+                    "running": state["running"],
+                    "attempts": state["attempts"],
+                    "recent_crashes": len(state["crashes"]),
+                    "next_restart": state["next_restart"],
+                    "restarting": state["restarting"],
+                    "gave_up": state["gave_up"]
+                }
+                for key, state in self.states.items()
+            }
@@ -0,0 +1,238 @@
+import calendar
+import os
+
+import pytest
+
+import access_log
+import nginx_conf
+from access_log import (BUCKET_BOUNDS, COMBINED_FORMAT, Histogram, LocationMatcher, TargetAnalytics, UNMATCHED,
+                        compile_format, parse_time_local, parse_upstream_time)
+
+
+MAIN_FORMAT = ('$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+               '"$http_referer" "$http_user_agent" $request_time $upstream_response_time')
+
+CONF = """\
+http {
+    log_format main '$remote_addr - $remote_user [$time_local] "$request" '
+                    '$status $body_bytes_sent "$http_referer" '
+                    '"$http_user_agent" $request_time $upstream_response_time';
+    server {
+        listen 80;
+        server_name localhost;
+        access_log logs/access.log main;
+        location / {
+            root html;
+        }
+        location /api/ {
+            proxy_pass http://127.0.0.1:8080/;
+        }
+    }
+}
+"""
+
+
+def line(uri="/api/users", status=200, nbytes=512, request_time="0.020", upstream="0.015",
+         time_local="17/Oct/2026:10:00:00 +0800"):
+    return (f'10.0.0.1 - - [{time_local}] "GET {uri}?page=1 HTTP/1.1" {status} {nbytes} '
+            f'"-" "curl/8.0" {request_time} {upstream}\n')
+
+
+def parse(fmt, text):
+    regex, fields = compile_format(fmt)
+    match = regex.search(text.encode("utf-8"))
+    assert match is not None
+    return {field: match.group(index + 1) for field, index in fields.items()}
+
+
+def test_compile_format_main():
+    values = parse(MAIN_FORMAT, line())
+    assert values == {"time_local": b"17/Oct/2026:10:00:00 +0800", "uri": b"/api/users", "status": b"200",
+                      "bytes": b"512", "request_time": b"0.020", "upstream_time": b"0.015"}
+
+
+@pytest.mark.parametrize("upstream, expected", [
+    ("-", None),
+    ("0.010, 0.020", 0.03),
+    ("0.010 : 0.020", 0.03),
+    ("0.010, -", 0.01),
+])
+def test_upstream_time_variants(upstream, expected):
+    values = parse(MAIN_FORMAT, line(upstream=upstream))
+    assert values["upstream_time"] == upstream.encode()
+    result = parse_upstream_time(values["upstream_time"])
+    assert result == pytest.approx(expected) if expected is not None else result is None
+
+
+def test_compile_format_combined_and_unparsed_lines():
+    regex, fields = compile_format(COMBINED_FORMAT)
+    assert "request_time" not in fields
+    data = (b'1.2.3.4 - - [17/Oct/2026:10:00:00 +0000] "POST /login HTTP/1.1" 302 0 "-" "Mozilla/5.0 (X)"\n'
+            b'garbage line\n')
+    matches = list(regex.finditer(data))
+    assert len(matches) == 1
+    assert matches[0].group(fields["uri"] + 1) == b"/login"
+
+
+def test_parse_time_local():
+    expected = calendar.timegm((2026, 10, 17, 2, 0, 0))
+    assert parse_time_local(b"17/Oct/2026:10:00:00 +0800") == expected
+    assert parse_time_local(b"16/Oct/2026:21:30:00 -0430") == expected
+
+
+def test_location_matcher_precedence():
+    matcher = LocationMatcher([
+        ("", "/", "/", None),
+        ("", "/static/", "/static/", None),
+        ("^~", "/static/img/", "^~ /static/img/", None),
+        ("~", r"\.php$", r"~ \.php$", None),
+        ("~*", r"\.(png|jpg)$", r"~* \.(png|jpg)$", None),
+        ("=", "/static/index.php", "= /static/index.php", None),
+        ("", "/api/", "/api/", "http://127.0.0.1:8080/"),
+    ])
+    # 精确匹配优先于一切
+    assert matcher.match(b"/static/index.php") == "= /static/index.php"
+    # 最长前缀带 ^~ 时不再检查正则
+    assert matcher.match(b"/static/img/logo.png") == "^~ /static/img/"
+    # 正则按配置顺序，先于普通前缀
+    assert matcher.match(b"/static/app.php") == r"~ \.php$"
+    assert matcher.match(b"/static/a.PNG") == r"~* \.(png|jpg)$"
+    # 没有正则命中时使用最长前缀
+    assert matcher.match(b"/static/app.js") == "/static/"
+    assert matcher.match(b"/api/%75sers") == "/api/"
+    assert matcher.match(b"/other") == "/"
+    assert matcher.match(b"") == UNMATCHED
+    assert matcher.targets["/api/"] == "http://127.0.0.1:8080/"
+
+
+def test_location_matcher_without_root_prefix():
+    matcher = LocationMatcher([("", "/api/", "/api/", None)])
+    assert matcher.match(b"/index.html") == UNMATCHED
+
+
+def test_histogram_percentile_bounds():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) is None
+    values = [0.001 * (index + 1) for index in range(1000)]   # 1ms - 1s
+    for value in values:
+        histogram.add(value)
+    step = 2 ** 0.25
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        estimate = histogram.percentile(q)
+        # 取所在桶的上界：不低于真实值，相对误差不超过一个桶宽
+        assert exact <= estimate <= exact * step + 1e-9
+    assert histogram.percentile(1.0) == pytest.approx(1.0)
+    summary = histogram.summary()
+    assert summary["count"] == 1000 and summary["max"] == 1.0
+
+
+def test_histogram_overflow_and_roundtrip():
+    histogram = Histogram()
+    histogram.add(BUCKET_BOUNDS[-1] * 10)
+    assert histogram.percentile(0.99) == BUCKET_BOUNDS[-1] * 10
+    other = Histogram.from_dict(histogram.to_dict())
+    other.merge(histogram)
+    assert other.count == 2 and other.max == histogram.max
+
+
+@pytest.fixture
+def nginx(tmp_path):
+    (tmp_path / "logs").mkdir()
+    conf = tmp_path / "nginx.conf"
+    conf.write_text(CONF, encoding="utf-8")
+    nginx_conf.invalidate(str(conf))
+    log = tmp_path / "logs" / "access.log"
+    log.write_text("", encoding="utf-8")
+    return tmp_path, str(conf), str(log)
+
+
+def analytics(nginx, initial_bytes=1024 * 1024):
+    work_dir, conf, _ = nginx
+    return TargetAnalytics(("middleware", "nginx"), str(work_dir), conf,
+                           str(work_dir / "state.access.json"), initial_bytes)
+
+
+def poll(entry):
+    entry.poll(64 * 1024, float("inf"))
+
+
+def append(path, *lines):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def requests_of(entry, label):
+    return entry.locations[label].total.requests
+
+
+def test_tail_reads_incrementally_and_resumes_from_saved_offset(nginx):
+    _, _, log = nginx
+    entry = analytics(nginx)
+    append(log, line(), line(uri="/index.html", status=404), line(status=502, upstream="-"))
+    poll(entry)
+    assert requests_of(entry, "/api/") == 2
+    assert requests_of(entry, "/") == 1
+    api = entry.locations["/api/"].total.summary()
+    assert api["status"]["5xx"] == 1 and api["upstream_response_time"]["count"] == 1
+
+    # 未结束的行等写完再解析
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(line()[:20])
+    poll(entry)
+    assert requests_of(entry, "/api/") == 2
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(line()[20:])
+    poll(entry)
+    assert requests_of(entry, "/api/") == 3
+
+    entry.save()
+    resumed = analytics(nginx)
+    append(log, line())
+    poll(resumed)
+    # 从保存的位置继续：累计值不重复计算已读过的行
+    assert requests_of(resumed, "/api/") == 4
+    assert resumed.sources[log].unparsed == 0
+
+
+def test_tail_restarts_after_truncation_and_rotation(nginx):
+    _, _, log = nginx
+    entry = analytics(nginx)
+    append(log, line(), line(), line())
+    poll(entry)
+    assert requests_of(entry, "/api/") == 3
+
+    # 清空后重新写入（比原来短）：从头读取
+    with open(log, "w", encoding="utf-8") as f:
+        f.write(line(uri="/index.html"))
+    poll(entry)
+    assert requests_of(entry, "/") == 1
+
+    # 轮转为内容不同的新文件，且比已读位置更长：按文件开头识别
+    os.replace(log, log + ".1")
+    with open(log, "w", encoding="utf-8") as f:
+        f.writelines([line(uri="/rotated/a", time_local="18/Oct/2026:10:00:00 +0800")] * 3)
+    poll(entry)
+    assert requests_of(entry, "/") == 4
+
+
+def test_first_poll_reads_only_the_tail(nginx):
+    _, _, log = nginx
+    append(log, *[line() for _ in range(100)])
+    entry = analytics(nginx, initial_bytes=len(line()) * 10 + 5)
+    poll(entry)
+    # 从末尾 initial_bytes 之后的第一个完整行开始
+    assert requests_of(entry, "/api/") == 10
+
+
+def test_summary_window_and_unmatched(nginx):
+    _, _, log = nginx
+    entry = analytics(nginx)
+    append(log, line(), "not an access log line\n")
+    poll(entry)
+    result = entry.summary(300, access_log.time.time())
+    assert result["lines"] == 1
+    assert result["files"][0]["unparsed"] == 1
+    api = next(item for item in result["locations"] if item["location"] == "/api/")
+    assert api["target"] == "http://127.0.0.1:8080/"
+    assert api["total"]["requests"] == 1
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from job_executor import run_batch
+
+
+def target(name, action="start", error=None):
+    return {"kind": "java", "name": name, "action": action, "error": error}
+
+
+def test_run_batch_results_in_request_order():
+    targets = [target("a"), target("b", error="进程不存在"), target("c"), target("d")]
+
+    def run(item):
+        if item["name"] == "c":
+            raise OSError("拒绝访问")
+        if item["name"] == "a":
+            time.sleep(0.05)
+        return {"status": "success", "message": f"{item['name']} 已启动"}
+
+    pushed = []
+    progress = []
+    results = run_batch(targets, run, 4, lambda index, result: pushed.append(index),
+                        lambda value, message: progress.append(value))
+    assert [(item["name"], item["status"]) for item in results] == [
+        ("a", "success"), ("b", "error"), ("c", "error"), ("d", "success")]
+    assert results[1]["message"] == "进程不存在"
+    assert results[2]["message"] == "拒绝访问"
+    # 校验失败的对象最先推送，其余按完成顺序推送
+    assert pushed[0] == 1 and sorted(pushed) == [0, 1, 2, 3]
+    assert progress[-1] == 100 and progress == sorted(progress)
+
+
+def test_run_batch_limits_concurrency():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def run(item):
+        with lock:
+            running.append(item["name"])
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(item["name"])
+        return {"status": "success"}
+
+    results = run_batch([target(str(index)) for index in range(8)], run, 2)
+    assert all(item["status"] == "success" for item in results)
+    assert max(peak) == 2
+
+
+def test_run_batch_with_only_invalid_targets():
+    def run(item):
+        raise AssertionError("不应执行")
+
+    results = run_batch([target("x", action="reload", error="不支持的操作: java/reload")], run, 4)
+    assert results == [{"kind": "java", "name": "x", "action": "reload", "status": "error",
+                        "message": "不支持的操作: java/reload"}]
@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from config_store import ConfigStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"a": {"port": 1}, "b": {"port": 2}}), encoding="utf-8")
+    store = ConfigStore(str(path), runtime_defaults={"pid": None}, watch_interval=3600)
+    yield store
+    store.watching = False
+
+
+def write_external(store, data):
+    with open(store.path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    # 保证修改时间变化
+    stat = os.stat(store.path)
+    os.utime(store.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_external_change_swaps_dict_and_keeps_runtime_fields(store):
+    old = store.data
+    old["a"]["pid"] = 42
+    write_external(store, {"a": {"port": 10}, "c": {"port": 3}})
+
+    assert store.check_external_change() == (["c"], ["b"], ["a"])
+    # 旧字典不被修改，正在遍历它的线程不受影响
+    assert list(old) == ["a", "b"]
+    assert store.data is not old
+    assert store.data == {"a": {"port": 10, "pid": 42}, "c": {"port": 3, "pid": None}}
+
+
+def test_save_reports_pending_and_immediate_result(store):
+    store.data["a"]["port"] = 5
+    assert store.save()["status"] == "pending"
+    result = store.save(immediate=True)
+    assert result == {"status": "success", "message": "配置已保存"}
+    with open(store.path, encoding="utf-8") as f:
+        assert json.load(f)["a"] == {"port": 5}
+
+
+def test_immediate_save_returns_write_error(store, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(os, "replace", fail)
+    store.data["a"]["port"] = 6
+    result = store.save(immediate=True)
+    assert result["status"] == "error"
+    assert "磁盘已满" in result["message"]
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from exit_watcher import ExitWatcher
+from process_backend import FakeBackend
+from process_tracker import PidTracker
+
+
+@pytest.fixture
+def watched():
+    backend = FakeBackend()
+    backend.add(10, name="java.exe", cmdline=["java", "-jar", "gis-server.jar"])
+    backend.add(20, name="nginx.exe", cmdline=["nginx.exe"])
+    tracker = PidTracker(rescan_interval=3600, backend=backend)
+    exits = []
+    exited = threading.Event()
+
+    def on_exit(key, pid):
+        exits.append((key, pid))
+        exited.set()
+
+    watcher = ExitWatcher(tracker, on_exit, poll_interval=0.05)
+    yield backend, tracker, watcher, exits, exited
+    watcher.stop()
+    watcher.thread.join(2)
+
+
+def test_fake_backend_uses_poll_mode(watched):
+    _, tracker, watcher, _, _ = watched
+    assert watcher.mode == "poll"
+    assert tracker.on_track == watcher.refresh
+
+
+def test_poll_reports_exit(watched):
+    backend, tracker, watcher, exits, exited = watched
+    tracker.adopt(("java", "gis"), 10)
+    tracker.adopt(("middleware", "nginx"), 20)
+
+    backend.kill(10)
+    assert exited.wait(2)
+    assert exits == [(("java", "gis"), 10)]
+    assert tracker.tracked_process(("java", "gis")) is None
+    assert tracker.tracked_process(("middleware", "nginx")) is not None
+    assert watcher.stats()["exits"] == 1
+
+
+def test_poll_ignores_replaced_pid(watched):
+    backend, tracker, watcher, exits, exited = watched
+    key = ("java", "gis")
+    tracker.adopt(key, 10)
+    # 对象已被重新启动，跟踪器中是新的PID，旧进程的退出不再上报
+    backend.add(11, name="java.exe", cmdline=["java", "-jar", "gis-server.jar"])
+    tracker.adopt(key, 11)
+    backend.kill(10)
+    assert not exited.wait(0.3)
+
+    backend.kill(11)
+    assert exited.wait(2)
+    assert exits == [(key, 11)]
+
+
+def test_poll_detects_pid_reuse(watched):
+    backend, tracker, watcher, exits, exited = watched
+    key = ("java", "gis")
+    tracker.adopt(key, 10)
+    _, create_time = tracker.tracked_process(key)
+    backend.kill(10)
+    backend.add(10, name="notepad.exe", create_time=create_time + 1)
+    assert exited.wait(2)
+    assert exits == [(key, 10)]
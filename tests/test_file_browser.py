@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from file_browser import DirectoryCache, normalize_path
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "bin").mkdir()
+    for name in ("b.jar", "A.JAR", "start.bat", "readme.txt", "c.exe"):
+        (tmp_path / name).write_text("x", encoding="utf-8")
+    return str(tmp_path)
+
+
+def names(result):
+    return [item["name"] for item in result["items"]]
+
+
+def touch_dir(path, delta):
+    # 文件系统的时间精度可能较粗，显式设置不同的目录修改时间
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + delta))
+
+
+def test_listing_filters_and_puts_directories_first(directory):
+    cache = DirectoryCache()
+    result = cache.browse(directory)
+    assert names(result) == ["bin", "lib", "A.JAR", "b.jar", "c.exe", "start.bat"]
+    assert result["total"] == 6 and not result["has_more"]
+    assert names(cache.browse(directory, extensions=None, sort="name", reverse=True))[:3] == ["lib", "bin", "start.bat"]
+
+    selected = cache.browse(os.path.join(directory, "b.jar"))
+    assert selected["path"] == normalize_path(directory) and selected["file"] == "b.jar"
+    with pytest.raises(FileNotFoundError):
+        cache.browse(os.path.join(directory, "missing"))
+
+
+def test_cache_is_invalidated_by_directory_mtime(directory):
+    cache = DirectoryCache()
+    first = cache.view(normalize_path(directory), "name", False, (".jar",))
+    assert cache.view(normalize_path(directory), "name", False, (".JAR",)) is first
+    assert cache.stats() == {"directories": 1, "hits": 1, "misses": 1}
+
+    with open(os.path.join(directory, "new.jar"), "w") as f:
+        f.write("x")
+    touch_dir(directory, 1000)
+    assert "new.jar" in names(cache.browse(directory))
+    assert cache.stats()["misses"] == 2
+
+    # 缓存只以目录修改时间为准：修改时间不变时不会重新读取
+    mtime = os.stat(directory).st_mtime_ns
+    os.remove(os.path.join(directory, "new.jar"))
+    os.utime(directory, ns=(os.stat(directory).st_atime_ns, mtime))
+    assert "new.jar" in names(cache.browse(directory))
+    assert cache.stats()["misses"] == 2
+
+
+def test_paging_bounds(directory):
+    cache = DirectoryCache()
+    page = cache.browse(directory, offset=2, limit=3)
+    assert names(page) == ["A.JAR", "b.jar", "c.exe"] and page["has_more"]
+    last = cache.browse(directory, offset=5, limit=3)
+    assert names(last) == ["start.bat"] and not last["has_more"]
+    beyond = cache.browse(directory, offset=100, limit=3)
+    assert beyond["items"] == [] and not beyond["has_more"] and beyond["total"] == 6
+    assert cache.browse(directory, offset=-5, limit=1)["offset"] == 0
+    assert len(cache.browse(directory, limit=0)["items"]) == 1
+
+
+def test_least_recently_used_directories_are_evicted(tmp_path):
+    cache = DirectoryCache(max_entries=2)
+    paths = []
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        paths.append(str(tmp_path / name))
+    cache.browse(paths[0])
+    cache.browse(paths[1])
+    cache.browse(paths[0])
+    cache.browse(paths[2])
+    assert list(cache.entries) == [paths[0], paths[2]]
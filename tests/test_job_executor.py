@@ -0,0 +1,70 @@
+import threading
+import time
+
+from job_executor import JobExecutor
+
+
+def finish(jobs, timeout=5):
+    deadline = time.time() + timeout
+    while any(job["status"] in ("queued", "running") for job in jobs.list(limit=1000)):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_submit_returns_immediately_and_reports_progress():
+    events = []
+    jobs = JobExecutor(max_workers=2, notify=lambda event, job: events.append((job["status"], job["progress"])))
+    release = threading.Event()
+
+    def operation(report):
+        release.wait(5)
+        report(50, "半程")
+        return {"status": "success", "message": "已启动"}
+
+    job = jobs.submit("java", "gis", "start", operation)
+    assert job["status"] == "queued"
+    assert jobs.get(job["id"])["status"] in ("queued", "running")
+    release.set()
+    # 等待工作线程退出，最后一次推送也已完成
+    jobs.executor.shutdown(wait=True)
+
+    result = jobs.get(job["id"])
+    assert result["status"] == "success" and result["message"] == "已启动" and result["progress"] == 100
+    assert result["started_at"] <= result["finished_at"]
+    assert events[0] == ("queued", 0)
+    assert ("running", 50) in events
+    assert events[-1] == ("success", 100)
+
+
+def test_failed_operations_and_totals():
+    jobs = JobExecutor(max_workers=1)
+
+    def crash(report):
+        raise RuntimeError("拒绝访问")
+
+    failed = jobs.submit("middleware", "nginx", "stop", crash)
+    jobs.submit("middleware", "nginx", "stop", lambda report: {"status": "error", "message": "未运行"})
+    jobs.submit("middleware", "nginx", "stop", lambda report: None)
+    finish(jobs)
+
+    assert jobs.get(failed["id"])["result"] == {"status": "error", "message": "拒绝访问"}
+    totals = {(item["kind"], item["action"], item["status"]): item["count"] for item in jobs.stats()}
+    assert totals == {("middleware", "stop", "error"): 2, ("middleware", "stop", "success"): 1}
+
+
+def test_history_keeps_unfinished_jobs():
+    jobs = JobExecutor(max_workers=1, max_history=2)
+    release = threading.Event()
+    blocked = jobs.submit("java", "gis", "start", lambda report: release.wait(5) and None)
+    for _ in range(3):
+        jobs.submit("java", "auth", "start", lambda report: None)
+    # 最早的任务仍在执行，不会为了限制记录数量而被丢弃
+    assert jobs.get(blocked["id"]) is not None
+    release.set()
+    finish(jobs)
+
+    jobs.submit("java", "auth", "stop", lambda report: None)
+    finish(jobs)
+    ids = [job["id"] for job in jobs.list()]
+    assert len(ids) == 2
+    assert blocked["id"] not in ids
@@ -0,0 +1,29 @@
+import os
+
+from launcher import parse_command
+
+
+def test_parse_command_resolves_against_work_dir(tmp_path, monkeypatch):
+    work_dir = tmp_path / "nginx"
+    work_dir.mkdir()
+    (work_dir / "nginx.exe").write_text("", encoding="utf-8")
+    (work_dir / "run app.bat").write_text("", encoding="utf-8")
+    # 管理程序的当前目录下没有这些文件
+    monkeypatch.chdir(tmp_path)
+
+    expected = os.path.join(str(work_dir), "nginx.exe")
+    assert parse_command("start nginx.exe", str(work_dir)) == ([expected], False, True)
+    assert parse_command('start "" "run app.bat"', str(work_dir)) == (
+        [os.path.join(str(work_dir), "run app.bat")], False, True)
+    # 相对的工作目录同样按管理程序的当前目录转换为绝对路径，Popen 的 cwd 不会再次叠加
+    assert parse_command("nginx.exe", "nginx") == ([expected], False, False)
+
+
+def test_parse_command_falls_back_to_shell(tmp_path, monkeypatch):
+    (tmp_path / "nginx.exe").write_text("", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    other = tmp_path / "other"
+    other.mkdir()
+    # 工作目录中不存在的程序交给shell处理，不会误用当前目录中的同名文件
+    assert parse_command("nginx.exe", str(other)) == ("nginx.exe", True, False)
+    assert parse_command("start java -jar app.jar", str(other)) == ("java -jar app.jar", True, True)
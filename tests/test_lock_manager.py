@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from lock_manager import LockManager
+
+
+def test_lock_keys_order_groups_before_target():
+    locks = LockManager()
+    key = ("middleware", "nginx")
+    assert locks.lock_keys(key) == [key]
+    locks.set_groups(key, ["port-80", "d-drive", "", "port-80"])
+    assert locks.lock_keys(key) == [("group", "d-drive"), ("group", "port-80"), key]
+    locks.set_groups(key, None)
+    assert locks.lock_keys(key) == [key]
+
+
+def test_unrelated_targets_run_in_parallel():
+    locks = LockManager()
+    with locks.hold(("java", "gis"), "start"):
+        with locks.hold(("java", "auth"), "start", timeout=0.1):
+            assert locks.is_busy(("java", "gis")) and locks.is_busy(("java", "auth"))
+    assert not locks.is_busy(("java", "gis"))
+
+
+def test_same_target_and_group_are_exclusive():
+    locks = LockManager()
+    nginx, gis = ("middleware", "nginx"), ("java", "gis")
+    locks.set_groups(nginx, ["port-8080"])
+    locks.set_groups(gis, ["port-8080"])
+    with locks.hold(nginx, "reload"):
+        with pytest.raises(TimeoutError):
+            with locks.hold(nginx, "stop", timeout=0.05):
+                pass
+        with pytest.raises(TimeoutError):
+            with locks.hold(gis, "start", timeout=0.05):
+                pass
+        # 超时时已经取得的锁会被释放
+        assert not locks.is_busy(gis)
+    stats = locks.stats()
+    assert stats["locks"]["middleware:nginx"]["held_by"] is None
+    assert stats["groups"]["java:gis"] == ["port-8080"]
+
+
+def test_groups_configured_in_different_order_do_not_deadlock():
+    locks = LockManager()
+    first, second = ("java", "a"), ("java", "b")
+    # 两个对象以相反顺序配置同样的锁组，加锁顺序仍然一致
+    locks.set_groups(first, ["x", "y"])
+    locks.set_groups(second, ["y", "x"])
+    entered = []
+
+    def worker(key):
+        for _ in range(200):
+            with locks.hold(key, "start", timeout=5):
+                entered.append(key)
+
+    threads = [threading.Thread(target=worker, args=(key,)) for key in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(entered) == 400
+
+
+def test_forget_keeps_held_lock_until_release():
+    locks = LockManager()
+    key = ("middleware", "redis")
+    with locks.hold(key, "stop"):
+        locks.forget(key)
+        assert key in locks.locks
+    locks.forget(key)
+    assert key not in locks.locks and key not in locks.waits
@@ -0,0 +1,120 @@
+import os
+
+from log_index import INDEX_SUFFIX, LineIndex, is_log_file_in, is_log_name, list_log_files
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def test_index_appends_and_rebuilds_after_rotation(tmp_path):
+    path = str(tmp_path / "app.log")
+    write(path, "first\nsecond\n")
+    index = LineIndex(path)
+    index.refresh()
+    assert index.total == 2
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("third\npartial")
+    index.refresh()
+    assert index.read_lines(0, 10) == [(0, "first"), (1, "second"), (2, "third"), (3, "partial")]
+    assert os.path.exists(path + INDEX_SUFFIX)
+
+    write(path, "rotated\n")
+    index.refresh()
+    assert index.read_lines(0, 10) == [(0, "rotated")]
+
+    # 重新加载持久化的索引
+    assert LineIndex(path).refresh() == len("rotated\n")
+
+
+def test_refresh_after_truncate_to_empty(tmp_path):
+    path = str(tmp_path / "app.log")
+    write(path, "a\nb\n")
+    index = LineIndex(path)
+    index.refresh()
+    write(path, "")
+    assert index.refresh() == 0
+    assert index.total == 0
+
+
+def test_search_clamps_to_truncated_file(tmp_path):
+    path = str(tmp_path / "app.log")
+    write(path, "".join(f"line {i} ERROR\n" for i in range(100)))
+    index = LineIndex(path)
+    index.refresh()
+    # 建立索引之后文件被截断，搜索时不能按旧大小映射
+    write(path, "line 0 ERROR\n")
+    progress = {}
+    matches = list(index.search("ERROR", progress=progress))
+    assert matches[0] == (0, "line 0 ERROR")
+    assert progress["complete"]
+
+    write(path, "")
+    assert list(index.search("ERROR", progress=progress)) == []
+    assert progress["complete"]
+
+
+def test_log_file_restrictions(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    (logs / "nested").mkdir()
+    for name in ("app.log", "app.log.1", "stdout.out", "app.jar", "app.log" + INDEX_SUFFIX):
+        write(str(logs / name), "x\n")
+    write(str(logs / "nested" / "deep.log"), "x\n")
+
+    assert is_log_name("catalina.2024-01-01.log")
+    assert not is_log_name("application.yml")
+    assert is_log_file_in(str(logs / "app.log.1"), [str(logs)])
+    assert not is_log_file_in(str(logs / "app.jar"), [str(logs)])
+    assert not is_log_file_in(str(logs / ("app.log" + INDEX_SUFFIX)), [str(logs)])
+    assert not is_log_file_in(str(logs / "nested" / "deep.log"), [str(logs)])
+    assert not is_log_file_in(str(logs / ".." / "logs" / "app.jar"), [str(logs)])
+
+    names = sorted(item["name"] for item in list_log_files([str(logs)]))
+    assert names == ["app.log", "app.log.1", "stdout.out"]
+
+
+BANNER = "=" * 80 + "\n"
+
+
+def test_same_size_rotation_with_identical_head(tmp_path):
+    path = str(tmp_path / "app.log")
+    write(path, BANNER + "aaaa\nbb\n")
+    index = LineIndex(path)
+    index.refresh()
+    assert index.read_lines(1, 2) == [(1, "aaaa"), (2, "bb")]
+
+    # 轮转后的新文件开头相同、大小相同，只有行的划分不同
+    rotated = str(tmp_path / "app.log.new")
+    write(rotated, BANNER + "a\nbbbbb\n")
+    os.replace(rotated, path)
+    index.refresh()
+    assert index.read_lines(1, 2) == [(1, "a"), (2, "bbbbb")]
+
+
+def test_same_size_rewrite_in_place(tmp_path):
+    path = str(tmp_path / "app.log")
+    write(path, BANNER + "aaaa\nbb\n")
+    index = LineIndex(path)
+    index.refresh()
+    mtime = os.stat(path).st_mtime_ns
+    write(path, BANNER + "a\nbbbbb\n")
+    os.utime(path, ns=(mtime, mtime + 1000))
+    index.refresh()
+    assert index.read_lines(1, 2) == [(1, "a"), (2, "bbbbb")]
+
+
+def test_persisted_index_detects_rotation(tmp_path):
+    path = str(tmp_path / "app.log")
+    write(path, BANNER + "aaaa\nbb\n")
+    LineIndex(path).refresh()
+
+    rotated = str(tmp_path / "app.log.new")
+    write(rotated, BANNER + "a\nbbbbb\ncc\n")
+    os.replace(rotated, path)
+    # 重新加载持久化的索引：文件ID不同，不能在旧索引之后继续追加
+    index = LineIndex(path)
+    index.refresh()
+    assert index.read_lines(1, 3) == [(1, "a"), (2, "bbbbb"), (3, "cc")]
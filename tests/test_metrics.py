@@ -0,0 +1,55 @@
+import os
+
+from metrics import FIELDS, MetricsCollector, RingSeries
+
+
+def row(value):
+    return [value] * len(FIELDS)
+
+
+def test_ring_series_wraparound():
+    series = RingSeries(4)
+    assert series.last() is None
+    assert series.since(0) == [[] for _ in FIELDS]
+    for value in range(1, 7):
+        series.append(row(value))
+    # 容量为4，只保留最近的4个采样，按时间顺序返回
+    assert series.count == 4 and series.total == 6
+    assert series.since(0)[0] == [3, 4, 5, 6]
+    assert series.since(0, limit=2)[0] == [5, 6]
+    assert series.last() == row(6)
+
+
+def test_ring_series_delta_cursor():
+    series = RingSeries(4)
+    for value in range(1, 4):
+        series.append(row(value))
+    assert series.since(1)[0] == [2, 3]
+    # 跨越数组末尾的增量
+    for value in range(4, 7):
+        series.append(row(value))
+    assert series.since(3)[0] == [4, 5, 6]
+    assert series.since(6)[0] == []
+    # 游标已经落后超过容量时只返回仍保留的采样
+    for value in range(7, 13):
+        series.append(row(value))
+    assert series.since(6)[0] == [9, 10, 11, 12]
+
+
+def test_collector_delta_and_retain():
+    collector = MetricsCollector(capacity=3, interval=0)
+    me, gone = ("java", "self"), ("middleware", "stopped")
+    collector.sample({me: os.getpid(), gone: None}, now=100)
+    delta = collector.delta()
+    assert list(delta) == ["java:self"]
+    assert delta["java:self"][0][0] == 100 and delta["java:self"][0][2] > 0
+    assert collector.delta() == {}
+
+    for now in (101, 102, 103, 104):
+        collector.sample({me: os.getpid()}, now=now)
+    # 两次推送之间新增的采样超过容量时，只推送仍在缓冲区中的部分
+    assert [sample[0] for sample in collector.delta()["java:self"]] == [102, 103, 104]
+    assert collector.history(me, limit=2)["samples"][0] == [103, 104]
+
+    collector.retain([])
+    assert collector.delta() == {} and collector.history(me)["samples"] == [[] for _ in FIELDS]
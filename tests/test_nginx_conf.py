@@ -0,0 +1,200 @@
+import os
+
+import pytest
+
+import nginx_conf
+
+
+CONF = """\
+worker_processes  1;
+
+http {
+    include       mime.types;
+    # 注释保持不变
+    server {
+        listen       81;
+        server_name  localhost;
+
+        location / {
+            root   html;
+        }
+
+        location /gis/ {
+            proxy_pass http://127.0.0.1:9000/;
+        }
+    }
+    include conf.d/*.conf;
+}
+"""
+
+INCLUDED = """\
+server {
+    listen 8081;
+    server_name extra;
+    location /extra/ {
+        proxy_pass "http://127.0.0.1:7000/";
+    }
+}
+"""
+
+
+@pytest.fixture
+def conf_path(tmp_path):
+    (tmp_path / "conf.d").mkdir()
+    (tmp_path / "conf.d" / "extra.conf").write_text(INCLUDED, encoding="utf-8")
+    (tmp_path / "mime.types").write_text("types {\n    text/html html;\n}\n", encoding="utf-8")
+    path = tmp_path / "nginx.conf"
+    path.write_text(CONF, encoding="utf-8")
+    nginx_conf.invalidate(str(path))
+    return str(path)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parse_expands_includes(conf_path):
+    config = nginx_conf.load(conf_path)
+    servers = config.servers()
+    assert [server.first("server_name").args for server in servers] == [["localhost"], ["extra"]]
+    assert config.listen_port() == "81"
+    assert config.proxy_locations(filtered=False)[-1]["target"] == "http://127.0.0.1:7000/"
+    assert config.find_server(port=8081).first("server_name").args == ["extra"]
+
+
+def test_empty_edit_round_trips(conf_path):
+    config = nginx_conf.load(conf_path)
+    edit = config.edit()
+    edit.set_arg(config.find_server().first("listen"), 0, "81")
+    assert edit.render() == {conf_path: CONF}
+
+
+def test_load_is_cached_until_file_changes(conf_path):
+    config = nginx_conf.load(conf_path)
+    assert nginx_conf.load(conf_path) is config
+    nginx_conf.write_atomic(conf_path, CONF.replace("81;", "82;"))
+    assert nginx_conf.load(conf_path).listen_port() == "82"
+
+
+def test_parse_errors():
+    with pytest.raises(nginx_conf.NginxConfigError):
+        nginx_conf.parse_text("http { server { listen 81 } }")
+    with pytest.raises(nginx_conf.NginxConfigError):
+        nginx_conf.parse_text("http {")
+
+
+def test_location_changes_keep_formatting(conf_path):
+    config = nginx_conf.load(conf_path)
+    edit = nginx_conf.location_changes(config, config.find_server(), [
+        {"op": "add", "path": "/api2/", "target": "http://127.0.0.1:8080/"},
+        {"op": "update", "path": "/gis/", "target": "http://127.0.0.1:9001/"},
+    ])
+    text = edit.render()[conf_path]
+    assert "proxy_pass http://127.0.0.1:9001/;" in text
+    assert "        location /api2/ {\n            proxy_pass http://127.0.0.1:8080/;\n        }" in text
+    assert "# 注释保持不变" in text
+
+    nginx_conf.write_atomic(conf_path, text)
+    reparsed = nginx_conf.load(conf_path)
+    paths = [item["path"] for item in reparsed.proxy_locations(filtered=False)]
+    assert paths == ["/gis/", "/api2/", "/extra/"]
+
+    edit = nginx_conf.location_changes(reparsed, reparsed.find_server(),
+                                       [{"op": "delete", "path": "/api2/"}])
+    assert edit.render()[conf_path] == read(conf_path).replace(
+        "\n        location /api2/ {\n            proxy_pass http://127.0.0.1:8080/;\n        }", "")
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "add", "path": "/gis/", "target": "http://x/"}],
+    [{"op": "update", "path": "/missing/", "target": "http://x/"}],
+    [{"op": "add", "path": "/a/", "target": "http://x/; evil"}],
+    [{"op": "add", "path": "/a/", "target": "http://x/"}, {"op": "delete", "path": "/a/"}],
+    [{"op": "rename", "path": "/gis/"}],
+])
+def test_invalid_location_changes(conf_path, operations):
+    config = nginx_conf.load(conf_path)
+    with pytest.raises(nginx_conf.NginxConfigError):
+        nginx_conf.location_changes(config, config.find_server(), operations)
+
+
+def test_listen_port_changes(conf_path):
+    config = nginx_conf.load(conf_path)
+    text = nginx_conf.listen_port_changes(config, "8088").render()[conf_path]
+    assert "listen       8088;" in text
+    assert text.replace("8088", "81") == CONF
+
+
+def test_proxy_addition_requires_server(tmp_path):
+    path = tmp_path / "nginx.conf"
+    path.write_text("http {\n}\n", encoding="utf-8")
+    config = nginx_conf.load(str(path))
+    with pytest.raises(nginx_conf.NginxConfigError):
+        nginx_conf.proxy_addition(config, "/a/", "http://x/")
+
+
+def test_transaction_commits_when_validation_passes(conf_path):
+    config = nginx_conf.load(conf_path)
+    edit = nginx_conf.proxy_addition(config, "/api2/", "http://127.0.0.1:8080/")
+    calls = []
+
+    def validate():
+        # nginx -t 执行时新配置已经写入
+        calls.append(read(conf_path))
+        return True, "syntax is ok"
+
+    ok, output, changed = nginx_conf.apply_transaction(edit, validate)
+    assert ok and output == "syntax is ok" and changed == [conf_path]
+    assert "location /api2/" in calls[0]
+    assert "location /api2/" in read(conf_path)
+    assert "/api2/" in [item["path"] for item in nginx_conf.load(conf_path).proxy_locations(filtered=False)]
+
+
+def test_transaction_rolls_back_when_validation_fails(conf_path):
+    config = nginx_conf.load(conf_path)
+    edit = nginx_conf.listen_port_changes(config, "99999")
+    ok, output, _ = nginx_conf.apply_transaction(edit, lambda: (False, "invalid port"))
+    assert not ok and output == "invalid port"
+    assert read(conf_path) == CONF
+    assert nginx_conf.load(conf_path).listen_port() == "81"
+    assert not os.path.exists(conf_path + ".tmp")
+
+
+def test_transaction_restores_raw_bytes_and_keeps_backup_until_done(conf_path):
+    # 非UTF-8的注释（GBK）和CRLF换行在恢复后必须逐字节不变
+    comment = "注释保持不变"
+    original = CONF.encode("utf-8").replace(comment.encode("utf-8"), comment.encode("gbk")).replace(b"\n", b"\r\n")
+    with open(conf_path, "wb") as f:
+        f.write(original)
+    backup = conf_path + nginx_conf.BACKUP_SUFFIX
+    edit = nginx_conf.listen_port_changes(nginx_conf.load(conf_path), "82")
+
+    def validate():
+        # 替换配置文件之前原始内容已经写入磁盘上的备份
+        with open(backup, "rb") as f:
+            assert f.read() == original
+        return False, "failed"
+
+    ok, _, _ = nginx_conf.apply_transaction(edit, validate)
+    assert not ok
+    with open(conf_path, "rb") as f:
+        assert f.read() == original
+    assert not os.path.exists(backup)
+
+
+def test_transaction_restores_when_validation_raises(conf_path):
+    edit = nginx_conf.listen_port_changes(nginx_conf.load(conf_path), "82")
+
+    def validate():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        nginx_conf.apply_transaction(edit, validate)
+    assert read(conf_path) == CONF
+    assert nginx_conf.load(conf_path).listen_port() == "81"
+
+
+def test_test_config_reports_missing_executable(tmp_path, conf_path):
+    ok, output = nginx_conf.test_config(str(tmp_path), conf_path, executable="no-such-nginx.exe")
+    assert not ok and output
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from orchestrator import DependencyError, StartupOrchestrator, build_graph, parse_dependency, topological_layers
+
+
+DB = ("service", "MongoDB")
+PG = ("service", "PostgreSQL")
+AUTH = ("java", "auth")
+GIS = ("java", "gis")
+NGINX = ("middleware", "nginx")
+
+DEPENDENCIES = {
+    DB: [],
+    PG: [],
+    AUTH: [DB],
+    GIS: [DB, PG, AUTH],
+    NGINX: [GIS, AUTH],
+}
+
+
+def test_kahn_layers():
+    assert topological_layers(build_graph(DEPENDENCIES)) == [[DB, PG], [AUTH], [GIS], [NGINX]]
+
+
+def test_build_graph_includes_dependencies_of_roots():
+    graph = build_graph(DEPENDENCIES, roots=[AUTH])
+    assert graph == {AUTH: {DB}, DB: set()}
+    with pytest.raises(DependencyError):
+        build_graph(DEPENDENCIES, roots=[("java", "missing")])
+
+
+def test_cycle_is_reported_with_its_members():
+    graph = build_graph({DB: [], AUTH: [DB, NGINX], GIS: [AUTH], NGINX: [GIS]})
+    with pytest.raises(DependencyError) as error:
+        topological_layers(graph)
+    message = str(error.value)
+    assert "java:auth" in message and "java:gis" in message and "middleware:nginx" in message
+    assert "MongoDB" not in message
+
+    with pytest.raises(DependencyError):
+        topological_layers({DB: {DB}})
+
+
+def test_parse_dependency():
+    targets = set(DEPENDENCIES) | {("middleware", "gis")}
+    assert parse_dependency("java:auth", targets) == AUTH
+    assert parse_dependency("MongoDB", targets) == DB
+    assert parse_dependency(["middleware", "nginx"], targets) == NGINX
+    with pytest.raises(DependencyError):
+        parse_dependency("gis", targets)
+    with pytest.raises(DependencyError):
+        parse_dependency("redis", targets)
+
+
+class Targets:
+    def __init__(self, delays=None, failing=(), ready=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.ready = set(ready)
+        self.started = {}
+        self.lock = threading.Lock()
+
+    def start(self, key):
+        with self.lock:
+            self.started[key] = time.perf_counter()
+        time.sleep(self.delays.get(key, 0))
+        if key in self.failing:
+            return {"status": "error", "message": "启动失败"}
+        with self.lock:
+            self.ready.add(key)
+        return {"status": "success"}
+
+    def is_ready(self, key):
+        with self.lock:
+            return key in self.ready
+
+    def wait_ready(self, key):
+        return self.is_ready(key)
+
+
+def test_orchestrator_starts_after_dependencies_not_whole_layers():
+    # auth 只依赖 MongoDB，不需要等待同一层的慢对象 PostgreSQL
+    targets = Targets(delays={PG: 0.3, DB: 0.01})
+    orchestrator = StartupOrchestrator(targets.start, targets.is_ready, targets.wait_ready, max_workers=4)
+    result = orchestrator.run(build_graph(DEPENDENCIES))
+    assert result["status"] == "success"
+    assert targets.started[AUTH] < targets.started[PG] + 0.3
+    assert targets.started[GIS] >= targets.started[PG] + 0.3
+    assert targets.started[NGINX] > targets.started[GIS]
+
+
+def test_orchestrator_skips_dependents_of_failed_target():
+    targets = Targets(failing=[AUTH], ready=[DB])
+    orchestrator = StartupOrchestrator(targets.start, targets.is_ready, targets.wait_ready)
+    result = orchestrator.run(build_graph(DEPENDENCIES))
+    results = result["results"]
+    assert result["status"] == "error"
+    assert results["service:MongoDB"]["skipped"]
+    assert results["java:auth"]["message"] == "启动失败"
+    assert "已跳过" in results["java:gis"]["message"] and "已跳过" in results["middleware:nginx"]["message"]
+    assert GIS not in targets.started and NGINX not in targets.started
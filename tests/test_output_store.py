@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import time
+
+from output_store import OutputStore, TargetOutput, decode_line, target_file_name
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_rotation_keeps_configured_backups(tmp_path):
+    path = str(tmp_path / "java-gis.log")
+    output = TargetOutput(path, max_bytes=100, backups=2, ring_size=10)
+    for index in range(12):
+        output.append("stdout", f"line {index:02d} " + "x" * 20, max_pending=100)
+    output.close()
+    # 每行约50字节，两行轮转一次；只保留两个备份
+    assert sorted(os.listdir(tmp_path)) == ["java-gis.log", "java-gis.log.1", "java-gis.log.2"]
+    assert "line 11" in read(path + ".1") and "line 09" in read(path + ".2")
+    assert read(path) == ""
+
+
+def test_rotation_without_backups(tmp_path):
+    path = str(tmp_path / "out.log")
+    output = TargetOutput(path, max_bytes=60, backups=0, ring_size=10)
+    output.append("stdout", "x" * 40, max_pending=100)
+    output.append("stderr", "tail", max_pending=100)
+    output.close()
+    # 不保留备份时超过大小的内容直接删除
+    assert os.listdir(tmp_path) == ["out.log"]
+    assert "x" * 40 not in read(path) and read(path).endswith("[stderr] tail\n")
+
+
+def test_ring_buffer_and_pending_limits(tmp_path):
+    output = TargetOutput(str(tmp_path / "out.log"), max_bytes=1 << 20, backups=1, ring_size=3)
+    for index in range(5):
+        output.append("stdout", str(index), max_pending=2)
+    assert [item[3] for item in output.tail()] == ["2", "3", "4"]
+    assert [item[0] for item in output.tail(after=3)] == [4, 5]
+    assert [item[3] for item in output.tail(limit=1)] == ["4"]
+    # 积压只保留最新的行，并报告丢弃的行数
+    lines, dropped = output.take_pending()
+    assert [item[3] for item in lines] == ["3", "4"] and dropped == 3
+    assert output.take_pending() == ([], 0)
+    output.close()
+    assert read(str(tmp_path / "out.log")).count("[stdout]") == 5
+
+
+def test_decode_line_and_file_name():
+    assert decode_line("启动完成".encode("utf-8")) == "启动完成"
+    assert decode_line("启动完成".encode("gbk")) == "启动完成"
+    assert target_file_name(("java", 'a:b/c "d"')) == "java-a_b_c_d_.log"
+
+
+def test_attach_reads_pipes_and_pushes_to_subscribers(tmp_path):
+    pushed = []
+    store = OutputStore(base_dir=str(tmp_path), flush_interval=0.02, notify=lambda key, payload: pushed.append(payload))
+    key = ("java", "demo")
+    store.subscribe(key)
+    script = "import sys; print('hello'); sys.stderr.buffer.write('错误\\n'.encode('gbk'))"
+    popen = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        store.attach(key, popen)
+        popen.wait(10)
+        deadline = time.time() + 5
+        while sum(1 for line in store.tail(key) if line[2] == "system") < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        lines = [(line[2], line[3]) for line in store.tail(key)]
+        assert ("stdout", "hello") in lines and ("stderr", "错误") in lines
+        while not pushed and time.time() < deadline:
+            time.sleep(0.02)
+        assert pushed[0]["target"] == "java:demo"
+    finally:
+        store.close()
+    assert "[stderr] 错误" in read(store.path_of(key))
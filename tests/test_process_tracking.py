@@ -0,0 +1,297 @@
+import time
+
+import pytest
+
+from jar_matcher import JarMatcher
+from poll_scheduler import PollScheduler
+from process_backend import FakeBackend
+from process_snapshot import ProcessSnapshot, SnapshotProvider
+from process_tracker import PidTracker
+from supervisor import Supervisor
+
+
+JAVA_SERVICES = {
+    "gis": {"jar_name": "gis-server.jar"},
+    "auth": {"jar_name": "auth-1.0.jar"},
+    "partial": {"jar_name": "report"},
+}
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend()
+    backend.add(10, name="java.exe", exe="C:\\Java\\bin\\java.exe",
+                cmdline=["java", "-Xmx1g", "-jar", "D:\\apps\\gis-server.jar"])
+    backend.add(11, name="javaw.exe", exe="C:\\Java\\bin\\javaw.exe",
+                cmdline=["javaw", "-cp", "lib/*;auth-1.0.jar", "com.example.Main"])
+    backend.add(12, name="java.exe", exe="C:\\Java\\bin\\java.exe",
+                cmdline=["java", "-jar", "report-tool.jar"])
+    # nginx 主进程和 worker 进程，另一个目录下还有一个无关的 nginx
+    backend.add(20, name="nginx.exe", exe="nginx.exe", cmdline=["nginx.exe"], cwd="D:\\nginx", ppid=1)
+    backend.add(21, name="nginx.exe", exe="nginx.exe", cmdline=["nginx.exe"], cwd="D:\\nginx", ppid=20)
+    backend.add(30, name="nginx.exe", exe="nginx.exe", cmdline=["nginx.exe"], cwd="E:\\other", ppid=1)
+    backend.add(40, name="notepad.exe", exe="notepad.exe", cmdline=["notepad.exe"], cwd="C:\\Windows")
+    return backend
+
+
+def detect_with(services, middlewares):
+    def detect(snapshot, keys):
+        matches = snapshot.match_jars(JarMatcher(services))
+        pids = {}
+        for kind, name in keys:
+            if kind == "java":
+                pids[(kind, name)] = matches.get(name)
+            else:
+                info = middlewares[name]
+                pids[(kind, name)] = snapshot.find_middleware(info["process_name"], info.get("work_dir", ""))
+        return pids
+    return detect
+
+
+def test_jar_matcher_classifies_jar_argument_and_classpath(backend):
+    matcher = JarMatcher(JAVA_SERVICES)
+    snapshot = ProcessSnapshot(backend=backend)
+    assert snapshot.match_jars(matcher) == {"gis": 10, "auth": 11, "partial": 12}
+
+
+def test_jar_matcher_ignores_processes_without_jar():
+    matcher = JarMatcher({"gis": {"jar_name": "gis-server.jar"}})
+    assert matcher.classify({"pid": 1, "name": "notepad.exe", "cmdline": ["notepad.exe", "gis.txt"]}) == []
+
+
+def test_snapshot_find_jar(backend):
+    snapshot = ProcessSnapshot(backend=backend)
+    assert snapshot.find_jar("gis-server.jar") == 10
+    # 不是完整文件名时按命令行子串匹配
+    assert snapshot.find_jar("report") == 12
+    assert snapshot.find_jar("missing.jar") is None
+    assert snapshot.find_jar("") is None
+
+
+def test_snapshot_find_middleware_prefers_master_in_work_dir(backend):
+    snapshot = ProcessSnapshot(backend=backend)
+    assert sorted(snapshot.find_all_middleware("nginx.exe")) == [20, 21, 30]
+    assert sorted(snapshot.find_all_middleware("NGINX.EXE", "D:\\nginx")) == [20, 21]
+    assert snapshot.find_middleware("nginx.exe", "D:\\nginx") == 20
+    assert snapshot.find_middleware("nginx.exe", "E:\\other") == 30
+    assert snapshot.find_middleware("redis-server.exe") is None
+
+
+def test_snapshot_provider_enumerates_once(backend):
+    provider = SnapshotProvider(backend)
+    assert provider.get() is provider.get()
+
+
+def test_tracker_fast_checks_after_first_scan(backend):
+    tracker = PidTracker(rescan_interval=3600, backend=backend)
+    middlewares = {"nginx": {"process_name": "nginx.exe", "work_dir": "D:\\nginx"}}
+    detect = detect_with(JAVA_SERVICES, middlewares)
+    keys = [("java", "gis"), ("java", "auth"), ("middleware", "nginx")]
+
+    assert tracker.check(keys, detect) == {("java", "gis"): 10, ("java", "auth"): 11, ("middleware", "nginx"): 20}
+    assert tracker.full_scans == 1
+
+    assert tracker.check(keys, detect) == {("java", "gis"): 10, ("java", "auth"): 11, ("middleware", "nginx"): 20}
+    assert tracker.full_scans == 1
+    assert tracker.fast_checks == 3
+
+
+def test_tracker_rescans_when_tracked_process_exits(backend):
+    tracker = PidTracker(rescan_interval=3600, backend=backend)
+    detect = detect_with(JAVA_SERVICES, {})
+    key = ("java", "gis")
+    assert tracker.check([key], detect) == {key: 10}
+
+    backend.kill(10)
+    assert tracker.check([key], detect) == {key: None}
+    assert tracker.full_scans == 2
+    assert tracker.tracked.get(key) is None
+
+    # 未运行的对象在 rescan_interval 内不再扫描
+    backend.add(50, name="java.exe", cmdline=["java", "-jar", "gis-server.jar"])
+    assert tracker.check([key], detect) == {key: None}
+    assert tracker.full_scans == 2
+
+    tracker.invalidate(key)
+    assert tracker.check([key], detect) == {key: 50}
+    assert tracker.full_scans == 3
+
+
+def test_tracker_detects_pid_reuse(backend):
+    tracker = PidTracker(rescan_interval=3600, backend=backend)
+    detect = detect_with(JAVA_SERVICES, {})
+    key = ("java", "gis")
+    tracker.check([key], detect)
+    _, create_time = tracker.tracked.get(key)
+
+    # 同一个PID被无关进程复用：创建时间不同，不能再认为是原来的服务
+    backend.kill(10)
+    backend.add(10, name="notepad.exe", cmdline=["notepad.exe"], create_time=create_time + 5)
+    assert tracker.check([key], detect) == {key: None}
+
+
+def test_tracker_adopt_skips_scan(backend):
+    tracker = PidTracker(rescan_interval=3600, backend=backend)
+    key = ("middleware", "nginx")
+    assert tracker.adopt(key, 20)
+    assert not tracker.adopt(("middleware", "gone"), 999)
+    # 直接登记的PID只做存活校验，不需要扫描进程表
+    assert tracker.check([key], lambda snapshot, keys: pytest.fail("不应扫描")) == {key: 20}
+    assert tracker.full_scans == 0
+
+
+def test_tracker_adopt_and_mark_exited(backend):
+    tracker = PidTracker(rescan_interval=3600, backend=backend)
+    notified = []
+    tracker.on_track = lambda: notified.append(True)
+    key = ("middleware", "nginx")
+    detect = detect_with({}, {"nginx": {"process_name": "nginx.exe", "work_dir": "D:\\nginx"}})
+    assert tracker.check([key], detect) == {key: 20}
+    assert notified == [True]
+
+    notified.clear()
+    assert tracker.adopt(key, 20)
+    assert notified == [True]
+    assert not tracker.adopt(("middleware", "gone"), 999)
+
+    assert not tracker.mark_exited(key, 21)
+    assert tracker.mark_exited(key, 20)
+    assert tracker.tracked_process(key) is None
+    # 退出后按未运行处理，不需要重新扫描
+    assert tracker.check([key], lambda snapshot, keys: pytest.fail("不应扫描")) == {key: None}
+
+
+def test_scheduler_pause_and_resume():
+    scheduler = PollScheduler(base_interval=2, fast_interval=0.5, max_interval=30)
+    key = ("java", "gis")
+    now = time.time()
+
+    # 没有观察者时按 max_interval 低频轮询，不会停止
+    assert scheduler.is_paused()
+    scheduler.record(key, True, now)
+    assert scheduler.due([key], now + 29) == []
+    assert scheduler.due([key], now + 31) == [key]
+
+    # 恢复观察时立即检查，之后按 base_interval 轮询
+    scheduler.add_watcher("socketio")
+    assert not scheduler.is_paused()
+    assert scheduler.due([key]) == [key]
+    scheduler.record(key, True, now)
+    assert scheduler.due([key], now + 2.5) == [key]
+
+    scheduler.remove_watcher("socketio")
+    assert scheduler.is_paused()
+    assert scheduler.intervals()["entities"]["java:gis"]["interval"] == 30
+
+
+def test_scheduler_boost_and_backoff():
+    scheduler = PollScheduler(base_interval=2, fast_interval=0.5, max_interval=30, stable_after=30)
+    scheduler.set_watchers("tk", 1)
+    key = ("middleware", "nginx")
+    now = time.time()
+    scheduler.record(key, True, now)
+
+    scheduler.boost(key)
+    assert scheduler.intervals()["entities"]["middleware:nginx"]["interval"] == 0.5
+
+    scheduler.entities[key]["boost_until"] = 0
+    scheduler.record(key, True, now + 40)
+    assert scheduler.entities[key]["interval"] == 4
+    # 状态变化后恢复 base_interval
+    scheduler.record(key, False, now + 41)
+    assert scheduler.entities[key]["interval"] == 2
+
+
+class Restarts:
+    def __init__(self, status="success"):
+        self.status = status
+        self.calls = []
+
+    def __call__(self, key):
+        self.calls.append(key)
+        return {"status": self.status, "message": "ok"}
+
+
+def stop_timers(supervisor):
+    for state in supervisor.states.values():
+        if state["timer"]:
+            state["timer"].cancel()
+
+
+def test_supervisor_exponential_backoff(backend):
+    restarts = Restarts()
+    supervisor = Supervisor(restarts)
+    config = {"supervise": {"base_delay": 2, "max_delay": 10, "max_restarts": 10, "window": 300}}
+    tracker = PidTracker(rescan_interval=0, backend=backend)
+    detect = detect_with(JAVA_SERVICES, {})
+    key = ("java", "gis")
+    now = 1000
+
+    delays = []
+    try:
+        for crash in range(4):
+            backend.add(10, name="java.exe", cmdline=["java", "-jar", "gis-server.jar"], create_time=now)
+            supervisor.observe(key, bool(tracker.check([key], detect)[key]), config, now)
+            backend.kill(10)
+            now += 1
+            supervisor.observe(key, bool(tracker.check([key], detect)[key]), config, now)
+            state = supervisor.states[key]
+            delays.append(state["next_restart"] - now)
+            # 模拟定时器到期后的重启
+            supervisor._restart(key, state["timer_id"])
+            now += 1
+    finally:
+        stop_timers(supervisor)
+
+    assert delays == [2, 4, 8, 10]
+    assert restarts.calls == [key] * 4
+
+
+def test_supervisor_expected_stop_and_crash_loop():
+    restarts = Restarts()
+    supervisor = Supervisor(restarts)
+    config = {"supervise": {"base_delay": 1, "max_restarts": 2, "window": 300}}
+    key = ("middleware", "nginx")
+    try:
+        supervisor.observe(key, True, config, 100)
+        supervisor.expect_stop(key)
+        supervisor.observe(key, False, config, 101)
+        assert supervisor.states[key]["timer"] is None
+
+        # 停止失败后撤销 expect_stop，之后的退出仍按崩溃处理
+        supervisor.observe(key, True, config, 102)
+        supervisor.expect_stop(key)
+        supervisor.stop_failed(key)
+        supervisor.observe(key, False, config, 103)
+        assert supervisor.states[key]["timer"] is not None
+
+        for now in (104, 106):
+            supervisor._restart(key, supervisor.states[key]["timer_id"])
+            supervisor.observe(key, True, config, now)
+            supervisor.observe(key, False, config, now + 1)
+    finally:
+        stop_timers(supervisor)
+
+    state = supervisor.states[key]
+    assert state["gave_up"]
+    assert supervisor.list_events(limit=1)[0]["event"] == "crash_loop"
+
+    supervisor.user_started(key)
+    assert not supervisor.states[key]["gave_up"]
+
+
+def test_supervisor_failed_restart_backs_off():
+    restarts = Restarts(status="error")
+    supervisor = Supervisor(restarts)
+    config = {"supervise": {"base_delay": 3, "max_restarts": 10}}
+    key = ("java", "gis")
+    try:
+        supervisor.observe(key, True, config, time.time())
+        supervisor.observe(key, False, config, time.time())
+        supervisor._restart(key, supervisor.states[key]["timer_id"])
+        state = supervisor.states[key]
+        assert state["attempts"] == 2
+        assert state["timer"] is not None
+        assert 5 < state["next_restart"] - time.time() <= 6
+    finally:
+        stop_timers(supervisor)
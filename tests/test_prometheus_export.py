@@ -0,0 +1,75 @@
+import prometheus_export
+from poll_scheduler import PollScheduler
+
+
+def snapshot(**fields):
+    data = {
+        "time": 1000.0,
+        "ticks": 7,
+        "tick_duration": 0.012,
+        "poll_interval": 30,
+        "paused": True,
+        "targets": [
+            {"kind": "java", "name": 'gis "prod"\\a\nb', "up": True, "ready": None, "restarts": 2},
+            {"kind": "middleware", "name": "nginx", "up": False, "ready": False, "restarts": 0},
+        ],
+        "resources": {"java:gis": {"cpu": 12.5, "rss": 1024, "threads": 30, "handles": None}},
+        "collector": {"latency": {"java": 4.0}, "timeouts": {"java": 1}},
+    }
+    data.update(fields)
+    return data
+
+
+def lines(text):
+    return [line for line in text.splitlines() if not line.startswith("#")]
+
+
+def test_label_values_are_escaped():
+    samples = lines(prometheus_export.render(snapshot(), now=1010.0))
+    assert 'earth_target_up{kind="java",name="gis \\"prod\\"\\\\a\\nb"} 1' in samples
+
+
+def test_values_and_families():
+    text = prometheus_export.render(snapshot(), now=1010.0)
+    samples = lines(text)
+    assert "earth_snapshot_age_seconds 10.0" in samples
+    assert "earth_status_poll_interval_seconds 30" in samples
+    assert "earth_polling_paused 1" in samples
+    # 未知状态和缺失的指标输出 NaN
+    assert 'earth_target_ready{kind="java",name="gis \\"prod\\"\\\\a\\nb"} NaN' in samples
+    assert 'earth_process_handles{kind="java",name="gis"} NaN' in samples
+    assert 'earth_collector_latency_seconds{collector="java"} 0.004' in samples
+    # 同名指标只输出一次 HELP/TYPE
+    assert text.count("# TYPE earth_target_up gauge") == 1
+
+
+def test_stale_snapshot_is_rendered_as_is():
+    # 快照很旧时仍然导出全部对象，由抓取方根据 snapshot_age_seconds 判断
+    samples = lines(prometheus_export.render(snapshot(), now=5000.0))
+    assert "earth_snapshot_age_seconds 4000.0" in samples
+    assert 'earth_target_up{kind="middleware",name="nginx"} 0' in samples
+
+
+def test_empty_snapshot_before_first_tick():
+    samples = lines(prometheus_export.render({"time": None, "ticks": 0, "targets": []}))
+    assert "earth_snapshot_age_seconds NaN" in samples
+    assert "earth_status_ticks_total 0" in samples
+
+
+def test_operations_summary():
+    operations = [{"kind": "java", "action": "start", "status": "success", "count": 3, "duration": 1.5}]
+    samples = lines(prometheus_export.render(snapshot(), operations, now=1010.0))
+    assert 'earth_operation_duration_seconds_sum{kind="java",action="start",status="success"} 1.5' in samples
+    assert 'earth_operation_duration_seconds_count{kind="java",action="start",status="success"} 3' in samples
+
+
+def test_scheduler_tick_interval():
+    scheduler = PollScheduler(base_interval=2, fast_interval=0.5, max_interval=30)
+    assert scheduler.tick_interval() == 2
+    scheduler.record(("java", "gis"), True)
+    # 无人观察时按最长间隔轮询
+    assert scheduler.tick_interval() == 30
+    scheduler.set_watchers("socketio", 1)
+    assert scheduler.tick_interval() == 2
+    scheduler.boost(("java", "gis"))
+    assert scheduler.tick_interval() == 0.5
@@ -0,0 +1,93 @@
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from readiness import ReadinessProber
+
+
+@pytest.fixture(scope="module")
+def prober():
+    prober = ReadinessProber(default_timeout=1)
+    yield prober
+    prober.loop.call_soon_threadsafe(prober.loop.stop)
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    yield server.getsockname()[1]
+    server.close()
+
+
+@pytest.fixture
+def http_port():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200 if self.path == "/health" else 503)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def probe(prober, *probes, **context):
+    return prober.probe_many({("java", "gis"): {"probes": list(probes), **context}})[("java", "gis")]
+
+
+def test_probes_of():
+    assert ReadinessProber.probes_of({}) == []
+    assert ReadinessProber.probes_of({"readiness": {"type": "tcp", "port": 80}}) == [{"type": "tcp", "port": 80}]
+    assert ReadinessProber.probes_of({"readiness": [{"port": 80}, "x", {"type": "log"}]}) == [{"type": "log"}]
+
+
+def test_tcp_probe(prober, listener):
+    assert probe(prober, {"type": "tcp", "port": listener})["ready"]
+    result = probe(prober, {"type": "tcp", "port": free_port()})
+    assert not result["ready"] and "tcp 探测失败" in result["message"]
+
+
+def test_http_probe_expected_status(prober, http_port):
+    url = f"http://127.0.0.1:{http_port}"
+    assert probe(prober, {"type": "http", "url": url + "/health"})["ready"]
+    result = probe(prober, {"type": "http", "url": url + "/other"})
+    assert not result["ready"] and result["message"] == "HTTP 503"
+    assert probe(prober, {"type": "http", "url": url + "/other", "expect_status": [503]})["ready"]
+
+
+def test_log_probe_only_accepts_logs_written_after_start(prober, tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("Started GisApplication in 12.3 seconds\n", encoding="utf-8")
+    check = {"type": "log", "path": "app.log", "pattern": r"Started \w+ in"}
+    assert probe(prober, check, base_dir=str(tmp_path))["ready"]
+    # 进程启动时间晚于日志最后修改时间：上一次运行留下的日志不算就绪
+    old = time.time() - 60
+    os.utime(log, (old, old))
+    result = probe(prober, check, base_dir=str(tmp_path), since=time.time())
+    assert not result["ready"] and result["message"] == "进程启动后日志未更新"
+    assert not probe(prober, dict(check, path="missing.log"), base_dir=str(tmp_path))["ready"]
+
+
+def test_all_probes_must_pass(prober, listener):
+    result = probe(prober, {"type": "tcp", "port": listener}, {"type": "dns"})
+    assert not result["ready"] and result["message"] == "不支持的探测类型: dns"
+    prober.retain([])
+    assert prober.stats() == {}
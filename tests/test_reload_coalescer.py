@@ -0,0 +1,80 @@
+import threading
+import time
+
+from reload_coalescer import ReloadCoalescer
+
+
+def request_all(coalescer, keys, func, stagger=0.0):
+    results = [None] * len(keys)
+
+    def worker(index, key):
+        results[index] = coalescer.request(key, func)
+
+    threads = []
+    for index, key in enumerate(keys):
+        thread = threading.Thread(target=worker, args=(index, key))
+        thread.start()
+        threads.append(thread)
+        time.sleep(stagger)
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_requests_within_window_share_one_reload():
+    coalescer = ReloadCoalescer(window=0.2)
+    calls = []
+
+    def reload():
+        calls.append(time.time())
+        return {"status": "success", "message": f"第{len(calls)}次重载"}
+
+    results = request_all(coalescer, ["nginx"] * 5, reload, stagger=0.01)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    stats = coalescer.stats()
+    assert stats["saved"] == 4
+    assert stats["targets"]["nginx"]["executions"] == 1 and stats["targets"]["nginx"]["last_batch"] == 5
+
+
+def test_request_during_reload_starts_a_new_batch():
+    coalescer = ReloadCoalescer(window=0.05)
+    running = threading.Event()
+    release = threading.Event()
+    versions = []
+    config = {"version": 1}
+
+    def reload():
+        versions.append(config["version"])
+        running.set()
+        release.wait(5)
+        return {"status": "success"}
+
+    first = threading.Thread(target=coalescer.request, args=("nginx", reload))
+    first.start()
+    assert running.wait(5)
+    # 重载执行期间修改了配置，新的请求不能并入已经开始的那一批
+    config["version"] = 2
+    second = threading.Thread(target=coalescer.request, args=("nginx", reload))
+    second.start()
+    time.sleep(0.1)
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert versions == [1, 2]
+    assert coalescer.stats()["targets"]["nginx"]["executions"] == 2
+
+
+def test_targets_are_independent_and_errors_are_shared():
+    coalescer = ReloadCoalescer(window=0.1)
+    calls = []
+
+    def reload():
+        calls.append(threading.current_thread().name)
+        raise OSError("nginx.exe 未找到")
+
+    results = request_all(coalescer, ["nginx", "nginx", "redis"], reload)
+    assert len(calls) == 2
+    assert results[0] == results[1] == results[2] == {"status": "error", "message": "nginx.exe 未找到"}
+    coalescer.forget("redis")
+    assert set(coalescer.stats()["targets"]) == {"nginx"}
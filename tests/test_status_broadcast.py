@@ -0,0 +1,51 @@
+import threading
+import time
+
+from status_broadcast import StatusBroadcaster
+
+
+class Recorder:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.events = []
+
+    def __call__(self, event, payload):
+        # 模拟较慢的推送，放大发布和推送之间的竞争窗口
+        time.sleep(self.delay)
+        self.events.append((event, payload))
+
+
+def test_publish_sends_only_changes():
+    recorder = Recorder()
+    broadcaster = StatusBroadcaster(recorder)
+    status = {"services": {"MongoDB": {"running": True}}, "java": {}, "middleware": {}}
+
+    delta = broadcaster.publish(status)
+    assert delta["changes"] == {"services": {"MongoDB": {"running": True}}}
+    assert broadcaster.publish(status) is None
+    assert broadcaster.ticks_skipped == 1
+
+    delta = broadcaster.publish({"services": {}, "java": {}, "middleware": {}})
+    assert delta["removed"] == {"services": ["MongoDB"]}
+    assert [payload["version"] for _, payload in recorder.events] == [1, 2]
+
+
+def test_concurrent_publishes_arrive_in_version_order():
+    recorder = Recorder(delay=0.001)
+    broadcaster = StatusBroadcaster(recorder)
+
+    def worker(index):
+        for tick in range(20):
+            broadcaster.update_entry("java", f"svc{index}", {"pid": tick})
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    versions = [payload["version"] for _, payload in recorder.events]
+    assert versions == list(range(1, len(versions) + 1))
+    assert all(payload["base"] == payload["version"] - 1 for _, payload in recorder.events)
+    # 单个条目的更新不会用旧副本覆盖其他线程发布的状态
+    assert broadcaster.full_sync()["status"]["java"] == {f"svc{index}": {"pid": 19} for index in range(4)}
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from status_collector import StatusCollector
+
+
+@pytest.fixture
+def collector():
+    collector = StatusCollector(max_workers=4, timeout=0.2)
+    yield collector
+    collector.shutdown()
+
+
+def test_timeout_marks_only_the_slow_task_unknown(collector):
+    release = threading.Event()
+    tasks = {
+        ("service", "MongoDB"): ("service", lambda: True),
+        ("middleware", "nginx"): ("middleware", lambda: release.wait(5) and {("middleware", "nginx"): 20}),
+        ("java", None): ("java", lambda: {("java", "gis"): 10}),
+    }
+    try:
+        results = collector.run(tasks)
+        assert results[("service", "MongoDB")] is True
+        assert results[("java", None)] == {("java", "gis"): 10}
+        assert results[("middleware", "nginx")] is StatusCollector.UNKNOWN
+        assert collector.stats()["timeouts"] == {"middleware": 1}
+
+        # 上次仍未返回的任务不重复提交，直接为未知
+        submitted = []
+        results = collector.run({("middleware", "nginx"): ("middleware", lambda: submitted.append(1))})
+        assert results[("middleware", "nginx")] is StatusCollector.UNKNOWN
+        assert submitted == []
+        assert collector.stats()["inflight"] == 1
+    finally:
+        release.set()
+
+    # 卡住的任务结束后恢复正常采集
+    collector.inflight[("middleware", "nginx")].result(timeout=5)
+    assert collector.run({("middleware", "nginx"): ("middleware", lambda: 20)}) == {("middleware", "nginx"): 20}
+
+
+def test_failed_task_is_unknown(collector):
+    def fail():
+        raise OSError("access denied")
+
+    results = collector.run({("service", "PostgreSQL"): ("service", fail),
+                             ("service", "MongoDB"): ("service", lambda: False)})
+    assert results == {("service", "PostgreSQL"): StatusCollector.UNKNOWN, ("service", "MongoDB"): False}
+    assert collector.stats()["inflight"] == 0
+    assert set(collector.stats()["latency"]) == {"service"}
@@ -1,5 +1,5 @@
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import win32serviceutil
 import win32service
 import psutil
@@ -9,8 +9,33 @@ import threading
 import queue
 import time
 import re
+import subprocess
+import atexit
 from PIL import Image, ImageDraw
 import sys
+from process_backend import PROCESS_ERRORS
+from process_snapshot import ProcessSnapshot, SnapshotProvider
+from process_tracker import PidTracker
+from jar_matcher import get_jar_matcher
+from status_broadcast import StatusBroadcaster
+from poll_scheduler import PollScheduler
+from status_collector import StatusCollector
+from job_executor import JobExecutor, run_batch
+from lock_manager import LockManager
+from readiness import ReadinessProber
+from config_store import ConfigStore
+from reload_coalescer import ReloadCoalescer
+from metrics import MetricsCollector
+import prometheus_export
+from supervisor import Supervisor
+from exit_watcher import ExitWatcher
+from launcher import Launcher
+from output_store import OutputStore
+from log_index import LogIndexCache, is_log_file_in, list_log_files
+from access_log import AccessLogAnalytics
+from file_browser import DEFAULT_EXTENSIONS, DirectoryCache
+import nginx_conf as nginx_config
+from orchestrator import DependencyError, StartupOrchestrator, build_graph, parse_dependency, topological_layers
 
 app = Flask(__name__)
 socketio = SocketIO(app, async_mode='threading')  # 使用threading模式而不是eventlet
@@ -28,134 +53,310 @@ class ServiceManager:
         self.middleware_config_file = "middleware_config.json"
         
         # 加载配置
-        self.java_services = self.load_java_services()
-        self.middlewares = self.load_middlewares()
+        self.load_java_services()
+        self.load_middlewares()
         
         # 添加进程状态缓存
         self.process_cache = {}
         self.last_check_time = 0
         self.CHECK_INTERVAL = 2  # 将检查间隔从10秒降低到2秒
         
-        # 操作锁，防止并发操作导致的问题
-        self.operation_lock = threading.Lock()
+        # PID跟踪器：稳定状态下只校验已知PID，不再每个周期扫描全部进程
+        self.pid_tracker = PidTracker(rescan_interval=self.CHECK_INTERVAL * 5)
+        
+        # 自适应轮询：操作后快速轮询，长期稳定的对象逐步降低频率，没有客户端时降为低频轮询
+        self.scheduler = PollScheduler(base_interval=self.CHECK_INTERVAL)
+        
+        # 最近一次检查得到的状态。状态检查线程、进程退出监视线程和操作任务线程都会修改，
+        # 修改和发布都在 status_lock 内进行
+        self.status = {'services': {}, 'java': {}, 'middleware': {}}
+        self.status_lock = threading.RLock()
+        # key -> 事件序号：进程退出或启动后直接更新状态时递增，检查周期据此丢弃更新前开始的检测结果
+        self.status_events = {}
+        
+        # 并发状态采集：单个采集任务超时只影响对应对象
+        self.COLLECT_TIMEOUT = 5
+        self.collector = StatusCollector(max_workers=8, timeout=self.COLLECT_TIMEOUT)
+        
+        # 异步操作执行器：操作请求立即返回任务ID，进度和结果通过WebSocket推送
+        self.jobs = JobExecutor(max_workers=4, notify=socketio.emit)
+        
+        # 按对象划分的操作锁：同一对象的操作互斥，不相关对象可以并行操作
+        self.locks = LockManager()
+        
+        # 重载合并：同一中间件短时间内的多次重载请求只执行一次
+        self.reloads = ReloadCoalescer(window=0.5)
+        
+        # 状态推送：只发送相对上次的变化
+        self.broadcaster = StatusBroadcaster(socketio.emit)
+        
+        # 资源指标：每个受管进程的CPU、内存、线程、句柄和I/O，保存最近10分钟
+        self.metrics = MetricsCollector(capacity=300, interval=self.CHECK_INTERVAL)
+        
+        # /metrics 导出使用的快照，由状态检查线程在每个周期结束时生成
+        self.export_snapshot = {"time": None, "ticks": 0, "targets": []}
+        self.pid_restarts = {}   # key -> PID变化次数
+        self.last_pids = {}      # key -> 最近一次检测到的PID
+        
+        # 就绪探测：进程存在之外再按配置检查端口、HTTP接口或日志
+        self.prober = ReadinessProber()
+        
+        # 按 depends_on 依赖关系并行启动，每个对象在依赖就绪后立即启动
+        self.READY_TIMEOUT = 60
+        self.orchestrator = StartupOrchestrator(self.start_target, self.is_target_ready, self.wait_target_ready,
+                                                max_workers=4, notify=socketio.emit)
+        
+        # 进程守护：开启了 supervise 的对象意外退出后按退避策略自动重启
+        self.supervisor = Supervisor(self.start_target, notify=socketio.emit)
+        self.update_supervisor_watch()
+        
+        # 启动器：直接创建进程并取得目标进程PID，启动后无需扫描进程表
+        self.launcher = Launcher()
+        
+        # 启动的进程的标准输出/标准错误：写入 logs 目录下按大小轮转的日志，并推送给订阅的页面
+        self.outputs = OutputStore(base_dir="logs", notify=lambda key, payload: socketio.emit(
+            'output_lines', payload, to=output_room(key)))
+        
+        # 日志查看：大日志文件的行偏移索引（保存在日志文件旁），按需分页读取
+        self.log_indexes = LogIndexCache()
+        
+        # 文件浏览器：目录列表按目录修改时间缓存，浏览大目录时不必每次重新读取磁盘
+        self.directories = DirectoryCache()
+        
+        # nginx访问日志分析：增量读取 access_log，按location统计请求速率、状态码和延迟分位数
+        self.access_logs = AccessLogAnalytics(self.nginx_access_targets, state_dir=self.outputs.base_dir)
+        
+        # 进程退出监视：跟踪中的进程一退出立即更新状态，不必等到下一个检查周期
+        self.exit_watcher = ExitWatcher(self.pid_tracker, self.on_process_exit)
         
         # 状态检查线程
         self.is_running = True
         self.status_thread = threading.Thread(target=self.background_status_check, daemon=True)
         self.status_thread.start()
 
+    @property
+    def java_services(self):
+        # 外部修改配置文件后 ConfigStore 会整体替换 data，每次都取当前的字典
+        return self.java_store.data
+
+    @property
+    def middlewares(self):
+        return self.middleware_store.data
+
     def load_java_services(self):
-        try:
-            if os.path.exists(self.config_file):
-                try:
-                    with open(self.config_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    # 添加运行时需要的字段
-                    for service in data.values():
-                        service["pid"] = None
-                    return data
-                except json.JSONDecodeError:
-                    print("配置文件格式错误，将创建新的配置文件")
-                    os.remove(self.config_file)
-                    
-            # 如果配置文件不存在或已被删除，创建新的配置文件
-            empty_config = {}
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(empty_config, f, ensure_ascii=False, indent=4)
-            return empty_config
-            
-        except Exception as e:
-            print(f"配置文件操作失败: {e}")
-            return {}
+        # 配置保存在内存中，修改后合并写盘，外部修改自动合并
+        self.java_store = ConfigStore(self.config_file, runtime_defaults={"pid": None},
+                                      on_change=lambda *changes: self.on_config_change("java", *changes))
+        return self.java_store.data
 
     def load_middlewares(self):
-        try:
-            if os.path.exists(self.middleware_config_file):
-                try:
-                    with open(self.middleware_config_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    # 添加运行时需要的字段
-                    for middleware in data.values():
-                        middleware["pid"] = None
-                    return data
-                except json.JSONDecodeError:
-                    print("中间件配置文件格式错误，将创建新的配置文件")
-                    os.remove(self.middleware_config_file)
-            
-            # 如果配置文件不存在或已被删除，创建新的配置文件
-            empty_config = {}
-            with open(self.middleware_config_file, 'w', encoding='utf-8') as f:
-                json.dump(empty_config, f, ensure_ascii=False, indent=4)
-            return empty_config
-            
-        except Exception as e:
-            print(f"中间件配置文件操作失败: {e}")
-            return {}
+        self.middleware_store = ConfigStore(self.middleware_config_file, runtime_defaults={"pid": None},
+                                            on_change=lambda *changes: self.on_config_change("middleware", *changes))
+        return self.middleware_store.data
 
     def save_java_services(self):
-        try:
-            # 创建一个不包含UI元素的副本
-            services_to_save = {}
-            for name, service in self.java_services.items():
-                services_to_save[name] = {
-                    "process": service["process"],
-                    "jar_name": service["jar_name"],
-                    "script": service.get("script", "")
-                }
-            
-            # 保存到文件
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(services_to_save, f, ensure_ascii=False, indent=4)
-            return {"status": "success", "message": "配置已保存"}
-        except Exception as e:
-            return {"status": "error", "message": f"保存配置文件失败: {str(e)}"}
+        return self.java_store.save(immediate=True)
 
     def save_middlewares(self):
-        try:
-            # 创建一个不包含UI元素的副本
-            middlewares_to_save = {}
-            for name, middleware in self.middlewares.items():
-                middlewares_to_save[name] = {
-                    "process_name": middleware["process_name"],
-                    "start_cmd": middleware["start_cmd"],
-                    "reload_cmd": middleware["reload_cmd"],
-                    "work_dir": middleware.get("work_dir", ""),
-                    "port": middleware.get("port", None)
-                }
-            
-            # 保存到文件
-            with open(self.middleware_config_file, 'w', encoding='utf-8') as f:
-                json.dump(middlewares_to_save, f, ensure_ascii=False, indent=4)
-            return {"status": "success", "message": "配置已保存"}
-        except Exception as e:
-            return {"status": "error", "message": f"保存中间件配置失败: {str(e)}"}
+        return self.middleware_store.save(immediate=True)
+
+    def on_config_change(self, kind, added, removed, changed):
+        """配置文件被外部修改后，重新检测相关对象"""
+        for name in removed:
+            self.locks.forget((kind, name))
+        for name in added + changed:
+            self.pid_tracker.invalidate((kind, name))
+            self.scheduler.boost((kind, name), duration=0)
+
+    def on_process_exit(self, key, pid):
+        """跟踪的进程退出（由退出监视线程调用），立即推送状态并通知进程守护"""
+        kind, name = key
+        entries = self.java_services if kind == "java" else self.middlewares
+        if name in entries and entries[name].get("pid") == pid:
+            entries[name]["pid"] = None
+        if kind == "middleware":
+            self.process_cache[name] = {"pid": None}
+        with self.status_lock:
+            self.set_event_status(key, {"pid": None, "ready": False})
+            self.scheduler.record(key, (None, False))
+            self.supervisor.observe(key, False, self.target_config(kind, name))
+
+    def set_event_status(self, key, entry):
+        """进程退出或启动后直接更新单个对象的状态并立即推送，不必等待下一个检查周期
+
+        同时递增该对象的事件序号，正在进行的检查周期如果在此之前就开始了检测，
+        它得到的旧结果不会覆盖这次更新。
+        """
+        kind, name = key
+        with self.status_lock:
+            self.status_events[key] = self.status_events.get(key, 0) + 1
+            self.status[kind][name] = entry
+            self.broadcaster.update_entry(kind, name, entry)
+
+    def update_supervisor_watch(self, keys=None):
+        """开启了守护的对象作为常驻的观察者，没有客户端连接时也按正常频率检查它们的状态"""
+        if keys is None:
+            keys = ([("java", name) for name in self.java_services] +
+                    [("middleware", name) for name in self.middlewares])
+        supervised = [key for key in keys if Supervisor.options_of(self.target_config(*key))]
+        self.scheduler.set_watchers('supervisor', len(supervised))
 
     def background_status_check(self):
         while self.is_running:
             try:
-                # 检查服务状态
-                service_status = {}
-                for service_name in self.services:
-                    service_status[service_name] = self.is_service_running(service_name)
-                
-                # 检查Java进程状态
-                java_status = self.check_java_processes_status()
+                # 没有客户端连接时调度器降为低频轮询，但不会停止
+                self.check_due_status()
                 
-                # 检查中间件状态
-                middleware_status = self.check_middleware_processes_status()
-                
-                # 通过WebSocket发送状态更新
-                socketio.emit('status_update', {
-                    'services': service_status,
-                    'java': java_status,
-                    'middleware': middleware_status
-                })
-                
-                time.sleep(self.CHECK_INTERVAL)
+                # 等待到下一个对象需要检查（操作请求、客户端连接会立即唤醒）
+                self.scheduler.wait()
             except Exception as e:
                 print(f"状态检查错误: {e}")
                 time.sleep(1)
 
+    def check_due_status(self):
+        """检查所有到期的对象，并推送状态变化"""
+        tick_start = time.perf_counter()
+        now = time.time()
+        service_keys = [("service", name) for name in self.services]
+        process_keys = ([("java", name) for name in self.java_services] +
+                        [("middleware", name) for name in self.middlewares])
+        due = self.scheduler.due(service_keys + process_keys, now)
+        self.pid_tracker.retain(process_keys)
+        self.prober.retain(process_keys)
+        self.metrics.retain(process_keys)
+        self.supervisor.retain(process_keys)
+        self.update_supervisor_watch(process_keys)
+        
+        # 记录开始检测时各对象的事件序号，检测期间发生退出或启动的对象不使用本周期的结果
+        with self.status_lock:
+            events = dict(self.status_events)
+        
+        # 构建采集任务：每个服务的SCM查询、Java检测、每个中间件检测并发执行，
+        # 需要全量扫描时共用同一份进程表快照
+        snapshots = SnapshotProvider()
+        tasks = {}
+        java_due = [key for key in due if key[0] == "java"]
+        if java_due:
+            tasks[("java", None)] = ("java", lambda: self.check_processes_status(java_due, snapshots))
+        for key in due:
+            kind, name = key
+            if kind == "service":
+                tasks[key] = ("service", lambda name=name: self.is_service_running(name))
+            elif kind == "middleware":
+                tasks[key] = ("middleware", lambda key=key: self.check_processes_status([key], snapshots))
+        results = self.collector.run(tasks)
+        
+        # Java进程和中间件状态，超时的对象标记为未知
+        pids = {}
+        unknown = []
+        java_result = results.get(("java", None))
+        if java_due:
+            if java_result is StatusCollector.UNKNOWN:
+                unknown.extend(java_due)
+            else:
+                pids.update(java_result)
+        for key in due:
+            if key[0] == "middleware":
+                value = results.get(key, StatusCollector.UNKNOWN)
+                if value is StatusCollector.UNKNOWN:
+                    unknown.append(key)
+                else:
+                    pids.update(value)
+        # 对检测到进程的对象执行就绪探测，结果作为独立的 ready 状态
+        probes = self.probe_readiness(pids)
+        
+        with self.status_lock:
+            # 移除已删除的对象
+            sections = {"service": "services", "java": "java", "middleware": "middleware"}
+            current = {section: set() for section in self.status}
+            for kind, name in service_keys + process_keys:
+                current[sections[kind]].add(name)
+            for section, names in current.items():
+                for name in list(self.status[section]):
+                    if name not in names:
+                        del self.status[section][name]
+            for key in list(self.status_events):
+                if key not in process_keys:
+                    del self.status_events[key]
+            
+            # 服务状态，超时的服务标记为未知（None）
+            for key in due:
+                kind, name = key
+                if kind != "service":
+                    continue
+                value = results.get(key, StatusCollector.UNKNOWN)
+                self.status['services'][name] = None if value is StatusCollector.UNKNOWN else value
+                self.scheduler.record(key, self.status['services'][name])
+            
+            for (kind, name), pid in pids.items():
+                if self.status_events.get((kind, name), 0) != events.get((kind, name), 0):
+                    continue
+                entry = {"pid": pid, "ready": bool(pid)}
+                probe = probes.get((kind, name))
+                if probe:
+                    entry["ready"] = probe["ready"]
+                    # 探测耗时按10毫秒取整，避免微小波动在每个周期都产生状态推送
+                    entry["latency"] = int(round(probe["latency"], -1)) if probe["latency"] is not None else None
+                    if not probe["ready"]:
+                        entry["message"] = probe["message"]
+                self.status[kind][name] = entry
+                self.scheduler.record((kind, name), (pid, entry["ready"]))
+                self.supervisor.observe((kind, name), bool(pid), self.target_config(kind, name), now)
+                if pid:
+                    # 进程以新的PID重新出现（崩溃后被拉起或重新启动）
+                    previous = self.last_pids.get((kind, name))
+                    if previous and previous != pid:
+                        self.pid_restarts[(kind, name)] = self.pid_restarts.get((kind, name), 0) + 1
+                    self.last_pids[(kind, name)] = pid
+            for kind, name in unknown:
+                if self.status_events.get((kind, name), 0) != events.get((kind, name), 0):
+                    continue
+                self.status[kind][name] = {"pid": None, "unknown": True}
+                self.scheduler.record((kind, name), "unknown")
+            
+            # 通过WebSocket发送状态变化（没有变化时不发送）
+            self.broadcaster.publish(self.status)
+            running = {(kind, name): (self.status[kind].get(name) or {}).get("pid") for kind, name in process_keys}
+        
+        # 对正在运行的进程采样资源指标，只推送新增的采样点
+        if self.metrics.due(now):
+            self.metrics.sample(running, now)
+            delta = self.metrics.delta()
+            if delta:
+                socketio.emit('metrics_delta', delta)
+        
+        self.update_export_snapshot(service_keys + process_keys, now, time.perf_counter() - tick_start)
+
+    def update_export_snapshot(self, keys, now, tick_duration):
+        """生成 /metrics 使用的快照，抓取时只渲染快照，不会触发进程表扫描"""
+        for store in (self.pid_restarts, self.last_pids):
+            for key in list(store):
+                if key not in keys:
+                    del store[key]
+        sections = {"service": "services", "java": "java", "middleware": "middleware"}
+        targets = []
+        with self.status_lock:
+            values = [self.status[sections[kind]].get(name) for kind, name in keys]
+        for (kind, name), value in zip(keys, values):
+            if kind == "service":
+                up = ready = value
+            elif value is None or value.get("unknown"):
+                up = ready = None
+            else:
+                up = bool(value.get("pid"))
+                ready = bool(value.get("ready"))
+            targets.append({"kind": kind, "name": name, "up": up, "ready": ready,
+                            "restarts": self.pid_restarts.get((kind, name), 0)})
+        snapshot = {
+            "time": now,
+            "ticks": self.export_snapshot["ticks"] + 1,
+            "tick_duration": round(tick_duration, 6),
+            "targets": targets,
+            "resources": self.metrics.latest(),
+            "collector": self.collector.stats()
+        }
+        self.export_snapshot = snapshot
+
     def is_service_running(self, service_name):
         service = self.services[service_name]
         try:
@@ -165,89 +366,79 @@ class ServiceManager:
             print(f"检查服务状态失败: {e}")
             return False
 
-    def check_java_processes_status(self):
+    def check_processes_status(self, keys=None, snapshots=None):
+        """通过PID跟踪器检查Java进程和中间件状态，返回 {(类型, 名称): pid}
+
+        已知存活的进程只校验PID和创建时间，只有进程退出或新增对象时才扫描进程表，
+        需要扫描时Java和中间件检测共用同一份快照。
+        """
+        if keys is None:
+            keys = ([("java", name) for name in self.java_services] +
+                    [("middleware", name) for name in self.middlewares])
+        pids = self.pid_tracker.check(keys, self.detect_pids, snapshots)
+        
+        # 同步PID到配置对象，供停止/删除等操作使用
+        for (kind, name), pid in pids.items():
+            entries = self.java_services if kind == "java" else self.middlewares
+            if name in entries:
+                entries[name]["pid"] = pid
+        
+        # 更新缓存和最后检查时间
+        for (kind, name), pid in pids.items():
+            if kind == "middleware":
+                self.process_cache[name] = {"pid": pid}
+        self.last_check_time = time.time()
+        
+        return pids
+
+    def detect_pids(self, snapshot, keys):
+        """在进程表快照中查找指定对象的PID，供PID跟踪器全量扫描时调用"""
+        java_names = [name for kind, name in keys if kind == "java"]
+        middleware_names = [name for kind, name in keys if kind == "middleware"]
+        pids = {}
+        if java_names:
+            for name, info in self.check_java_processes_status(snapshot, java_names).items():
+                pids[("java", name)] = info["pid"]
+        if middleware_names:
+            for name, info in self.check_middleware_processes_status(snapshot, middleware_names).items():
+                pids[("middleware", name)] = info["pid"]
+        return pids
+
+    def check_java_processes_status(self, snapshot=None, names=None):
+        if snapshot is None:
+            snapshot = ProcessSnapshot()
+        if names is None:
+            names = list(self.java_services)
+            
+        # 匹配器只在java_services变化时重新编译，一次扫描即可完成所有进程的分类
+        matches = snapshot.match_jars(get_jar_matcher(self.java_services))
         status = {}
-        for service_name in self.java_services:
-            status[service_name] = {"pid": None}
-            
-        for process in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = " ".join(process.info['cmdline']) if process.info['cmdline'] else ""
-                for service_name, service_info in self.java_services.items():
-                    jar_name = service_info.get("jar_name", "")
-                    if jar_name and jar_name in cmdline:
-                        status[service_name]["pid"] = process.info['pid']
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+        for service_name in names:
+            status[service_name] = {"pid": matches.get(service_name)}
                 
         return status
 
-    def check_middleware_processes_status(self):
-        current_time = time.time()
+    def check_middleware_processes_status(self, snapshot=None, names=None):
+        if snapshot is None:
+            snapshot = ProcessSnapshot()
+        if names is None:
+            names = list(self.middlewares)
         
-        # 每次请求都检查进程状态，不使用缓存
         status = {}
-        for middleware_name in self.middlewares:
-            status[middleware_name] = {"pid": None}
-            
-        try:
-            # 方法1: 使用tasklist命令
-            import subprocess
-            tasklist_output = subprocess.check_output('tasklist /FO CSV /NH', shell=True).decode('gbk', errors='ignore')
-            
-            # 为每个中间件检查进程
-            for middleware_name, middleware_info in self.middlewares.items():
-                process_name = middleware_info['process_name'].lower()
-                
-                # 在tasklist输出中查找进程
-                for line in tasklist_output.splitlines():
-                    if process_name in line.lower():
-                        try:
-                            pid = int(line.split('"')[1])  # CSV格式，PID在第2个字段
-                            status[middleware_name]["pid"] = pid
-                            break
-                        except:
-                            continue
-        except Exception as e:
-            print(f"tasklist检查失败: {e}")
-            
-        # 方法2: 如果tasklist方法没有找到某些进程，使用psutil作为备选方案
-        for middleware_name, info in status.items():
-            if info["pid"] is None:
-                try:
-                    process_name = self.middlewares[middleware_name]['process_name'].lower()
-                    work_dir = self.middlewares[middleware_name].get("work_dir", "").lower()
-                    
-                    for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'exe']):
-                        try:
-                            # 检查进程名是否匹配
-                            proc_name = proc.info['name'].lower() if proc.info.get('name') else ""
-                            proc_exe = os.path.basename(proc.info['exe']).lower() if proc.info.get('exe') else ""
-                            proc_cmd = " ".join(proc.info['cmdline']).lower() if proc.info.get('cmdline') else ""
-                            
-                            if (process_name in proc_name or 
-                                process_name in proc_exe or 
-                                process_name in proc_cmd):
-                                
-                                # 如果配置了工作目录，进行检查
-                                if work_dir:
-                                    try:
-                                        proc_cwd = proc.cwd().lower()
-                                        if not (work_dir in proc_cwd or 
-                                               proc_cwd in work_dir or 
-                                               os.path.normpath(work_dir) == os.path.normpath(proc_cwd)):
-                                            continue
-                                    except:
-                                        continue
-                                
-                                status[middleware_name]["pid"] = proc.pid
-                                break
-                        except:
-                            continue
-                except Exception as e:
-                    print(f"psutil检查失败: {e}")
+        for middleware_name in names:
+            middleware_info = self.middlewares.get(middleware_name)
+            if not middleware_info:
+                continue
+            try:
+                # 按进程名/可执行文件名索引查找，配置了工作目录时再比对工作目录
+                pid = snapshot.find_middleware(middleware_info['process_name'],
+                                               middleware_info.get("work_dir", ""))
+            except Exception as e:
+                print(f"中间件进程检查失败: {e}")
+                pid = None
+            status[middleware_name] = {"pid": pid}
                     
-        # 方法3: 对于nginx特殊处理，尝试使用其工作目录判断
+        # 对于nginx特殊处理，尝试使用其工作目录判断
         for middleware_name, info in status.items():
             if info["pid"] is None and "nginx" in middleware_name.lower():
                 try:
@@ -259,52 +450,557 @@ class ServiceManager:
                             try:
                                 with open(pid_file, 'r') as f:
                                     pid = int(f.read().strip())
-                                    try:
-                                        # 检查PID是否有效
-                                        proc = psutil.Process(pid)
+                                    # 检查PID是否有效
+                                    if pid in snapshot.procs:
                                         status[middleware_name]["pid"] = pid
-                                    except:
-                                        pass
                             except:
                                 pass
                 except Exception as e:
                     print(f"Nginx PID文件检查失败: {e}")
-            
-        # 更新缓存和最后检查时间
-        self.process_cache = status
-        self.last_check_time = current_time
                 
         return status
         
     def get_nginx_port(self, nginx_conf_path):
-        """读取nginx配置文件中的端口号"""
+        """读取nginx配置文件中的端口号（解析结果按文件修改时间缓存）"""
         try:
-            with open(nginx_conf_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                # 使用简单的文本匹配查找端口号
-                match = re.search(r'listen\s+(\d+)', content)
-                if match:
-                    return match.group(1)
+            return nginx_config.load(nginx_conf_path).listen_port()
         except Exception as e:
             print(f"读取nginx配置文件失败: {e}")
         return None
 
-    def update_nginx_port(self, nginx_conf_path, new_port):
-        """更新nginx配置文件中的端口号"""
+    def nginx_conf_path(self, middleware_name):
+        """返回中间件的nginx配置文件路径，找不到时抛出 NginxConfigError"""
+        middleware = self.middlewares.get(middleware_name)
+        if not middleware:
+            raise nginx_config.NginxConfigError("中间件不存在")
+        work_dir = middleware.get("work_dir", "")
+        if not work_dir:
+            raise nginx_config.NginxConfigError("未设置工作目录")
+        conf_path = os.path.join(work_dir, "conf", "nginx.conf")
+        if not os.path.exists(conf_path):
+            raise nginx_config.NginxConfigError("未找到nginx配置文件")
+        return conf_path
+
+    def apply_nginx_edit(self, middleware_name, build):
+        """修改nginx配置：在中间件的配置锁内用 build(config) 生成修改，写入后用 nginx -t 校验，失败时恢复原配置
+
+        返回 {"status", "message", "output", "files"}
+        """
+        try:
+            conf_path = self.nginx_conf_path(middleware_name)
+            middleware = self.middlewares[middleware_name]
+            with self.target_lock("middleware", middleware_name, "config"):
+                edit = build(nginx_config.load(conf_path))
+                ok, output, changed = nginx_config.apply_transaction(
+                    edit, lambda: nginx_config.test_config(middleware["work_dir"], conf_path, middleware["process_name"]))
+        except nginx_config.NginxConfigError as e:
+            return {"status": "error", "message": str(e)}
+        if not ok:
+            return {"status": "error", "message": "配置检查未通过，已恢复原配置", "output": output}
+        return {"status": "success", "message": "配置已更新", "output": output, "files": changed}
+
+    def update_nginx_port(self, middleware_name, new_port):
+        """更新nginx配置文件中的端口号（所有监听当前端口的 listen 指令），校验通过后保存到中间件配置"""
+        result = self.apply_nginx_edit(middleware_name,
+                                       lambda config: nginx_config.listen_port_changes(config, new_port))
+        if result["status"] == "success":
+            self.middlewares[middleware_name]["port"] = new_port
+            self.save_middlewares()
+            result["message"] = "端口号已更新"
+        return result
+
+    def nginx_access_targets(self):
+        """需要分析访问日志的nginx: {key: (工作目录, nginx.conf路径)}"""
+        targets = {}
+        for name, middleware in list(self.middlewares.items()):
+            work_dir = middleware.get("work_dir", "")
+            conf_path = os.path.join(work_dir, "conf", "nginx.conf")
+            if work_dir and os.path.isfile(conf_path):
+                targets[("middleware", name)] = (work_dir, conf_path)
+        return targets
+
+    def get_nginx_proxies(self, nginx_conf_path):
+        """返回nginx配置中的反向代理列表（不包含内置的location）"""
+        return nginx_config.load(nginx_conf_path).proxy_locations()
+
+    def add_nginx_proxy(self, middleware_name, suffix, target):
+        """在第一个带 server_name 的server块中添加反向代理location"""
+        result = self.apply_nginx_edit(middleware_name,
+                                       lambda config: nginx_config.proxy_addition(config, suffix, target))
+        if result["status"] == "success":
+            result["message"] = "代理配置已添加"
+        return result
+
+    def edit_nginx_locations(self, middleware_name, operations, port=None, server_name=None, reload=True):
+        """批量修改nginx的location配置
+
+        所有修改一次写入，用 nginx -t 校验，校验失败时恢复原配置；成功后提交一次重载任务（返回 job_id）。
+        server 块按监听端口或 server_name 选择，都未指定时使用第一个带 server_name 的server。
+        """
+        if not operations:
+            return {"status": "error", "message": "没有需要执行的修改"}
+            
+        def build(config):
+            server = config.find_server(port=port, server_name=server_name)
+            if server is None:
+                raise nginx_config.NginxConfigError("未找到指定的server配置块")
+            return nginx_config.location_changes(config, server, operations)
+            
+        applied = self.apply_nginx_edit(middleware_name, build)
+        if applied["status"] != "success":
+            return applied
+        output, changed = applied["output"], applied["files"]
+            
+        result = {
+            "status": "success",
+            "message": f"已应用 {len(operations)} 项修改",
+            "output": output,
+            "files": changed
+        }
+        if reload:
+            self.submit_nginx_reload(middleware_name, result)
+        return result
+
+    def submit_nginx_reload(self, middleware_name, result):
+        """配置修改成功后把重载作为异步任务提交（与启动、停止等操作一样），在 result 中附加任务ID"""
+        if not self.middlewares.get(middleware_name, {}).get("reload_cmd"):
+            result["message"] += "，未配置重载命令，请手动重载nginx"
+            return result
+        job = self.submit_operation("middleware", middleware_name, "reload")
+        result["job_id"] = job["id"]
+        result["message"] += "，重载操作已提交"
+        return result
+
+    # 操作名称，用于提示信息
+    ACTION_LABELS = {
+        "start": "启动",
+        "stop": "停止",
+        "restart": "重启",
+        "reload": "重载"
+    }
+
+    def get_operation(self, kind, action):
+        """按对象类型和操作名称取得对应的操作方法，不支持时返回None"""
+        operations = {
+            ("service", "start"): self.start_service,
+            ("service", "stop"): self.stop_service,
+            ("service", "restart"): self.restart_service,
+            ("java", "start"): self.start_java,
+            ("java", "stop"): self.stop_java,
+            ("middleware", "start"): self.start_middleware,
+            ("middleware", "stop"): self.stop_middleware,
+            ("middleware", "reload"): self.reload_middleware
+        }
+        return operations.get((kind, action))
+
+    def validate_operation(self, kind, name, action):
+        """检查操作是否可以执行，返回错误信息，可以执行时返回None"""
+        if self.get_operation(kind, action) is None:
+            return f"不支持的操作: {kind}/{action}"
+        if kind == "service" and name not in self.services:
+            return "服务不存在"
+        if kind == "java":
+            service = self.java_services.get(name)
+            if not service:
+                return "进程不存在"
+            if action == "start" and not service.get("script"):
+                return "请先配置启动脚本路径"
+        if kind == "middleware":
+            middleware = self.middlewares.get(name)
+            if not middleware:
+                return "中间件不存在"
+            if action == "reload" and not middleware.get("reload_cmd"):
+                return "未配置重载命令"
+        return None
+
+    def target_config(self, kind, name):
+        """返回Java进程或中间件的配置，Windows服务及不存在的对象返回空字典"""
+        return {"java": self.java_services, "middleware": self.middlewares}.get(kind, {}).get(name) or {}
+
+    def target_lock(self, kind, name, action):
+        """取得对象的操作锁，配置了 lock_groups 的对象与同组对象的操作互斥"""
+        key = (kind, name)
+        config = self.target_config(kind, name)
+        self.locks.set_groups(key, config.get("lock_groups"))
+        return self.locks.hold(key, action)
+
+    def submit_operation(self, kind, name, action):
+        """提交异步操作，返回任务信息"""
+        operation = self.get_operation(kind, action)
+        return self.jobs.submit(kind, name, action, lambda report: operation(name))
+
+    # 批量操作的默认并发数和上限
+    BULK_CONCURRENCY = 4
+    BULK_MAX_CONCURRENCY = 8
+
+    def bulk_targets(self, data):
+        """解析批量操作请求
+
+        targets 为 [{"kind": "service/java/middleware", "name": ..., "action": ...}] 或 "all"，
+        未指定 action 的对象使用请求中的 action。返回对象列表，每项附带校验错误（可执行时为None）。
+        """
+        default_action = data.get("action", "")
+        targets = data.get("targets") or []
+        if targets == "all":
+            targets = ([{"kind": "service", "name": name} for name in self.services] +
+                       [{"kind": "middleware", "name": name} for name in self.middlewares] +
+                       [{"kind": "java", "name": name} for name in self.java_services])
+        parsed = []
+        for target in targets:
+            if not isinstance(target, dict):
+                target = {}
+            kind = target.get("kind", "")
+            name = target.get("name", "")
+            action = target.get("action") or default_action
+            parsed.append({
+                "kind": kind,
+                "name": name,
+                "action": action,
+                "error": self.validate_operation(kind, name, action)
+            })
+        return parsed
+
+    def run_bulk(self, targets, concurrency=None, report=None):
+        """并行执行批量操作，返回每个对象的结果
+
+        同时执行的操作数不超过 concurrency；每个对象完成时通过 'bulk_progress' 推送结果。
+        """
+        concurrency = max(1, min(int(concurrency or self.BULK_CONCURRENCY), self.BULK_MAX_CONCURRENCY))
+        job_id = getattr(report, "job_id", None)
+        total = len(targets)
+
+        def on_result(index, result):
+            socketio.emit('bulk_progress', {"job_id": job_id, "index": index, "total": total, "result": result})
+
+        def run(target):
+            return self.get_operation(target["kind"], target["action"])(target["name"])
+
+        results = run_batch(targets, run, concurrency, on_result, report)
+        failed = sum(1 for result in results if result["status"] != "success")
+        return {
+            "status": "success" if failed == 0 else "error",
+            "message": f"批量操作完成：成功 {total - failed} 个，失败 {failed} 个",
+            "results": results
+        }
+
+    def dependency_graph(self):
+        """根据配置中的 depends_on 返回 {(类型, 名称): [依赖的key]}"""
+        targets = ([("service", name) for name in self.services] +
+                   [("java", name) for name in self.java_services] +
+                   [("middleware", name) for name in self.middlewares])
+        target_set = set(targets)
+        dependencies = {}
+        for key in targets:
+            config = self.target_config(*key)
+            deps = []
+            for ref in config.get("depends_on") or []:
+                dep = parse_dependency(ref, target_set)
+                if dep == key:
+                    raise DependencyError(f"{key[1]} 不能依赖自身")
+                deps.append(dep)
+            dependencies[key] = deps
+        return dependencies
+
+    def startup_plan(self, roots=None):
+        """返回需要启动的子图和分层结果，依赖配置错误时抛出 DependencyError"""
+        graph = build_graph(self.dependency_graph(), roots)
+        return graph, topological_layers(graph)
+
+    def is_target_ready(self, key, rescan=True):
+        """对象当前是否已就绪：服务处于运行状态，Java进程和中间件检测到进程且就绪探测通过
+
+        已跟踪到进程（例如启动器已登记的PID）时只校验该PID；还没有跟踪到进程且 rescan 为 True 时
+        强制扫描进程表，刚启动的进程不受定期补扫间隔限制。
+        """
+        kind, name = key
+        if kind == "service":
+            return self.is_service_running(name)
+        if rescan and self.pid_tracker.tracked_process(key) is None:
+            self.pid_tracker.invalidate(key)
+        pid = self.check_processes_status(keys=[key]).get(key)
+        if not pid:
+            return False
+        probe = self.probe_readiness({key: pid}).get(key)
+        return probe["ready"] if probe else True
+
+    def probe_readiness(self, pids):
+        """对检测到进程且配置了 readiness 的对象并发执行就绪探测，返回 {key: 探测结果}"""
+        items = {}
+        for key, pid in pids.items():
+            config = self.target_config(*key)
+            probes = ReadinessProber.probes_of(config)
+            if not pid or not probes:
+                continue
+            tracked = self.pid_tracker.tracked_process(key)
+            if key[0] == "middleware":
+                base_dir = config.get("work_dir", "")
+            else:
+                base_dir = os.path.dirname(config.get("script") or config.get("jar_name", ""))
+            items[key] = {
+                "probes": probes,
+                "since": tracked[1] if tracked else None,
+                "base_dir": base_dir
+            }
+        return self.prober.probe_many(items, timeout=self.COLLECT_TIMEOUT)
+
+    def wait_target_ready(self, key, timeout=None):
+        """等待对象就绪，超时返回False"""
+        deadline = time.time() + (self.READY_TIMEOUT if timeout is None else timeout)
+        # 没有跟踪到进程时需要扫描进程表，扫描间隔从0.5秒开始逐次翻倍（最长8秒），
+        # 批量启动时多个等待中的对象不会每0.5秒各触发一次全量扫描
+        scan_delay = 0.5
+        next_scan = 0
+        while time.time() < deadline:
+            now = time.time()
+            rescan = now >= next_scan
+            if self.is_target_ready(key, rescan=rescan):
+                return True
+            if rescan:
+                next_scan = now + scan_delay
+                scan_delay = min(scan_delay * 2, 8)
+            time.sleep(0.5)
+        return False
+
+    def start_target(self, key):
+        kind, name = key
+        return self.get_operation(kind, "start")(name)
+
+    def launch_target(self, key, command, work_dir, env=None, new_console=None):
+        """启动Java进程或中间件，在启动的进程树中识别目标进程并直接登记PID
+
+        返回目标进程PID，未能识别时标记该对象需要重新扫描并返回None。
+        """
+        kind, name = key
+        capture = None
+        if self.target_config(kind, name).get("capture_output", False):
+            # 需要在配置中开启 capture_output：采集输出时不再打开控制台窗口，输出在页面上查看。
+            # 默认关闭，升级前已有的对象启动方式不变
+            capture = lambda popen: self.outputs.attach(key, popen)
+        launched = self.launcher.launch(key, command, cwd=work_dir, env=env, new_console=new_console,
+                                        detect=lambda snapshot: self.detect_pids(snapshot, [key]).get(key),
+                                        capture=capture)
+        pid = launched["target_pid"]
+        if not pid or not self.pid_tracker.adopt(key, pid, launched["create_time"]):
+            self.pid_tracker.invalidate(key)
+            return None
+            
+        entries = self.java_services if kind == "java" else self.middlewares
+        if name in entries:
+            entries[name]["pid"] = pid
+        self.set_event_status(key, {"pid": pid, "ready": not self.prober.probes_of(self.target_config(kind, name))})
+        return pid
+
+    def log_sources(self, key):
+        """对象可以查看的日志目录和文件，返回 (目录列表, 文件列表)
+
+        目录包括配置中的 log_dirs（相对路径以工作目录为基准）、中间件工作目录下的 logs、
+        Java启动脚本所在目录及其 logs 子目录；文件为启动器采集的输出日志及其轮转文件。
+        """
+        kind, name = key
+        config = self.target_config(kind, name)
+        if kind == "java":
+            script = config.get("script") or ""
+            base = config.get("work_dir") or os.path.dirname(script)
+            dirs = [base, os.path.join(base, "logs")] if base else []
+        else:
+            base = config.get("work_dir") or ""
+            dirs = [os.path.join(base, "logs")] if base else []
+        for directory in config.get("log_dirs") or []:
+            dirs.append(directory if os.path.isabs(directory) or not base else os.path.join(base, directory))
+        output = self.outputs.path_of(key)
+        files = [output] + [f"{output}.{index}" for index in range(1, self.outputs.backups + 1)]
+        return [directory for directory in dirs if os.path.isdir(directory)], \
+               [path for path in files if os.path.isfile(path)]
+
+    def resolve_log_file(self, key, path):
+        """校验请求的日志文件属于该对象的日志目录，返回文件路径，不允许时抛出 PermissionError
+
+        只允许输出日志和日志目录下（不含子目录）按文件名识别为日志的文件，
+        以免读取脚本目录中的其他文件，或在其旁边生成行索引文件。
+        """
+        dirs, files = self.log_sources(key)
+        real = os.path.realpath(path)
+        if real not in {os.path.realpath(item) for item in files} and not is_log_file_in(real, dirs):
+            raise PermissionError("只能查看该对象日志目录中的日志文件")
+        if not os.path.isfile(real):
+            raise FileNotFoundError("日志文件不存在")
+        return real
+
+    @staticmethod
+    def started_message(name, pid):
+        if pid:
+            return f"{name} 已启动，PID {pid}"
+        return f"{name} 已启动"
+
+    def start_service(self, service_name):
+        try:
+            with self.target_lock("service", service_name, "start"):
+                win32serviceutil.StartService(self.services[service_name])
+            self.scheduler.boost(("service", service_name))
+            return {"status": "success", "message": f"{service_name} 已启动"}
+        except Exception as e:
+            return {"status": "error", "message": f"启动 {service_name} 失败: {str(e)}"}
+
+    def stop_service(self, service_name):
+        try:
+            with self.target_lock("service", service_name, "stop"):
+                win32serviceutil.StopService(self.services[service_name])
+            self.scheduler.boost(("service", service_name))
+            return {"status": "success", "message": f"{service_name} 已停止"}
+        except Exception as e:
+            return {"status": "error", "message": f"停止 {service_name} 失败: {str(e)}"}
+
+    def restart_service(self, service_name):
+        try:
+            with self.target_lock("service", service_name, "restart"):
+                win32serviceutil.RestartService(self.services[service_name])
+            self.scheduler.boost(("service", service_name))
+            return {"status": "success", "message": f"{service_name} 已重启"}
+        except Exception as e:
+            return {"status": "error", "message": f"重启 {service_name} 失败: {str(e)}"}
+
+    def start_java(self, process_name):
+        try:
+            service = self.java_services.get(process_name)
+            if not service:
+                return {"status": "error", "message": "进程不存在"}
+                
+            script_path = service.get("script")
+            if not script_path:
+                return {"status": "error", "message": "请先配置启动脚本路径"}
+                
+            self.supervisor.user_started(("java", process_name))
+            # 脚本在自己所在的目录（或配置的工作目录）中运行，与双击启动一致
+            work_dir = service.get("work_dir") or os.path.dirname(script_path) or None
+            with self.target_lock("java", process_name, "start"):
+                pid = self.launch_target(("java", process_name), [script_path], work_dir,
+                                         service.get("env"), new_console=True)
+                
+            # 接下来一段时间内快速轮询
+            self.scheduler.boost(("java", process_name))
+                
+            return {"status": "success", "message": self.started_message(process_name, pid)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def stop_java(self, process_name):
+        try:
+            service = self.java_services.get(process_name)
+            if not service:
+                return {"status": "error", "message": "进程不存在"}
+                
+            pid = service.get("pid")
+            if not pid:
+                return {"status": "success", "message": f"{process_name} 未运行"}
+                
+            # 用户主动停止，不触发自动重启
+            self.supervisor.expect_stop(("java", process_name))
+            try:
+                with self.target_lock("java", process_name, "stop"):
+                    psutil.Process(pid).terminate()
+            except psutil.NoSuchProcess:
+                self.scheduler.boost(("java", process_name))
+                return {"status": "success", "message": f"{process_name} 未运行"}
+            except Exception:
+                # 终止失败，进程仍在运行，之后的意外退出仍需要自动重启
+                self.supervisor.stop_failed(("java", process_name))
+                raise
+                
+            self.scheduler.boost(("java", process_name))
+                
+            return {"status": "success", "message": f"{process_name} 已终止"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def start_middleware(self, middleware_name):
+        try:
+            middleware = self.middlewares.get(middleware_name)
+            if not middleware:
+                return {"status": "error", "message": "中间件不存在"}
+                
+            # 在中间件工作目录中执行命令，不切换整个进程的当前目录（其他对象的操作可能在并行执行）
+            work_dir = middleware.get("work_dir", "") or None
+            self.supervisor.user_started(("middleware", middleware_name))
+            with self.target_lock("middleware", middleware_name, "start"):
+                pid = self.launch_target(("middleware", middleware_name), middleware["start_cmd"], work_dir,
+                                         middleware.get("env"))
+                
+            # 接下来一段时间内快速轮询
+            self.scheduler.boost(("middleware", middleware_name))
+                
+            return {"status": "success", "message": self.started_message(middleware_name, pid)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def stop_middleware(self, middleware_name):
+        try:
+            middleware = self.middlewares.get(middleware_name)
+            if not middleware:
+                return {"status": "error", "message": "中间件不存在"}
+                
+            stopped = False
+            failed = None
+            
+            # 用户主动停止，不触发自动重启
+            self.supervisor.expect_stop(("middleware", middleware_name))
+            try:
+                with self.target_lock("middleware", middleware_name, "stop"):
+                    # 通过进程后端查找所有匹配的进程（按进程名索引，配置了工作目录时再比对工作目录）
+                    snapshot = ProcessSnapshot()
+                    backend = snapshot.backend
+                    for pid in snapshot.find_all_middleware(middleware['process_name'], middleware.get("work_dir", "")):
+                        try:
+                            backend.terminate(pid)
+                            stopped = True
+                        except psutil.NoSuchProcess:
+                            continue
+                        except PROCESS_ERRORS as e:
+                            failed = e
+            except Exception:
+                self.supervisor.stop_failed(("middleware", middleware_name))
+                raise
+                        
+            self.scheduler.boost(("middleware", middleware_name))
+            if failed is not None and not stopped:
+                # 终止失败，进程仍在运行，之后的意外退出仍需要自动重启
+                self.supervisor.stop_failed(("middleware", middleware_name))
+                return {"status": "error", "message": f"{middleware_name} 停止失败: {failed}"}
+            if stopped:
+                return {"status": "success", "message": f"{middleware_name} 已停止"}
+            else:
+                return {"status": "success", "message": f"{middleware_name} 未运行"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def reload_middleware(self, middleware_name):
         try:
-            with open(nginx_conf_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            middleware = self.middlewares.get(middleware_name)
+            if not middleware:
+                return {"status": "error", "message": "中间件不存在"}
+                
+            if not middleware.get("reload_cmd"):
+                return {"status": "error", "message": "未配置重载命令"}
+                
+            # 窗口期内的重载请求合并为一次执行，所有调用者共享结果
+            return self.reloads.request(middleware_name, lambda: self._run_reload(middleware_name))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def _run_reload(self, middleware_name):
+        middleware = self.middlewares.get(middleware_name)
+        if not middleware or not middleware.get("reload_cmd"):
+            return {"status": "error", "message": f"{middleware_name} 配置已变更，无法重载"}
             
-            # 使用正则表达式替换端口号
-            new_content = re.sub(r'(listen\s+)\d+', rf'\g<1>{new_port}', content)
+        work_dir = middleware.get("work_dir", "") or None
+        with self.target_lock("middleware", middleware_name, "reload"):
+            result = subprocess.call(middleware["reload_cmd"], shell=True, cwd=work_dir)
             
-            with open(nginx_conf_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
+        self.scheduler.boost(("middleware", middleware_name))
             
-            return True
-        except Exception as e:
-            print(f"更新nginx配置文件失败: {e}")
-            return False
+        if result == 0:
+            return {"status": "success", "message": f"{middleware_name} 重载成功"}
+        else:
+            return {"status": "error", "message": f"{middleware_name} 重载失败，返回代码：{result}"}
 
 # 创建服务管理器实例
 service_manager = ServiceManager()
@@ -313,36 +1009,442 @@ service_manager = ServiceManager()
 def index():
     return render_template('index.html')
 
+@socketio.on('connect')
+def handle_connect():
+    # 有客户端观察时才轮询状态
+    service_manager.scheduler.add_watcher('socketio')
+    # 新连接或重连的客户端先获取一次全量状态，之后只接收增量
+    emit('status_full', service_manager.broadcaster.full_sync())
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    service_manager.scheduler.remove_watcher('socketio')
+    for key in output_subscriptions.pop(request.sid, set()):
+        service_manager.outputs.unsubscribe(key)
+
+# 每个Socket.IO连接订阅的输出对象，断开时取消订阅
+output_subscriptions = {}
+
+def output_room(key):
+    return "output:{}:{}".format(*key)
+
+def parse_process_target(target):
+    """解析 "类型:名称" 或唯一的名称为Java进程或中间件的key，无法解析时抛出 DependencyError"""
+    targets = ([("java", name) for name in service_manager.java_services] +
+               [("middleware", name) for name in service_manager.middlewares])
+    return parse_dependency(target, targets)
+
+def output_limit(value, default=500):
+    """客户端请求的输出行数，限制在 1-2000 之间（与 /api/output 一致）"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, 2000))
+
+@socketio.on('output_subscribe')
+def handle_output_subscribe(data):
+    """订阅对象的实时输出，先返回内存中最近的输出"""
+    try:
+        key = parse_process_target((data or {}).get('target'))
+    except DependencyError as e:
+        emit('output_lines', {"target": (data or {}).get('target'), "error": str(e), "lines": []})
+        return
+    subscriptions = output_subscriptions.setdefault(request.sid, set())
+    if key not in subscriptions:
+        subscriptions.add(key)
+        join_room(output_room(key))
+        service_manager.outputs.subscribe(key)
+    emit('output_lines', {"target": "{}:{}".format(*key), "reset": True,
+                          "lines": service_manager.outputs.tail(key, limit=output_limit((data or {}).get('limit')))})
+
+@socketio.on('output_unsubscribe')
+def handle_output_unsubscribe(data):
+    try:
+        key = parse_process_target((data or {}).get('target'))
+    except DependencyError:
+        return
+    subscriptions = output_subscriptions.get(request.sid, set())
+    if key in subscriptions:
+        subscriptions.discard(key)
+        leave_room(output_room(key))
+        service_manager.outputs.unsubscribe(key)
+
+@socketio.on('status_resync')
+def handle_status_resync():
+    emit('status_full', service_manager.broadcaster.full_sync())
+
+def submit_operation(kind, name, action):
+    """校验并提交异步操作，立即返回任务ID"""
+    error = service_manager.validate_operation(kind, name, action)
+    if error:
+        return jsonify({"status": "error", "message": error})
+    job = service_manager.submit_operation(kind, name, action)
+    label = service_manager.ACTION_LABELS.get(action, action)
+    return jsonify({
+        "status": "success",
+        "message": f"{name} {label}操作已提交",
+        "job_id": job["id"]
+    })
+
+@app.route('/api/bulk', methods=['POST'])
+def bulk_operation():
+    """批量启动/停止/重启/重载多个对象
+
+    请求体: {"action": "start", "targets": [{"kind": "service", "name": "MongoDB"}, ...] 或 "all",
+             "concurrency": 4, "wait": false}
+    wait 为 true 时执行完成后返回每个对象的结果，否则立即返回任务ID，进度通过WebSocket推送。
+    """
+    data = request.get_json(silent=True) or {}
+    targets = service_manager.bulk_targets(data)
+    if not targets:
+        return jsonify({"status": "error", "message": "未指定操作对象"})
+    concurrency = data.get("concurrency")
+    try:
+        if concurrency is not None:
+            concurrency = int(concurrency)
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "并发数必须是整数"})
+        
+    if data.get("wait"):
+        return jsonify(service_manager.run_bulk(targets, concurrency))
+        
+    job = service_manager.jobs.submit("bulk", f"{len(targets)}个对象", data.get("action", ""),
+                                      lambda report: service_manager.run_bulk(targets, concurrency, report))
+    return jsonify({
+        "status": "success",
+        "message": f"批量操作已提交，共 {len(targets)} 个对象",
+        "job_id": job["id"],
+        "targets": [{key: target[key] for key in ("kind", "name", "action", "error")} for target in targets]
+    })
+
+def parse_targets(refs):
+    """把请求中的对象列表（"类型:名称" 或名称）解析为key列表，未指定时返回None"""
+    if not refs or refs == "all":
+        return None
+    if isinstance(refs, str):
+        refs = [refs]
+    targets = set(service_manager.dependency_graph())
+    return [parse_dependency(ref, targets) for ref in refs]
+
+@app.route('/api/orchestrate/plan')
+def get_startup_plan():
+    """返回按依赖关系分层的启动计划"""
+    try:
+        roots = parse_targets(request.args.getlist('targets'))
+        graph, layers = service_manager.startup_plan(roots)
+        return jsonify({
+            "status": "success",
+            "layers": [["{}:{}".format(*key) for key in layer] for layer in layers],
+            "depends_on": {"{}:{}".format(*key): ["{}:{}".format(*dep) for dep in sorted(deps)]
+                           for key, deps in graph.items()}
+        })
+    except DependencyError as e:
+        return jsonify({"status": "error", "message": str(e)})
+
+@app.route('/api/orchestrate/start', methods=['POST'])
+def orchestrate_start():
+    """按依赖关系启动对象（未指定 targets 时启动全部），自动包含依赖的对象
+
+    请求体: {"targets": ["java:gateway", ...], "wait": false}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        roots = parse_targets(data.get("targets"))
+        graph, layers = service_manager.startup_plan(roots)
+    except DependencyError as e:
+        return jsonify({"status": "error", "message": str(e)})
+        
+    if data.get("wait"):
+        return jsonify(service_manager.orchestrator.run(graph))
+        
+    job = service_manager.jobs.submit("orchestrate", f"{len(graph)}个对象", "start",
+                                      lambda report: service_manager.orchestrator.run(graph, report))
+    return jsonify({
+        "status": "success",
+        "message": f"依赖启动已提交，共 {len(graph)} 个对象，{len(layers)} 层",
+        "job_id": job["id"],
+        "layers": [["{}:{}".format(*key) for key in layer] for layer in layers]
+    })
+
+@app.route('/api/dependencies/<kind>/<name>', methods=['POST'])
+def set_dependencies(kind, name):
+    """设置Java进程或中间件的 depends_on，存在循环依赖时拒绝"""
+    entries = {"java": service_manager.java_services, "middleware": service_manager.middlewares}.get(kind)
+    if entries is None or name not in entries:
+        return jsonify({"status": "error", "message": "对象不存在"})
+        
+    data = request.get_json(silent=True) or {}
+    depends_on = normalize_depends_on(data.get("depends_on"))
+    previous = entries[name].get("depends_on")
+    entries[name]["depends_on"] = depends_on
+    try:
+        service_manager.startup_plan()
+    except DependencyError as e:
+        entries[name]["depends_on"] = previous
+        return jsonify({"status": "error", "message": str(e)})
+        
+    if kind == "java":
+        return jsonify(service_manager.save_java_services())
+    return jsonify(service_manager.save_middlewares())
+
+@app.route('/api/supervise/<kind>/<name>', methods=['POST'])
+def set_supervise(kind, name):
+    """开启或关闭Java进程或中间件的自动重启
+
+    请求体: {"supervise": true} 或 {"supervise": {"base_delay": 2, "max_delay": 60, "max_restarts": 5, "window": 300}}
+    """
+    entries = {"java": service_manager.java_services, "middleware": service_manager.middlewares}.get(kind)
+    if entries is None or name not in entries:
+        return jsonify({"status": "error", "message": "对象不存在"})
+        
+    data = request.get_json(silent=True) or {}
+    supervise = data.get("supervise")
+    if isinstance(supervise, dict):
+        supervise = {field: value for field, value in supervise.items() if field in Supervisor.DEFAULTS}
+    elif supervise:
+        supervise = True
+    if supervise:
+        entries[name]["supervise"] = supervise
+        # 重新开启时清除之前的崩溃循环状态
+        service_manager.supervisor.user_started((kind, name))
+    else:
+        entries[name].pop("supervise", None)
+    service_manager.update_supervisor_watch()
+        
+    if kind == "java":
+        return jsonify(service_manager.save_java_services())
+    return jsonify(service_manager.save_middlewares())
+
+@app.route('/api/supervisor')
+def get_supervisor_status():
+    """返回各对象的守护状态（连续重启次数、下次重启时间、是否进入崩溃循环）"""
+    return jsonify(service_manager.supervisor.stats())
+
+@app.route('/api/supervisor/events')
+def get_supervisor_events():
+    """返回最近的守护事件（崩溃、自动重启、重启失败、崩溃循环），最新的在前"""
+    limit = request.args.get('limit', 100, type=int)
+    target = request.args.get('target')
+    return jsonify(service_manager.supervisor.list_events(limit, target))
+
+def normalize_depends_on(value):
+    """depends_on 支持列表或逗号分隔的字符串"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def check_new_dependencies(entries, name):
+    """新增对象后校验依赖配置，有错误时移除该对象并返回错误信息"""
+    try:
+        service_manager.startup_plan()
+        return None
+    except DependencyError as e:
+        del entries[name]
+        return str(e)
+
+@app.route('/api/jobs')
+def list_jobs():
+    return jsonify(service_manager.jobs.list())
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = service_manager.jobs.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "任务不存在"}), 404
+    return jsonify(job)
+
 @app.route('/api/services')
 def get_services():
     return jsonify(list(service_manager.services.keys()))
 
 @app.route('/api/services/start/<service_name>', methods=['POST'])
 def start_service(service_name):
-    try:
-        with service_manager.operation_lock:
-            win32serviceutil.StartService(service_manager.services[service_name])
-        return jsonify({"status": "success", "message": f"{service_name} 已启动"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": f"启动 {service_name} 失败: {str(e)}"})
+    return submit_operation("service", service_name, "start")
 
 @app.route('/api/services/stop/<service_name>', methods=['POST'])
 def stop_service(service_name):
-    try:
-        with service_manager.operation_lock:
-            win32serviceutil.StopService(service_manager.services[service_name])
-        return jsonify({"status": "success", "message": f"{service_name} 已停止"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": f"停止 {service_name} 失败: {str(e)}"})
+    return submit_operation("service", service_name, "stop")
 
 @app.route('/api/services/restart/<service_name>', methods=['POST'])
 def restart_service(service_name):
+    return submit_operation("service", service_name, "restart")
+
+@app.route('/api/readiness')
+def get_readiness():
+    """返回最近一次就绪探测的详细结果（耗时为毫秒）"""
+    return jsonify(service_manager.prober.stats())
+
+@app.route('/api/locks')
+def get_lock_status():
+    return jsonify(service_manager.locks.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 抓取接口，只渲染状态检查线程生成的快照，不触发检查也不等待
+
+    无人观察时按最长间隔轮询，快照可能较旧；抓取方根据 snapshot_age_seconds
+    和 status_poll_interval_seconds 自行判断是否新鲜。
+    """
+    snapshot = dict(service_manager.export_snapshot)
+    snapshot["paused"] = service_manager.scheduler.is_paused()
+    snapshot["poll_interval"] = service_manager.scheduler.tick_interval()
+    body = prometheus_export.render(snapshot, service_manager.jobs.stats())
+    return app.response_class(body, mimetype=None, content_type=prometheus_export.CONTENT_TYPE)
+
+@app.route('/api/metrics/<target>')
+def get_metrics(target):
+    """返回对象最近的资源指标采样，target 为 "类型:名称" 或唯一的名称
+
+    samples 按 fields 的顺序每列一个列表，limit 参数限制返回的采样数
+    """
     try:
-        with service_manager.operation_lock:
-            win32serviceutil.RestartService(service_manager.services[service_name])
-        return jsonify({"status": "success", "message": f"{service_name} 已重启"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": f"重启 {service_name} 失败: {str(e)}"})
+        key = parse_process_target(target)
+        limit = request.args.get('limit', type=int)
+        result = service_manager.metrics.history(key, limit)
+        result.update({"status": "success", "target": "{}:{}".format(*key)})
+        return jsonify(result)
+    except DependencyError as e:
+        return jsonify({"status": "error", "message": str(e)})
+
+@app.route('/api/logs/<target>')
+def get_logs(target):
+    """查看对象的日志文件
+
+    不带 file 参数时列出可查看的日志文件；带 file 时按行分页读取：
+      start=N           从第 N 行开始向后读取 limit 行
+      before=N（默认为文件末尾）  读取第 N 行之前的 limit 行，用于从末尾向前翻页
+    每行为 [行号, 文本]，行号从0开始
+    """
+    try:
+        key = parse_process_target(target)
+    except DependencyError as e:
+        return jsonify({"status": "error", "message": str(e)})
+        
+    path = request.args.get('file')
+    if not path:
+        dirs, files = service_manager.log_sources(key)
+        return jsonify({"status": "success", "target": "{}:{}".format(*key), "dirs": dirs,
+                        "files": list_log_files(dirs, files)})
+        
+    try:
+        path = service_manager.resolve_log_file(key, path)
+        index = service_manager.log_indexes.get(path)
+    except (PermissionError, FileNotFoundError) as e:
+        return jsonify({"status": "error", "message": str(e)})
+        
+    total = index.total
+    limit = max(1, min(request.args.get('limit', 200, type=int), 2000))
+    start = request.args.get('start', type=int)
+    if start is None:
+        before = request.args.get('before', total, type=int)
+        before = max(0, min(before, total))
+        start = max(0, before - limit)
+        limit = before - start
+    return jsonify({
+        "status": "success",
+        "file": path,
+        "size": index.size,
+        "total": total,
+        "start": start,
+        "lines": [list(line) for line in index.read_lines(start, limit)]
+    })
+
+@app.route('/api/logs/<target>/search')
+def search_logs(target):
+    """在日志文件中按正则搜索，结果以NDJSON逐行返回（每找到一行立即输出）
+
+    参数: file, pattern, start（起始行）, limit（最多返回的匹配行数）
+    每行为 {"line": 行号, "text": 文本}，最后一行为 {"done": true, "matches", "next_line", "complete"}，
+    complete 为 false 时可以从 next_line 继续搜索
+    """
+    try:
+        key = parse_process_target(target)
+        path = service_manager.resolve_log_file(key, request.args.get('file', ''))
+        pattern = request.args.get('pattern', '')
+        if not pattern:
+            return jsonify({"status": "error", "message": "缺少搜索条件"})
+        re.compile(pattern)
+        index = service_manager.log_indexes.get(path)
+    except (DependencyError, PermissionError, FileNotFoundError) as e:
+        return jsonify({"status": "error", "message": str(e)})
+    except re.error as e:
+        return jsonify({"status": "error", "message": f"正则表达式错误: {e}"})
+        
+    start = max(0, request.args.get('start', 0, type=int))
+    limit = max(1, min(request.args.get('limit', 200, type=int), 5000))
+    
+    def generate():
+        progress = {}
+        matches = 0
+        for line, text in index.search(pattern, start, limit, progress=progress):
+            matches += 1
+            yield json.dumps({"line": line, "text": text}, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "matches": matches, **progress}) + "\n"
+        
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/output/<target>')
+def get_output(target):
+    """返回对象最近的标准输出/标准错误（内存中的最近若干行），after 为上次取到的最大序号
+
+    每行为 [序号, 时间, 流, 文本]，完整的输出保存在 logs 目录下的日志文件中
+    """
+    try:
+        key = parse_process_target(target)
+    except DependencyError as e:
+        return jsonify({"status": "error", "message": str(e)})
+    after = request.args.get('after', 0, type=int)
+    limit = output_limit(request.args.get('limit', 500, type=int))
+    return jsonify({"status": "success", "target": "{}:{}".format(*key), "path": service_manager.outputs.path_of(key),
+                    "lines": service_manager.outputs.tail(key, after, limit)})
+
+@app.route('/api/file-browser')
+def file_browser():
+    """浏览服务器上的目录，用于选择工作目录和启动脚本
+
+    参数: path（为空时列出盘符）、offset/limit 分页、sort（name/mtime/size）、order（asc/desc）、
+    ext（逗号分隔的扩展名，默认只显示 .jar/.bat/.exe 文件，"*" 显示全部文件）
+    """
+    try:
+        ext = request.args.get('ext')
+        if ext == "*":
+            extensions = None
+        elif ext:
+            extensions = [item if item.startswith(".") else "." + item
+                          for item in (part.strip() for part in ext.split(",")) if item]
+        else:
+            extensions = DEFAULT_EXTENSIONS
+        result = service_manager.directories.browse(
+            request.args.get('path', ''),
+            offset=request.args.get('offset', 0, type=int),
+            limit=min(request.args.get('limit', 500, type=int), 5000),
+            sort=request.args.get('sort', 'name'),
+            reverse=request.args.get('order') == 'desc',
+            extensions=extensions
+        )
+        result["status"] = "success"
+        return jsonify(result)
+    except FileNotFoundError as e:
+        return jsonify({"status": "error", "message": str(e)})
+    except OSError as e:
+        return jsonify({"status": "error", "message": f"无法读取目录: {e}"})
+
+@app.route('/api/reloads')
+def get_reload_status():
+    """返回重载合并统计，saved 为被合并而省去的重载次数"""
+    return jsonify(service_manager.reloads.stats())
+
+@app.route('/api/scheduler')
+def get_scheduler_status():
+    # 各对象当前的有效轮询间隔，无人观察时应为 max_interval
+    result = service_manager.scheduler.intervals()
+    result["tracker"] = service_manager.pid_tracker.stats()
+    result["exit_watcher"] = service_manager.exit_watcher.stats()
+    result["launcher"] = service_manager.launcher.stats()
+    return jsonify(result)
 
 @app.route('/api/middleware')
 def get_middlewares():
@@ -373,8 +1475,17 @@ def add_middleware():
             "start_cmd": start_cmd,
             "reload_cmd": reload_cmd,
             "work_dir": work_dir,
+            "depends_on": normalize_depends_on(data.get('depends_on')),
             "pid": None
         }
+        if data.get('supervise'):
+            service_manager.middlewares[name]["supervise"] = True
+        if data.get('capture_output'):
+            service_manager.middlewares[name]["capture_output"] = True
+        
+        error = check_new_dependencies(service_manager.middlewares, name)
+        if error:
+            return jsonify({"status": "error", "message": error})
         
         result = service_manager.save_middlewares()
         return jsonify(result)
@@ -383,93 +1494,15 @@ def add_middleware():
 
 @app.route('/api/middleware/start/<middleware_name>', methods=['POST'])
 def start_middleware(middleware_name):
-    try:
-        middleware = service_manager.middlewares.get(middleware_name)
-        if not middleware:
-            return jsonify({"status": "error", "message": "中间件不存在"})
-            
-        work_dir = middleware.get("work_dir", "")
-        if work_dir:
-            current_dir = os.getcwd()
-            os.chdir(work_dir)
-            
-        with service_manager.operation_lock:
-            os.system(middleware["start_cmd"])
-            
-        if work_dir:
-            os.chdir(current_dir)
-            
-        return jsonify({"status": "success", "message": f"{middleware_name} 已启动"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+    return submit_operation("middleware", middleware_name, "start")
 
 @app.route('/api/middleware/stop/<middleware_name>', methods=['POST'])
 def stop_middleware(middleware_name):
-    try:
-        middleware = service_manager.middlewares.get(middleware_name)
-        if not middleware:
-            return jsonify({"status": "error", "message": "中间件不存在"})
-            
-        process_name = middleware['process_name'].lower()
-        work_dir = middleware.get("work_dir", "").lower()
-        stopped = False
-        
-        with service_manager.operation_lock:
-            for proc in psutil.process_iter(['pid', 'name', 'exe', 'cwd']):
-                try:
-                    if (proc.info['name'].lower() == process_name or
-                        (proc.info['exe'] and os.path.basename(proc.info['exe']).lower() == process_name)):
-                        
-                        if work_dir:
-                            try:
-                                proc_cwd = proc.cwd().lower()
-                                if not (work_dir in proc_cwd or 
-                                      proc_cwd in work_dir or 
-                                      os.path.normpath(work_dir) == os.path.normpath(proc_cwd)):
-                                    continue
-                            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                                continue
-                        
-                        proc.terminate()
-                        stopped = True
-                        
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-                    
-        if stopped:
-            return jsonify({"status": "success", "message": f"{middleware_name} 已停止"})
-        else:
-            return jsonify({"status": "success", "message": f"{middleware_name} 未运行"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+    return submit_operation("middleware", middleware_name, "stop")
 
 @app.route('/api/middleware/reload/<middleware_name>', methods=['POST'])
 def reload_middleware(middleware_name):
-    try:
-        middleware = service_manager.middlewares.get(middleware_name)
-        if not middleware:
-            return jsonify({"status": "error", "message": "中间件不存在"})
-            
-        if not middleware.get("reload_cmd"):
-            return jsonify({"status": "error", "message": "未配置重载命令"})
-            
-        work_dir = middleware.get("work_dir", "")
-        if work_dir:
-            current_dir = os.getcwd()
-            os.chdir(work_dir)
-            
-        with service_manager.operation_lock:
-            result = os.system(middleware["reload_cmd"])
-            
-        if work_dir:
-            os.chdir(current_dir)
-            
-        if result == 0:
-            return jsonify({"status": "success", "message": f"{middleware_name} 重载成功"})
-        else:
-            return jsonify({"status": "error", "message": f"{middleware_name} 重载失败，返回代码：{result}"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+    return submit_operation("middleware", middleware_name, "reload")
 
 @app.route('/api/middleware/delete/<middleware_name>', methods=['POST'])
 def delete_middleware(middleware_name):
@@ -479,10 +1512,13 @@ def delete_middleware(middleware_name):
             
         # 如果进程正在运行，先终止它
         if service_manager.middlewares[middleware_name]["pid"]:
-            stop_middleware(middleware_name)
+            service_manager.stop_middleware(middleware_name)
             
         # 删除配置
         del service_manager.middlewares[middleware_name]
+        service_manager.locks.forget(("middleware", middleware_name))
+        service_manager.supervisor.forget(("middleware", middleware_name))
+        service_manager.reloads.forget(middleware_name)
         result = service_manager.save_middlewares()
         
         if result["status"] == "success":
@@ -514,8 +1550,17 @@ def add_java_process():
             "process": name,
             "jar_name": jar_name,
             "script": script,
+            "depends_on": normalize_depends_on(data.get('depends_on')),
             "pid": None
         }
+        if data.get('supervise'):
+            service_manager.java_services[name]["supervise"] = True
+        if data.get('capture_output'):
+            service_manager.java_services[name]["capture_output"] = True
+        
+        error = check_new_dependencies(service_manager.java_services, name)
+        if error:
+            return jsonify({"status": "error", "message": error})
         
         result = service_manager.save_java_services()
         return jsonify(result)
@@ -524,39 +1569,11 @@ def add_java_process():
 
 @app.route('/api/java/start/<process_name>', methods=['POST'])
 def start_java_process(process_name):
-    try:
-        service = service_manager.java_services.get(process_name)
-        if not service:
-            return jsonify({"status": "error", "message": "进程不存在"})
-            
-        script_path = service.get("script")
-        if not script_path:
-            return jsonify({"status": "error", "message": "请先配置启动脚本路径"})
-            
-        with service_manager.operation_lock:
-            os.system(f'start "" "{script_path}"')
-            
-        return jsonify({"status": "success", "message": f"{process_name} 已启动"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+    return submit_operation("java", process_name, "start")
 
 @app.route('/api/java/stop/<process_name>', methods=['POST'])
 def stop_java_process(process_name):
-    try:
-        service = service_manager.java_services.get(process_name)
-        if not service:
-            return jsonify({"status": "error", "message": "进程不存在"})
-            
-        pid = service.get("pid")
-        if not pid:
-            return jsonify({"status": "success", "message": f"{process_name} 未运行"})
-            
-        with service_manager.operation_lock:
-            psutil.Process(pid).terminate()
-            
-        return jsonify({"status": "success", "message": f"{process_name} 已终止"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+    return submit_operation("java", process_name, "stop")
 
 @app.route('/api/java/configure/<process_name>', methods=['POST'])
 def configure_java_process(process_name):
@@ -588,10 +1605,12 @@ def delete_java_process(process_name):
             
         # 如果进程正在运行，先终止它
         if service_manager.java_services[process_name]["pid"]:
-            stop_java_process(process_name)
+            service_manager.stop_java(process_name)
             
         # 删除配置
         del service_manager.java_services[process_name]
+        service_manager.locks.forget(("java", process_name))
+        service_manager.supervisor.forget(("java", process_name))
         result = service_manager.save_java_services()
         
         if result["status"] == "success":
@@ -618,8 +1637,10 @@ def get_nginx_port(middleware_name):
             
         port = service_manager.get_nginx_port(nginx_conf)
         if port:
-            middleware["port"] = port
-            service_manager.save_middlewares()
+            # 只读请求：端口与配置不一致时才更新配置
+            if middleware.get("port") != port:
+                middleware["port"] = port
+                service_manager.save_middlewares()
             return jsonify({"status": "success", "port": port})
         else:
             return jsonify({"status": "error", "message": "未找到端口配置"})
@@ -635,32 +1656,14 @@ def update_nginx_port(middleware_name):
         if not new_port or not new_port.isdigit():
             return jsonify({"status": "error", "message": "请提供有效的端口号"})
             
-        middleware = service_manager.middlewares.get(middleware_name)
-        if not middleware:
-            return jsonify({"status": "error", "message": "中间件不存在"})
-            
-        work_dir = middleware.get("work_dir", "")
-        if not work_dir:
-            return jsonify({"status": "error", "message": "未设置工作目录"})
+        # 在配置锁内修改并用 nginx -t 校验，失败时恢复原配置
+        result = service_manager.update_nginx_port(middleware_name, new_port)
+        if result["status"] != "success":
+            return jsonify(result)
             
-        nginx_conf = os.path.join(work_dir, "conf", "nginx.conf")
-        if not os.path.exists(nginx_conf):
-            return jsonify({"status": "error", "message": "未找到nginx配置文件"})
-            
-        if service_manager.update_nginx_port(nginx_conf, new_port):
-            middleware["port"] = new_port
-            service_manager.save_middlewares()
-            
-            # 尝试重载nginx
-            reload_middleware(middleware_name)
-            
-            return jsonify({
-                "status": "success", 
-                "message": "端口号已更新并重载nginx", 
-                "port": new_port
-            })
-        else:
-            return jsonify({"status": "error", "message": "更新配置文件失败"})
+        # 重载作为任务提交，不在请求线程中等待
+        result["port"] = new_port
+        return jsonify(service_manager.submit_nginx_reload(middleware_name, result))
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
@@ -680,53 +1683,34 @@ def get_nginx_proxy(middleware_name):
         if not os.path.exists(nginx_conf):
             return jsonify({"status": "error", "message": "未找到nginx配置文件"})
         
-        # 定义需要过滤的路径列表
-        filter_paths = [
-            r"location\s+/api/",
-            r"location\s+/admin/api/files/upload/",
-            r"location\s+/papi/",
-            r"location\s+/w(?:\s|{)",
-            r"location\s+/(?:\s|{)",
-            r"location\s+/authcenter/",
-            r"location\s+/usercenter/",
-            r"location\s+/permissions/",
-            r"location\s+/wish3dearth/",
-            r"location\s+/datamanage/",
-            r"location\s+~\s+\^/wish3dearth/static/v1\.0\.0/cad/api/v1/map/\(.*\)\$"
-        ]
-        
-        # 读取nginx配置文件并解析代理配置
+        # 解析nginx配置（按文件修改时间缓存）并列出代理配置
         try:
-            with open(nginx_conf, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # 使用正则表达式查找所有location配置
-            locations = re.finditer(r'location\s+([^{]+)\s*{\s*proxy_pass\s+([^;]+);', content)
-            
-            # 收集代理配置
-            proxies = []
-            for match in locations:
-                location_block = f"location {match.group(1)}"
-                
-                # 检查是否需要过滤
-                should_filter = False
-                for filter_path in filter_paths:
-                    if re.match(filter_path, location_block.strip()):
-                        should_filter = True
-                        break
-                
-                # 如果不需要过滤，则添加到结果中
-                if not should_filter:
-                    path = match.group(1).strip()
-                    target = match.group(2).strip()
-                    proxies.append({"path": path, "target": target})
-            
+            proxies = service_manager.get_nginx_proxies(nginx_conf)
             return jsonify({"status": "success", "proxies": proxies})
         except Exception as e:
             return jsonify({"status": "error", "message": f"读取nginx配置文件失败: {str(e)}"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/api/middleware/nginx/access/<middleware_name>', methods=['GET'])
+def get_nginx_access_stats(middleware_name):
+    """按location汇总的nginx访问统计
+
+    window 参数为统计窗口秒数（60-900，默认300）；rate 为最近60秒的每秒请求数，
+    total 为开始分析以来的累计值。延迟分位数需要 log_format 中包含 $request_time / $upstream_response_time。
+    """
+    try:
+        if middleware_name not in service_manager.middlewares:
+            return jsonify({"status": "error", "message": "中间件不存在"})
+        window = request.args.get('window', 300, type=int)
+        result = service_manager.access_logs.summary(("middleware", middleware_name), window)
+        if result is None:
+            return jsonify({"status": "error", "message": "未找到nginx配置文件或尚未开始分析访问日志"})
+        result["status"] = "success"
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+
 @app.route('/api/middleware/nginx/proxy/<middleware_name>', methods=['POST'])
 def add_nginx_proxy(middleware_name):
     try:
@@ -737,51 +1721,51 @@ def add_nginx_proxy(middleware_name):
         if not all([suffix, target]):
             return jsonify({"status": "error", "message": "缺少必要参数"})
             
-        middleware = service_manager.middlewares.get(middleware_name)
-        if not middleware:
-            return jsonify({"status": "error", "message": "中间件不存在"})
-            
-        work_dir = middleware.get("work_dir", "")
-        if not work_dir:
-            return jsonify({"status": "error", "message": "未设置工作目录"})
-            
-        nginx_conf = os.path.join(work_dir, "conf", "nginx.conf")
-        if not os.path.exists(nginx_conf):
-            return jsonify({"status": "error", "message": "未找到nginx配置文件"})
-        
         # 确保后缀以/开头
         if not suffix.startswith('/'):
             suffix = '/' + suffix
         
-        # 读取nginx配置文件
-        try:
-            with open(nginx_conf, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # 查找server_name行
-            server_block = re.search(r'server\s*{[^}]*server_name[^;]*;', content, re.DOTALL)
-            if not server_block:
-                return jsonify({"status": "error", "message": "无法在配置文件中找到server配置块"})
-            
-            # 构建新的location配置
-            location_config = f"\n    location {suffix} {{\n        proxy_pass {target};\n    }}"
-            
-            # 在server_name后插入location配置
-            insert_pos = server_block.end()
-            new_content = content[:insert_pos] + location_config + content[insert_pos:]
-            
-            # 写入配置文件
-            with open(nginx_conf, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            
-            # 重载nginx
-            reload_middleware(middleware_name)
-            
-            return jsonify({"status": "success", "message": "代理配置已添加并重载nginx"})
-        except Exception as e:
-            return jsonify({"status": "error", "message": f"更新nginx配置文件失败: {str(e)}"})
+        # 在配置锁内添加location并用 nginx -t 校验，失败时恢复原配置
+        result = service_manager.add_nginx_proxy(middleware_name, suffix, target)
+        if result["status"] != "success":
+            return jsonify(result)
+            
+        # 重载作为任务提交，不在请求线程中等待
+        result["message"] = "代理配置已添加"
+        return jsonify(service_manager.submit_nginx_reload(middleware_name, result))
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/api/middleware/nginx/locations/<middleware_name>', methods=['POST'])
+def edit_nginx_locations(middleware_name):
+    """批量新增/修改/删除反向代理location，校验通过后只重载一次
+
+    请求体: {"server": {"port": 81} 或 {"server_name": "localhost"},
+             "operations": [{"op": "add", "path": "/api2/", "target": "http://127.0.0.1:8080/"},
+                            {"op": "update", "path": "/gis/", "target": "http://127.0.0.1:9000/"},
+                            {"op": "delete", "path": "/old/"}],
+             "reload": true}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        server = data.get("server") or {}
+        operations = data.get("operations") or []
+        if not isinstance(operations, list) or not all(isinstance(item, dict) for item in operations):
+            return jsonify({"status": "error", "message": "operations 必须是对象列表"})
+        return jsonify(service_manager.edit_nginx_locations(
+            middleware_name, operations,
+            port=server.get("port"),
+            server_name=server.get("server_name"),
+            reload=data.get("reload", True)
+        ))
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+
+# 退出时写入尚未保存的配置修改
+atexit.register(service_manager.java_store.close)
+atexit.register(service_manager.middleware_store.close)
+atexit.register(service_manager.outputs.close)
+atexit.register(service_manager.access_logs.close)
+
 if __name__ == '__main__':
     socketio.run(app, host='0.0.0.0', port=8082, debug=False)
\ No newline at end of file